@@ -10,5 +10,8 @@ setup(
         'python-dotenv',
         'httpx[socks]',
         'qianfan'
-    ]
+    ],
+    extras_require={
+        'columnar': ['numpy']
+    }
 ) 
\ No newline at end of file
@@ -1,137 +1,110 @@
-from bs4 import BeautifulSoup
 from typing import Dict, List
+import io
 import json
+from src.data.columnar import ColumnarBookmarkStore
+from src.data.models import Bookmark
+from src.data.parser import bookmarks_from_events
+from src.data.snapshot import load_events
+from src.data.writer import NetscapeBookmarkWriter, write_bookmarks_file
 
 class BookmarkProcessor:
-    def __init__(self):
+    def __init__(self, columnar: bool = False):
         self.bookmarks_data = []
-        self.soup = None
+        # 列式模式下书签保存在 ColumnarBookmarkStore 中，适合百万级书签
+        self.columnar = columnar
+        self.store = None
 
     def load_bookmarks(self, file_path: str):
         """加载书签文件"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                self.soup = BeautifulSoup(file, 'html.parser')
-                self.bookmarks_data = self._extract_bookmarks()
+            if self.columnar:
+                self.store = ColumnarBookmarkStore.from_events(load_events(file_path))
+                self.bookmarks_data = []
+            else:
+                self.bookmarks_data = self._extract_bookmarks(file_path)
         except Exception as e:
             raise Exception(f"加载书签文件失败: {str(e)}")
 
-    def _extract_bookmarks(self) -> List[Dict]:
-        """从HTML中提取书签数据"""
-        bookmarks = []
-        links = self.soup.find_all('a')
-        for link in links:
-            bookmark = {
-                'title': link.get_text().strip(),
-                'url': link.get('href', ''),
-                'add_date': link.get('add_date', ''),
-                'last_modified': link.get('last_modified', '')
-            }
-            bookmarks.append(bookmark)
-        return bookmarks
+    def load_store(self, store_dir: str):
+        """以内存映射方式加载已保存的列式存储"""
+        try:
+            self.columnar = True
+            self.store = ColumnarBookmarkStore.load(store_dir)
+            self.bookmarks_data = []
+        except Exception as e:
+            raise Exception(f"加载列式书签存储失败: {str(e)}")
+
+    def save_store(self, store_dir: str):
+        """把当前书签保存为列式存储，便于下次快速加载"""
+        if self.store is None:
+            self.store = ColumnarBookmarkStore.from_bookmarks(self.get_simplified_bookmarks())
+        self.store.save(store_dir)
+
+    def _extract_bookmarks(self, file_path: str) -> List[Bookmark]:
+        """从HTML中提取书签数据（流式解析，文件未变化时复用快照）"""
+        return list(bookmarks_from_events(load_events(file_path)))
 
     def save_bookmarks(self, output_path: str):
-        """保存书签到HTML文件"""
+        """保存书签到HTML文件（流式写出，完成后原子替换目标文件）"""
         try:
-            html = self._generate_bookmarks_html()
-            with open(output_path, 'w', encoding='utf-8') as file:
-                file.write(html)
+            write_bookmarks_file(output_path, self._iter_output_items())
         except Exception as e:
             raise Exception(f"保存书签文件失败: {str(e)}")
 
+    def _iter_output_items(self):
+        """待写出的书签数据；列式模式下逐行从存储中取出"""
+        if self.store is not None and not self.bookmarks_data:
+            return self.store.rows()
+        return self.bookmarks_data
+
     def _generate_bookmarks_html(self) -> str:
         """生成书签HTML"""
-        html = """<!DOCTYPE NETSCAPE-Bookmark-file-1>
-<!-- This is an automatically generated file.
-     It will be read and overwritten.
-     DO NOT EDIT! -->
-<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">
-<TITLE>Bookmarks</TITLE>
-<H1>Bookmarks</H1>
-<DL><p>
-"""
-        
-        # 处理文件夹结构
-        for item in self.bookmarks_data:
-            if isinstance(item, dict) and 'folders' in item:
-                for folder in item['folders']:
-                    html += self._generate_folder_html(folder)
-            elif isinstance(item, dict) and 'title' in item and 'url' in item:
-                html += self._generate_bookmark_html(item)
-
-        html += "</DL><p>"
-        return html
-
-    def _generate_folder_html(self, folder: Dict, indent: int = 1) -> str:
-        """生成文件夹HTML"""
-        html = "    " * indent
-        html += f'<DT><H3>{folder["name"]}</H3>\n'
-        html += "    " * indent + "<DL><p>\n"
-        
-        # 处理文件夹中的书签
-        for bookmark in folder.get('bookmarks', []):
-            html += "    " * (indent + 1)
-            html += self._generate_bookmark_html(bookmark)
-        
-        # 处理子文件夹
-        for subfolder in folder.get('subfolders', []):
-            html += self._generate_folder_html(subfolder, indent + 1)
-        
-        html += "    " * indent + "</DL><p>\n"
-        return html
-
-    def _generate_bookmark_html(self, bookmark: Dict) -> str:
-        """生成单个书签HTML"""
-        add_date = bookmark.get('add_date', '')
-        last_modified = bookmark.get('last_modified', '')
-        
-        attributes = []
-        if add_date:
-            attributes.append(f'ADD_DATE="{add_date}"')
-        if last_modified:
-            attributes.append(f'LAST_MODIFIED="{last_modified}"')
-        
-        attrs = ' '.join(attributes)
-        return f'<DT><A HREF="{bookmark["url"]}" {attrs}>{bookmark["title"]}</A>\n'
+        buffer = io.StringIO()
+        NetscapeBookmarkWriter(buffer).write_document(self._iter_output_items())
+        return buffer.getvalue()
 
     def get_bookmarks_data(self) -> List[Dict]:
         """获取书签数据"""
+        if self.store is not None and not self.bookmarks_data:
+            return list(self.store.rows())
         return self.bookmarks_data
 
     def update_bookmarks_data(self, new_data: List[Dict]):
         """更新书签数据"""
         self.bookmarks_data = new_data
 
-    def get_simplified_bookmarks(self) -> List[Dict]:
-        """获取简化的书签数据（只包含标题和URL）"""
+    def get_simplified_bookmarks(self) -> List[Bookmark]:
+        """获取书签列表（直接返回书签记录，不再逐条复制成新字典）"""
+        if self.store is not None and not self.bookmarks_data:
+            return list(self.store.rows())
+        
         simplified = []
         for bookmark in self.bookmarks_data:
-            if isinstance(bookmark, dict):
+            if isinstance(bookmark, Bookmark):
+                simplified.append(bookmark)
+            elif isinstance(bookmark, dict):
                 if 'title' in bookmark and 'url' in bookmark:
-                    simplified.append({
-                        'title': bookmark['title'],
-                        'url': bookmark['url']
-                    })
+                    simplified.append(Bookmark.coerce(bookmark))
                 elif 'folders' in bookmark:
                     # 处理文件夹结构
                     simplified.extend(self._extract_bookmarks_from_folder(bookmark))
         return simplified
 
-    def _extract_bookmarks_from_folder(self, folder: Dict) -> List[Dict]:
-        """从文件夹结构中提取书签"""
+    def _extract_bookmarks_from_folder(self, folder: Dict) -> List[Bookmark]:
+        """从文件夹结构中提取书签（显式栈遍历，保持先序顺序）"""
         bookmarks = []
+        stack = [folder]
         
-        # 处理当前文件夹中的书签
-        for bookmark in folder.get('bookmarks', []):
-            if 'title' in bookmark and 'url' in bookmark:
-                bookmarks.append({
-                    'title': bookmark['title'],
-                    'url': bookmark['url']
-                })
-        
-        # 递归处理子文件夹
-        for subfolder in folder.get('subfolders', []):
-            bookmarks.extend(self._extract_bookmarks_from_folder(subfolder))
+        while stack:
+            current = stack.pop()
+            
+            # 处理当前文件夹中的书签
+            for bookmark in current.get('bookmarks') or []:
+                if 'title' in bookmark and 'url' in bookmark:
+                    bookmarks.append(Bookmark.coerce(bookmark))
+            
+            # 子文件夹逆序入栈；根节点的子文件夹保存在 'folders' 中
+            subfolders = current.get('subfolders') or current.get('folders') or []
+            stack.extend(reversed(subfolders))
         
         return bookmarks
-    
\ No newline at end of file
@@ -0,0 +1,154 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+import json
+import os
+import threading
+from src.clients.batching import RESPONSE_SAFETY_RATIO
+from src.config import DATA_DIR
+
+DEFAULT_STATE_PATH = DATA_DIR / "cache" / "batch_sizes.json"
+
+# 漏掉的书签超过该比例即视为解析失败，需要缩小批次
+MISSING_TOLERANCE = 0.1
+# 每个书签输出 token 数的滑动平均系数
+TOKENS_EWMA_ALPHA = 0.3
+
+# 多个进程或客户端写同一个状态文件时，读改写在进程内串行进行
+_state_lock = threading.Lock()
+
+
+def _load_state(path: Path) -> Dict[str, Dict]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        return state if isinstance(state, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+class AdaptiveBatchSizer:
+    """按实际表现调整批次大小（AIMD，线程安全）
+
+    批次满载、响应完整、延迟不超过 target_latency 且输出 token 留有余量时，批次大小加 increase；
+    响应被截断时按出问题的批次大小乘以 decrease，延迟超标、超时或漏掉较多书签时按当前大小乘以 decrease。
+    另外按观测到的每个书签输出 token 数限制批次大小，使输出不超过 max_tokens 的安全比例。
+    学到的大小按 服务商|模型 保存在 JSON 文件中，下次运行继续使用。
+    """
+
+    def __init__(self, key: str, initial: int, min_size: int = 1, max_size: Optional[int] = None,
+                 target_latency: float = 30.0, increase: float = 1.0, decrease: float = 0.5,
+                 path: Union[str, Path, None] = DEFAULT_STATE_PATH):
+        self.key = key
+        self.min_size = max(1, int(min_size))
+        self.max_size = max(self.min_size, int(max_size or initial * 4))
+        self.target_latency = target_latency
+        self.increase = increase
+        self.decrease = decrease
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self._size = float(initial)
+        self.tokens_per_item: Optional[float] = None
+        self.observations = 0
+        # 自上次加载或保存以来是否有新的观测
+        self._dirty = False
+
+        saved = _load_state(self.path).get(key) if self.path else None
+        if saved:
+            self._size = float(saved.get('batch_size', initial))
+            self.tokens_per_item = saved.get('tokens_per_item')
+            self.observations = int(saved.get('observations', 0))
+        self._size = min(max(self._size, self.min_size), self.max_size)
+
+    @classmethod
+    def from_settings(cls, provider: str, model: str, initial: int,
+                      settings: Dict) -> Optional['AdaptiveBatchSizer']:
+        """按 config.yaml 中服务商的 adaptive 配置创建，未启用时返回 None"""
+        adaptive = settings.get('adaptive') or {}
+        if not adaptive.get('enabled', False):
+            return None
+        return cls(
+            f"{provider}|{model}", initial,
+            min_size=int(adaptive.get('min_batch_size', 1)),
+            max_size=adaptive.get('max_batch_size'),
+            target_latency=float(adaptive.get('target_latency', 30.0)),
+            increase=float(adaptive.get('increase', 1.0)),
+            decrease=float(adaptive.get('decrease', 0.5)),
+            path=adaptive.get('state_path', DEFAULT_STATE_PATH)
+        )
+
+    @property
+    def size(self) -> int:
+        """当前建议的批次大小"""
+        with self._lock:
+            return int(self._size)
+
+    def observe(self, batch_len: int, latency: Optional[float] = None,
+                completion_tokens: Optional[int] = None, max_tokens: Optional[int] = None,
+                truncated: bool = False, missing: int = 0, timed_out: bool = False) -> int:
+        """记录一个批次的结果，返回调整后的批次大小"""
+        if batch_len <= 0:
+            return self.size
+        with self._lock:
+            self.observations += 1
+            self._dirty = True
+            if completion_tokens and not truncated:
+                per_item = completion_tokens / batch_len
+                if self.tokens_per_item is None:
+                    self.tokens_per_item = per_item
+                else:
+                    self.tokens_per_item += TOKENS_EWMA_ALPHA * (per_item - self.tokens_per_item)
+
+            output_budget = max_tokens * RESPONSE_SAFETY_RATIO if max_tokens else None
+            if truncated:
+                # 该批次的输出放不下，下一次至少要比它小
+                self._size = min(self._size, batch_len * self.decrease)
+            elif timed_out or missing > batch_len * MISSING_TOLERANCE or (
+                    latency is not None and latency > self.target_latency):
+                self._size *= self.decrease
+            elif batch_len >= int(self._size) and not (
+                    output_budget and completion_tokens and completion_tokens > output_budget):
+                self._size += self.increase
+
+            if output_budget and self.tokens_per_item:
+                self._size = min(self._size, output_budget / self.tokens_per_item)
+            self._size = min(max(self._size, self.min_size), self.max_size)
+            return int(self._size)
+
+    def state(self) -> Dict:
+        with self._lock:
+            return {
+                "batch_size": round(self._size, 3),
+                "tokens_per_item": round(self.tokens_per_item, 3) if self.tokens_per_item else None,
+                "observations": self.observations,
+                "updated_at": datetime.now().isoformat()
+            }
+
+    def save(self):
+        """把当前状态写回状态文件（保留其他服务商和模型的条目），没有新的观测时不写"""
+        if self.path is None or not self._dirty:
+            return
+        with _state_lock:
+            state = _load_state(self.path)
+            state[self.key] = self.state()
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+
+_sizers: Dict[Tuple[str, str], AdaptiveBatchSizer] = {}
+_sizers_lock = threading.Lock()
+
+
+def sizer_for(provider: str, model: str, initial: int, settings: Dict) -> Optional[AdaptiveBatchSizer]:
+    """取得服务商和模型对应的共享批次大小控制器，未启用时返回 None"""
+    with _sizers_lock:
+        sizer = _sizers.get((provider, model))
+        if sizer is None:
+            sizer = AdaptiveBatchSizer.from_settings(provider, model, initial, settings)
+            if sizer is not None:
+                _sizers[(provider, model)] = sizer
+        return sizer
@@ -1,50 +1,364 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
-import json
+from typing import List, Dict, Any, Callable, Iterator, Optional, Tuple
+import queue
 import re
+import threading
+import time
+from src.config import Config
+from src.data.models import Bookmark
 from src.utils.logger import APILogger
+from src.clients.adaptive import sizer_for
+from src.clients.batching import (
+    FolderTreeBuilder, RESPONSE_SAFETY_RATIO, context_tokens_for, estimate_tokens, split_batches
+)
+from src.clients.cache import ClassificationCache
+from src.clients.dispatcher import BatchDispatcher, limiter_for
+from src.clients.json_salvage import CategoryStreamParser, salvage_categories
+from src.clients.prompt import compact_location, request_bookmarks
+from src.clients.resilience import RetryPolicy, breaker_for, call_with_retry
+from src.utils.url_utils import normalize_url
+
+# 提示词模板本身（说明与返回格式示例）大约占用的 token 数
+PROMPT_OVERHEAD_TOKENS = 200
+
+# 读取流式响应时检查取消和卡住的间隔（秒）
+STREAM_POLL_INTERVAL = 0.2
+
+# 提示词或响应格式变化时递增，使旧的缓存结果失效
+PROMPT_VERSION = "2"
+
+def _is_timeout(error: Exception) -> bool:
+    """是否为请求超时（各 SDK 的超时异常类名都包含 Timeout）"""
+    return isinstance(error, TimeoutError) or 'timeout' in type(error).__name__.lower()
 
 class BaseAIClient(ABC):
+    # 配置缺省时使用的默认值
+    default_model = ''
+    default_max_tokens = 2000
+    default_batch_size = 15
+    # 单次 API 调用的超时时间（秒）
+    default_timeout = 60.0
+    # 流式响应超过该时长没有新内容即视为卡住（秒）
+    default_stall_timeout = 20.0
+    # 实现了 _open_stream 和 _stream_text 的客户端设为 True
+    supports_stream = False
+    
     def __init__(self, name: str):
-        self.logger = APILogger(name)
+        self.name = name
+        config = Config()
+        self.logger = APILogger.from_settings(name, config.api_logging)
+        self.settings = config.api_settings.get(name) or {}
+        self.model = self.settings.get('model', self.default_model)
+        self.batch_size = max(1, int(self.settings.get('batch_size', self.default_batch_size)))
+        self.max_tokens = int(self.settings.get('max_tokens', self.default_max_tokens))
+        self.context_tokens = context_tokens_for(self.model, self.settings)
+        self.concurrency = max(1, int(self.settings.get('concurrency', 1)))
+        self.limiter = limiter_for(name, self.settings)
+        # 自适应批次大小：启用后按延迟、输出 token 和截断情况调整，取代固定的 batch_size
+        self.sizer = sizer_for(name, self.model, self.batch_size, self.settings)
+        self.cache = ClassificationCache.from_settings(config.cache)
+        self.timeout = float(self.settings.get('timeout', self.default_timeout))
+        self.retry_policy = RetryPolicy.from_settings(self.settings)
+        self.breaker = breaker_for(name, self.settings)
+        # 未分类书签重新提交的最大轮数
+        self.requeue_rounds = max(0, int(self.settings.get('requeue_rounds', 2)))
+        # 流式模式：每个分类一闭合就回调 on_category(分类, 书签列表)；
+        # 并发分批时回调可能来自多个线程
+        self.stream = bool(self.settings.get('stream', False))
+        if self.stream and not self.supports_stream:
+            print(f"{name} 客户端不支持流式响应，忽略 stream 配置")
+            self.stream = False
+        self.stall_timeout = float(self.settings.get('stall_timeout', self.default_stall_timeout))
+        self.on_category: Optional[Callable[[str, List[Dict]], None]] = None
     
     @abstractmethod
     def _call_api(self, prompt: str) -> Dict:
         """调用具体的 API"""
         pass
     
+    def _open_stream(self, prompt: str) -> Any:
+        """以流式方式调用 API，返回 SDK 的流对象；只在 supports_stream 为 True 时调用"""
+        raise NotImplementedError(f"{self.name} 客户端不支持流式响应")
+    
+    def _stream_text(self, stream: Any) -> Iterator[str]:
+        """从 SDK 的流对象中依次取出文本片段"""
+        raise NotImplementedError(f"{self.name} 客户端不支持流式响应")
+    
     def categorize_bookmarks(self, bookmarks: List[Dict]) -> List[Dict]:
-        """对书签进行分类和整理"""
+        """对书签进行分类和整理
+        
+        书签按 batch_size（启用自适应时为学到的批次大小）和 token 预算分批调用 API，
+        再把各批结果合并成一棵文件夹树；
+        没有得到分类的书签以减半的批次重新提交，最多 requeue_rounds 轮，
+        仍未分类的以原样附在结果后面。
+        """
+        builder = FolderTreeBuilder()
+        pending = bookmarks
+        
+        # 命中缓存的书签直接放入对应分类，只有未命中的才发送给 API
+        if self.cache is not None:
+            cached = self.cache.lookup(bookmarks, self.name, self.model, PROMPT_VERSION)
+            for index, category in cached.items():
+                builder.add(category, [Bookmark.coerce(bookmarks[index])])
+            pending = [bookmark for index, bookmark in enumerate(bookmarks) if index not in cached]
+            print(f"分类缓存命中 {len(cached)}/{len(bookmarks)}，未命中 {len(pending)}")
+        
+        # 核对每个书签恰好分类一次：响应中漏掉的书签（如响应被截断）缩小批次后重新提交；
+        # 调用本身失败的批次已经在重试层处理过，不再重新提交
+        unclassified = []
+        assignments = []
+        dispatcher = BatchDispatcher(self.concurrency, self.limiter)
+        batch_size = self.sizer.size if self.sizer is not None else self.batch_size
+        if len(pending) > batch_size:
+            print(f"共 {len(pending)} 个书签，批次大小 {batch_size}，并发数 {self.concurrency}")
+        
+        items = pending
+        for round_number in range(self.requeue_rounds + 1):
+            # 第一轮按自适应的批次大小分批，重新提交的轮次使用减半后的固定大小
+            completed = self._dispatch_batches(dispatcher, items, batch_size,
+                                               adaptive=round_number == 0)
+            
+            # 按批次顺序合并，结果与各批完成的先后无关
+            missing = []
+            for batch, result in completed:
+                if result is None:
+                    unclassified.extend(batch)
+                    continue
+                for index, bookmark in enumerate(batch):
+                    category = result.get(index)
+                    if category is None:
+                        missing.append(bookmark)
+                    else:
+                        builder.add(category, [Bookmark.coerce(bookmark)])
+                        assignments.append((bookmark, category))
+            
+            if not missing or round_number == self.requeue_rounds:
+                unclassified.extend(missing)
+                break
+            batch_size = max(1, max(len(batch) for batch, _ in completed) // 2)
+            items = missing
+            print(f"{len(missing)} 个书签未得到分类，按每批最多 {batch_size} 个重新提交")
+        
+        self._save_sizers()
+        
+        if self.cache is not None and assignments:
+            self.cache.store(assignments, self.name, self.model, PROMPT_VERSION)
+        
+        if not builder:
+            return bookmarks
+        return [builder.tree] + unclassified
+    
+    def _save_sizers(self):
+        """保存自适应批次大小的学习结果"""
+        if self.sizer is not None:
+            self.sizer.save()
+            print(f"{self.name}/{self.model} 自适应批次大小：{self.sizer.size}")
+    
+    def _dispatch_batches(self, dispatcher: BatchDispatcher, bookmarks: List[Dict], batch_size: int,
+                          adaptive: bool = False) -> List[Tuple[List[Dict], Optional[Dict[int, str]]]]:
+        """分批并发调用，返回 [(批次, 结果)]
+        
+        adaptive 且启用了自适应批次大小时，每次只切出 concurrency 个批次，
+        这些批次完成后再按调整过的大小切分剩下的书签。
+        """
+        completed = []
+        start = 0
+        while start < len(bookmarks):
+            if adaptive and self.sizer is not None:
+                size = self.sizer.size
+                chunk = bookmarks[start:start + size * self.concurrency]
+            else:
+                size = batch_size
+                chunk = bookmarks[start:]
+            batches = self._split_batches(chunk, size)
+            results = dispatcher.map(self._categorize_batch, batches,
+                                     [self._estimate_batch_tokens(batch) for batch in batches])
+            completed.extend(zip(batches, results))
+            start += len(chunk)
+        return completed
+    
+    def _split_batches(self, bookmarks: List[Dict], batch_size: int = None) -> List[List[Dict]]:
+        """按批次大小（默认为配置的 batch_size）与模型的 token 预算切分批次"""
+        response_budget = int(self.max_tokens * RESPONSE_SAFETY_RATIO)
+        prompt_budget = max(self.context_tokens - self.max_tokens - PROMPT_OVERHEAD_TOKENS, 1)
+        return split_batches(bookmarks, batch_size or self.batch_size, prompt_budget, response_budget,
+                             self._estimate_bookmark_tokens)
+    
+    def _estimate_bookmark_tokens(self, bookmark: Dict) -> Tuple[int, int]:
+        """估算单个书签在提示词和响应中占用的 token 数"""
+        prompt_tokens = (estimate_tokens(bookmark.get('title', ''))
+                         + estimate_tokens(compact_location(bookmark.get('url', ''))))
+        # 提示词中每行带编号和分隔符；响应中只有编号和逗号
+        return prompt_tokens + 4, 3
+    
+    def _estimate_batch_tokens(self, batch: List[Dict]) -> int:
+        """估算一个批次请求消耗的 token 数（提示词 + 响应），用于 tpm 限流"""
+        prompt_tokens = response_tokens = PROMPT_OVERHEAD_TOKENS
+        for bookmark in batch:
+            item_prompt, item_response = self._estimate_bookmark_tokens(bookmark)
+            prompt_tokens += item_prompt
+            response_tokens += item_response
+        return prompt_tokens + min(response_tokens, self.max_tokens)
+    
+    def _categorize_batch(self, bookmarks: List[Dict],
+                          cancel: Optional[threading.Event] = None) -> Optional[Dict[int, str]]:
+        """对单个批次调用 API，返回 {批次内下标: 分类路径}，调用失败时返回 None
+        
+        cancel 被设置后不再重试，流式读取也会提前结束；已经发出的非流式请求无法中断，结果会被丢弃。
+        """
+        started = time.monotonic()
+        
+        def attempt(func: Callable[[], Any]) -> Any:
+            # 只计最后一次尝试的用时，不含重试之间的退避等待
+            nonlocal started
+            started = time.monotonic()
+            return func()
+        
         try:
             # 构建提示词
             prompt = self._build_prompt(bookmarks)
             
-            # 调用 API
-            response = self._call_api(prompt)
+            # 调用 API：可重试的错误（限流、超时、5xx）按退避策略重试
+            if self.stream:
+                stream = call_with_retry(lambda: attempt(lambda: self._open_stream(prompt)),
+                                         self.retry_policy, self.breaker, cancel=cancel)
+                result, stalled, stream_stats = self._consume_stream(stream, bookmarks, cancel)
+                response = {"result": result, "stream": True, "stalled": stalled,
+                            "completion_tokens": stream_stats[0], "length_limited": stream_stats[1]}
+            else:
+                response = call_with_retry(lambda: attempt(lambda: self._call_api(prompt)),
+                                           self.retry_policy, self.breaker, cancel=cancel)
+                result = self._extract_response_data(response)
+            latency = time.monotonic() - started
+            
+            # 解析响应
+            assignments, complete = self._parse_with_status(result, bookmarks) if result else ({}, False)
             
-            # 记录 API 调用
+            # 把这一批的表现反馈给批次大小控制器；被取消的批次结果不完整，不计入
+            if self.sizer is not None and not (cancel is not None and cancel.is_set()):
+                completion_tokens, length_limited = (stream_stats if self.stream
+                                                     else self._completion_stats(response))
+                self.sizer.observe(len(bookmarks), latency, completion_tokens, self.max_tokens,
+                                   truncated=length_limited or (bool(result) and not complete),
+                                   missing=len(bookmarks) - len(assignments))
+            
+            # 记录 API 调用：书签带编号，解析后的结果为 分类 -> 编号列表
             self.logger.log_api_call(
-                request_data={"prompt": prompt},
-                response_data=response
+                request_data={"prompt": prompt, "bookmarks": request_bookmarks(bookmarks)},
+                response_data=response,
+                result=self._group_ids(assignments),
+                latency=latency
             )
-            
-            # 解析响应
-            result = self._extract_response_data(response)
-            if not result:
-                return bookmarks
-                
-            # 解析结果
-            organized_bookmarks = self._parse_response(result)
-            return organized_bookmarks if organized_bookmarks else bookmarks
+            return assignments
             
         except Exception as e:
             print(f"API 调用出错：{str(e)}")
+            # 超时说明批次可能过大，同样缩小批次
+            if self.sizer is not None and _is_timeout(e):
+                self.sizer.observe(len(bookmarks), time.monotonic() - started, timed_out=True)
+            # 出错的调用同样记录书签和用时，便于按 URL、域名排查
+            request_data = {"prompt": prompt} if 'prompt' in locals() else {}
+            request_data["bookmarks"] = request_bookmarks(bookmarks)
             self.logger.log_api_call(
-                request_data={"prompt": prompt} if 'prompt' in locals() else {},
+                request_data=request_data,
                 response_data={},
-                error=str(e)
+                error=str(e),
+                latency=time.monotonic() - started
             )
-            return bookmarks
+            return None
+    
+    def _completion_stats(self, response: Any) -> Tuple[Optional[int], bool]:
+        """从响应中取出 (输出 token 数, 是否因长度限制被截断)，无法取得时返回 (None, False)
+        
+        流式模式下对每个增量片段调用，输出 token 数取最后一次得到的值，任一片段被截断即视为截断。
+        """
+        return None, False
+    
+    def _consume_stream(self, stream: Any, bookmarks: List[Dict],
+                        cancel: Optional[threading.Event] = None
+                        ) -> Tuple[str, bool, Tuple[Optional[int], bool]]:
+        """读取流式响应，返回 (完整文本, 是否提前结束, (输出 token 数, 是否因长度限制被截断))
+        
+        token 用量和结束原因通常只出现在最后几个片段中，由 _completion_stats 从每个片段中取出。
+        
+        SDK 的流在后台线程中读取；超过 stall_timeout 秒没有新片段或 cancel 被设置时
+        关闭流并提前返回，已经闭合的分类照常使用，其余书签由 categorize_bookmarks 重新提交。
+        每个分类一闭合就通过 on_category 回调交给下游。
+        """
+        chunks: queue.Queue = queue.Queue()
+        stop = threading.Event()
+        stats = {'completion_tokens': None, 'length_limited': False}
+        
+        def observed(raw: Any) -> Iterator[Any]:
+            for chunk in raw:
+                completion_tokens, length_limited = self._completion_stats(chunk)
+                if completion_tokens is not None:
+                    stats['completion_tokens'] = completion_tokens
+                stats['length_limited'] = stats['length_limited'] or length_limited
+                yield chunk
+        
+        def pump():
+            try:
+                for text in self._stream_text(observed(stream)):
+                    if stop.is_set():
+                        break
+                    chunks.put(('chunk', text))
+                chunks.put(('end', None))
+            except Exception as e:
+                chunks.put(('error', e))
+        
+        threading.Thread(target=pump, daemon=True).start()
+        parser = CategoryStreamParser()
+        parts = []
+        stalled = False
+        last_chunk = time.monotonic()
+        while True:
+            if cancel is not None and cancel.is_set():
+                stalled = True
+                break
+            try:
+                # 分段等待，便于及时响应取消
+                kind, value = chunks.get(timeout=min(self.stall_timeout, STREAM_POLL_INTERVAL))
+            except queue.Empty:
+                if time.monotonic() - last_chunk >= self.stall_timeout:
+                    stalled = True
+                    print(f"流式响应超过 {self.stall_timeout:.0f} 秒没有新内容，提前结束")
+                    break
+                continue
+            last_chunk = time.monotonic()
+            if kind == 'end':
+                break
+            if kind == 'error':
+                print(f"流式响应中断：{str(value)}")
+                break
+            parts.append(value)
+            for category, items in parser.feed(value):
+                self._emit_category(category, items, bookmarks)
+        
+        stop.set()
+        close = getattr(stream, 'close', None)
+        if stalled and callable(close):
+            try:
+                close()
+            except Exception:
+                pass
+        return ''.join(parts), stalled, (stats['completion_tokens'], stats['length_limited'])
+    
+    def _emit_category(self, category: str, items: List, bookmarks: List[Dict]):
+        """把刚闭合的分类对应回书签后交给 on_category 回调"""
+        if self.on_category is None:
+            return
+        matched = self._assign_items({category: items}, bookmarks)
+        if matched:
+            self.on_category(category, [bookmarks[index] for index in sorted(matched)])
+    
+    @staticmethod
+    def _group_ids(assignments: Dict[int, str]) -> Dict[str, List[int]]:
+        """把 {下标: 分类} 转换为 {分类: [编号]}，编号从 1 开始"""
+        grouped: Dict[str, List[int]] = {}
+        for index, category in sorted(assignments.items()):
+            grouped.setdefault(category, []).append(index + 1)
+        return grouped
     
     @abstractmethod
     def _build_prompt(self, bookmarks: List[Dict]) -> str:
@@ -56,61 +370,54 @@ class BaseAIClient(ABC):
         """从响应中提取有效数据"""
         pass
     
-    def _parse_response(self, response_text: str) -> List[Dict]:
-        """解析响应文本为书签结构"""
+    def _parse_response(self, response_text: str, bookmarks: List[Dict]) -> Dict[int, str]:
+        """解析响应文本，返回 {批次内下标: 分类路径}
+        
+        响应格式为 {"分类": [编号, ...]}，编号从 1 开始；
+        也兼容旧格式 {"分类": [{"title": ..., "url": ...}]}，按 URL 对应回书签。
+        """
+        return self._parse_with_status(response_text, bookmarks)[0]
+    
+    def _parse_with_status(self, response_text: str, bookmarks: List[Dict]) -> Tuple[Dict[int, str], bool]:
+        """解析响应文本，返回 ({批次内下标: 分类路径}, 响应是否完整)"""
         try:
-            # 1. 清理响应文本
-            response_text = re.sub(r'```json\s*|\s*```', '', response_text)
+            # 1. 去掉说明文字后增量解析；响应被截断时保留所有已经闭合的分类
             response_text = re.sub(r'根据您提供的信息.*?JSON格式：', '', response_text, flags=re.DOTALL)
-            response_text = response_text.strip()
-            
-            # 2. 提取 JSON 部分
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if not json_match:
+            data, complete = salvage_categories(response_text)
+            if not data:
                 print("未找到有效的 JSON 结构")
-                return []
-            
-            json_text = json_match.group()
-            
-            # 3. 清理 JSON 文本
-            json_text = re.sub(r'\s+', ' ', json_text)  # 替换所有空白字符为单个空格
-            json_text = re.sub(r',\s*([}\]])', r'\1', json_text)  # 移除尾随逗号
-            
-            # 4. 解析 JSON
-            try:
-                data = json.loads(json_text)
-            except json.JSONDecodeError as je:
-                print(f"JSON 解析错误：{str(je)}")
-                print(f"错误位置：{je.pos}")
-                print(f"问题文本：{json_text[max(0, je.pos-50):min(len(json_text), je.pos+50)]}")
-                return []
+                return {}, False
+            if not complete:
+                print(f"响应不完整（可能超出 max_tokens），已取回 {len(data)} 个分类")
             
-            # 5. 转换为文件夹结构
-            result = {'folders': []}
-            for category, bookmarks in data.items():
-                # 分割分类路径
-                path_parts = category.split('/')
-                current_level = result['folders']
-                
-                # 创建或查找每一级文件夹
-                for i, part in enumerate(path_parts):
-                    folder = next((f for f in current_level if f['name'] == part), None)
-                    if not folder:
-                        folder = {
-                            'name': part,
-                            'bookmarks': [] if i == len(path_parts)-1 else [],
-                            'subfolders': [] if i < len(path_parts)-1 else []
-                        }
-                        current_level.append(folder)
-                    
-                    if i == len(path_parts)-1:
-                        folder['bookmarks'].extend(bookmarks)
-                    else:
-                        current_level = folder['subfolders']
-            
-            return [result]
+            # 2. 把编号对应回批次中的书签，同一书签只取第一次出现的分类
+            return self._assign_items(data, bookmarks), complete
                 
         except Exception as e:
             print(f"解析响应时出错：{str(e)}")
             print(f"原始响应：{response_text}")
-            return [] 
\ No newline at end of file
+            return {}, False
+    
+    def _assign_items(self, data: Dict, bookmarks: List[Dict]) -> Dict[int, str]:
+        """把 {分类: [编号或书签]} 对应到批次下标"""
+        url_index = {}
+        for index, bookmark in enumerate(bookmarks):
+            url_index.setdefault(normalize_url(bookmark.get('url', '')), index)
+        
+        assignments: Dict[int, str] = {}
+        if not isinstance(data, dict):
+            return assignments
+        for category, items in data.items():
+            if not isinstance(items, list):
+                continue
+            for item in items:
+                if isinstance(item, dict):
+                    index = url_index.get(normalize_url(str(item.get('url', ''))))
+                else:
+                    try:
+                        index = int(item) - 1
+                    except (TypeError, ValueError):
+                        continue
+                if index is not None and 0 <= index < len(bookmarks):
+                    assignments.setdefault(index, category)
+        return assignments
\ No newline at end of file
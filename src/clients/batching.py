@@ -0,0 +1,97 @@
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+import re
+from src.data.models import Bookmark, Folder
+
+# 中日韩字符大致按一个字符一个 token 估算，其余字符按 4 个字符一个 token 估算
+_CJK_CHARS = re.compile(r'[\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]')
+
+# 常见模型的上下文窗口（token），config.yaml 中的 context_tokens 优先
+MODEL_CONTEXT_TOKENS = {
+    'gpt-3.5-turbo': 16385,
+    'gpt-4o-mini': 128000,
+    'gpt-4o': 128000,
+    'ernie-speed': 8192,
+    'ernie-speed-128k': 128000,
+    'ernie-lite-8k': 8192,
+}
+DEFAULT_CONTEXT_TOKENS = 8192
+
+# 响应预算只使用 max_tokens 的一部分，给估算误差留出余量
+RESPONSE_SAFETY_RATIO = 0.8
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算文本的 token 数"""
+    if not text:
+        return 0
+    cjk = len(_CJK_CHARS.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def context_tokens_for(model: str, settings: Dict) -> int:
+    """模型的上下文窗口大小"""
+    if settings.get('context_tokens'):
+        return int(settings['context_tokens'])
+    return MODEL_CONTEXT_TOKENS.get(model, DEFAULT_CONTEXT_TOKENS)
+
+
+def split_batches(items: Sequence, batch_size: int, prompt_budget: int, response_budget: int,
+                  item_cost: Callable[[object], Tuple[int, int]]) -> List[List]:
+    """按数量上限和 token 预算把书签切分成批次
+
+    item_cost 返回单个书签在提示词和响应中预计占用的 token 数；
+    每批同时满足数量不超过 batch_size、提示词与响应 token 都不超过预算，
+    单个书签超出预算时独占一批。
+    """
+    batches = []
+    current = []
+    prompt_tokens = response_tokens = 0
+    for item in items:
+        item_prompt, item_response = item_cost(item)
+        if current and (len(current) >= batch_size
+                        or prompt_tokens + item_prompt > prompt_budget
+                        or response_tokens + item_response > response_budget):
+            batches.append(current)
+            current = []
+            prompt_tokens = response_tokens = 0
+        current.append(item)
+        prompt_tokens += item_prompt
+        response_tokens += item_response
+    if current:
+        batches.append(current)
+    return batches
+
+
+class FolderTreeBuilder:
+    """把 "分类/子分类" 路径和书签逐步合并成一棵文件夹树"""
+
+    def __init__(self):
+        self.folders: List[Folder] = []
+        # 路径元组 -> Folder，避免逐层线性查找同名文件夹
+        self._index: Dict[Tuple[str, ...], Folder] = {}
+
+    def folder_for(self, category: str) -> Folder:
+        """取得（必要时创建）分类路径对应的文件夹"""
+        parts = tuple(part.strip() for part in category.split('/') if part.strip()) or ('未分类',)
+        siblings = self.folders
+        folder = None
+        for depth in range(1, len(parts) + 1):
+            key = parts[:depth]
+            folder = self._index.get(key)
+            if folder is None:
+                folder = Folder(name=parts[depth - 1])
+                siblings.append(folder)
+                self._index[key] = folder
+            siblings = folder.subfolders
+        return folder
+
+    def add(self, category: str, bookmarks: Iterable[Bookmark]):
+        self.folder_for(category).bookmarks.extend(bookmarks)
+
+    @property
+    def tree(self) -> Dict:
+        return {'folders': self.folders}
+
+    def __bool__(self) -> bool:
+        return bool(self.folders)
+
@@ -0,0 +1,171 @@
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+import hashlib
+import sqlite3
+import time
+from src.config import DATA_DIR
+from src.utils.url_utils import normalize_url
+
+DEFAULT_CACHE_PATH = DATA_DIR / "cache" / "classifications.db"
+DEFAULT_MAX_ENTRIES = 200000
+
+# sqlite 单条语句的参数个数有上限，批量查询时分段进行
+_QUERY_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS classifications (
+    key TEXT PRIMARY KEY,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    url TEXT NOT NULL,
+    title TEXT NOT NULL,
+    category TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hit_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_classifications_last_used ON classifications (last_used);
+CREATE INDEX IF NOT EXISTS idx_classifications_url ON classifications (url);
+"""
+
+
+class ClassificationCache:
+    """书签分类结果的持久化缓存（sqlite）
+
+    键由规范化 URL、标题、服务商、模型和提示词版本共同决定，
+    任何一项变化都会视为未命中；值是分配到的分类路径（如 "技术/文档"）。
+    条目数超过 max_entries 时按最近使用时间淘汰。
+    """
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_CACHE_PATH,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.executescript(_SCHEMA)
+        # 本次运行的命中统计
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Dict]) -> Optional['ClassificationCache']:
+        """按 config.yaml 的 cache 配置创建缓存，未启用时返回 None"""
+        if not settings or not settings.get('enabled', False):
+            return None
+        return cls(settings.get('path', DEFAULT_CACHE_PATH),
+                   int(settings.get('max_entries', DEFAULT_MAX_ENTRIES)))
+
+    @staticmethod
+    def make_key(url: str, title: str, provider: str, model: str, prompt_version: str) -> str:
+        raw = '\0'.join((normalize_url(url), title.strip(), provider, model, prompt_version))
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def lookup(self, bookmarks: List[Dict], provider: str, model: str,
+               prompt_version: str) -> Dict[int, str]:
+        """批量查询，返回 {书签下标: 分类路径}，并更新命中统计"""
+        keys = [self.make_key(b.get('url', ''), b.get('title', ''), provider, model, prompt_version)
+                for b in bookmarks]
+        found: Dict[str, str] = {}
+        unique_keys = list(dict.fromkeys(keys))
+        for start in range(0, len(unique_keys), _QUERY_CHUNK):
+            chunk = unique_keys[start:start + _QUERY_CHUNK]
+            rows = self.conn.execute(
+                f"SELECT key, category FROM classifications WHERE key IN ({','.join('?' * len(chunk))})",
+                chunk
+            )
+            found.update(rows)
+
+        result = {index: found[key] for index, key in enumerate(keys) if key in found}
+        self.hits += len(result)
+        self.misses += len(keys) - len(result)
+
+        if found:
+            now = time.time()
+            with self.conn:
+                self.conn.executemany(
+                    "UPDATE classifications SET last_used = ?, hit_count = hit_count + 1 WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+        return result
+
+    def store(self, assignments: Iterable[Tuple[Dict, str]], provider: str, model: str,
+              prompt_version: str):
+        """写入 (书签, 分类路径) 列表，超出容量时淘汰最久未用的条目"""
+        now = time.time()
+        rows = [
+            (self.make_key(b.get('url', ''), b.get('title', ''), provider, model, prompt_version),
+             provider, model, prompt_version, normalize_url(b.get('url', '')), b.get('title', ''),
+             category, now, now)
+            for b, category in assignments
+        ]
+        if not rows:
+            return
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO classifications "
+                "(key, provider, model, prompt_version, url, title, category, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        self.evict()
+
+    def evict(self, max_entries: Optional[int] = None) -> int:
+        """淘汰最久未使用的条目，使总数不超过 max_entries，返回删除的条数"""
+        limit = self.max_entries if max_entries is None else max_entries
+        excess = len(self) - limit
+        if excess <= 0:
+            return 0
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM classifications WHERE key IN "
+                "(SELECT key FROM classifications ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+        return excess
+
+    def invalidate(self, provider: Optional[str] = None, model: Optional[str] = None,
+                   url: Optional[str] = None, prompt_version: Optional[str] = None,
+                   older_than: Optional[float] = None) -> int:
+        """按条件删除缓存条目，不给条件时清空全部，返回删除的条数"""
+        conditions, params = [], []
+        for column, value in (('provider', provider), ('model', model), ('prompt_version', prompt_version)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if url is not None:
+            conditions.append("url = ?")
+            params.append(normalize_url(url))
+        if older_than is not None:
+            conditions.append("created_at < ?")
+            params.append(older_than)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+        with self.conn:
+            cursor = self.conn.execute(f"DELETE FROM classifications{where}", params)
+        return cursor.rowcount
+
+    def stats(self) -> Dict:
+        """缓存统计：条目数、累计命中次数和按服务商/模型的分布"""
+        total, total_hits = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(hit_count), 0) FROM classifications"
+        ).fetchone()
+        groups = self.conn.execute(
+            "SELECT provider, model, prompt_version, COUNT(*) FROM classifications "
+            "GROUP BY provider, model, prompt_version ORDER BY provider, model"
+        ).fetchall()
+        return {
+            'entries': total,
+            'total_hits': total_hits,
+            'max_entries': self.max_entries,
+            'groups': [
+                {'provider': p, 'model': m, 'prompt_version': v, 'entries': c}
+                for p, m, v, c in groups
+            ]
+        }
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM classifications").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
@@ -1,20 +1,30 @@
 from openai import OpenAI
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import os
 from dotenv import load_dotenv
 from src.clients.base_client import BaseAIClient
+from src.clients.prompt import build_classification_prompt
 
 class ChatGPTClient(BaseAIClient):
-    def __init__(self):
+    default_model = "gpt-3.5-turbo"
+    supports_stream = True
+    
+    def __init__(self, base_url: Optional[str] = None):
         super().__init__("chatgpt")
         load_dotenv()
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        # 重试由 BaseAIClient 统一处理，SDK 内部不再重试
+        self.client = OpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            base_url=base_url or self.settings.get('base_url') or os.getenv("OPENAI_BASE_URL"),
+            timeout=self.timeout,
+            max_retries=0
+        )
     
-    def _call_api(self, prompt: str) -> Dict:
-        """调用 ChatGPT API"""
-        response = self.client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
+    def _request_kwargs(self, prompt: str) -> Dict:
+        """构建请求参数"""
+        return {
+            "model": self.model,
+            "messages": [
                 {
                     "role": "system",
                     "content": "你是一个专业的书签整理助手，擅长对网页书签进行分类和组织。"
@@ -24,41 +34,38 @@ class ChatGPTClient(BaseAIClient):
                     "content": prompt
                 }
             ],
-            temperature=0.1,
-            max_tokens=2000
-        )
+            "temperature": self.settings.get('temperature', 0.1),
+            "max_tokens": self.max_tokens
+        }
+    
+    def _call_api(self, prompt: str) -> Dict:
+        """调用 ChatGPT API"""
+        response = self.client.chat.completions.create(**self._request_kwargs(prompt))
         return response
     
+    def _open_stream(self, prompt: str) -> Any:
+        """以流式方式调用 ChatGPT API"""
+        # 最后一个片段附带 token 用量，供自适应批次大小使用
+        return self.client.chat.completions.create(stream=True, stream_options={"include_usage": True},
+                                                   **self._request_kwargs(prompt))
+    
+    def _stream_text(self, stream: Any) -> Iterator[str]:
+        """取出每个增量片段中的文本"""
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
     def _build_prompt(self, bookmarks: List[Dict]) -> str:
         """构建发送给 ChatGPT 的提示词"""
-        bookmark_texts = []
-        for bookmark in bookmarks:
-            title = bookmark.get('title', '')
-            url = bookmark.get('url', '')
-            bookmark_texts.append(f"标题: {title}\n网址: {url}")
-        
-        prompt = '''请将以下书签按类别整理，直接返回JSON格式，不要包含任何其他内容。
-
-书签列表：
-{0}
-
-返回格式：
-{{
-    "技术/文档": [
-        {{"title": "原始标题", "url": "原始URL"}}
-    ],
-    "技术/工具": [
-        {{"title": "原始标题", "url": "原始URL"}}
-    ]
-}}
-
-注意：
-1. 保持原始标题和URL不变
-2. 使用"/"分隔的路径表示层级，如"技术/文档"
-3. 确保URL完整，不要截断
-4. 不要包含任何其他内容'''.format("\n".join(bookmark_texts))
-        
-        return prompt
+        return build_classification_prompt(bookmarks)
+    
+    def _completion_stats(self, response: Any) -> Tuple[Optional[int], bool]:
+        """输出 token 数取自 usage，finish_reason 为 length 表示被 max_tokens 截断"""
+        usage = getattr(response, 'usage', None)
+        completion_tokens = getattr(usage, 'completion_tokens', None)
+        choices = getattr(response, 'choices', None) or []
+        truncated = bool(choices) and getattr(choices[0], 'finish_reason', None) == 'length'
+        return (completion_tokens if isinstance(completion_tokens, int) else None), truncated
     
     def _extract_response_data(self, response: Any) -> str:
         """从响应对象中提取有用的数据"""
@@ -0,0 +1,103 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence
+import threading
+import time
+
+
+class TokenBucket:
+    """令牌桶限流器（线程安全）
+
+    每分钟补充 rate_per_minute 个令牌，桶容量默认等于一分钟的配额；
+    acquire 在令牌不足时阻塞等待，单次申请超过容量时按容量计算，避免永远等不到。
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity else float(rate_per_minute)
+        self.tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount: float = 1) -> float:
+        """取出 amount 个令牌，返回等待的秒数"""
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                delay = (amount - self.tokens) / self.rate
+            self._sleep(delay)
+            waited += delay
+
+
+class RateLimiter:
+    """按每分钟请求数（rpm）和每分钟 token 数（tpm）限流，未配置的维度不限制"""
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None, **kwargs):
+        self.requests = TokenBucket(rpm, **kwargs) if rpm else None
+        self.tokens = TokenBucket(tpm, **kwargs) if tpm else None
+
+    def acquire(self, tokens: int = 0) -> float:
+        """在发出一次请求前调用，返回等待的秒数"""
+        waited = 0.0
+        if self.requests:
+            waited += self.requests.acquire(1)
+        if self.tokens and tokens:
+            waited += self.tokens.acquire(tokens)
+        return waited
+
+
+# 同一服务商的所有客户端实例共用一个限流器，配额是按账号计算的
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def limiter_for(provider: str, settings: Dict) -> RateLimiter:
+    """取得服务商对应的共享限流器"""
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            limiter = RateLimiter(settings.get('rpm'), settings.get('tpm'))
+            _limiters[provider] = limiter
+        return limiter
+
+
+class BatchDispatcher:
+    """并发执行批次调用
+
+    用线程池同时发出最多 concurrency 个请求，每个请求发出前先经过限流器；
+    结果按批次的输入顺序返回，与完成先后无关，合并结果因此是确定的。
+    """
+
+    def __init__(self, concurrency: int = 1, limiter: Optional[RateLimiter] = None):
+        self.concurrency = max(1, int(concurrency))
+        self.limiter = limiter or RateLimiter()
+
+    def map(self, func: Callable[[List], List], batches: Sequence[List],
+            costs: Optional[Sequence[int]] = None) -> List:
+        """对每个批次调用 func，返回与 batches 顺序一致的结果列表
+
+        costs 是每个批次预计消耗的 token 数，用于 tpm 限流。
+        """
+        costs = costs or [0] * len(batches)
+
+        def run(index: int):
+            self.limiter.acquire(costs[index])
+            return func(batches[index])
+
+        if self.concurrency == 1 or len(batches) <= 1:
+            return [run(index) for index in range(len(batches))]
+
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(batches))) as executor:
+            return list(executor.map(run, range(len(batches))))
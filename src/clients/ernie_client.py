@@ -1,10 +1,14 @@
 import qianfan
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import os
 from dotenv import load_dotenv
 from src.clients.base_client import BaseAIClient
+from src.clients.prompt import build_classification_prompt
 
 class ErnieClient(BaseAIClient):
+    default_model = "ernie-speed"
+    supports_stream = True
+    
     def __init__(self):
         super().__init__("ernie")
         load_dotenv()
@@ -13,8 +17,8 @@ class ErnieClient(BaseAIClient):
             sk=os.getenv("QIANFAN_SK")
         )
     
-    def _call_api(self, prompt: str) -> Dict:
-        """调用文心一言 API"""
+    def _request_data(self, prompt: str) -> Dict:
+        """构建请求参数"""
         request_data = {
             "messages": [
                 {
@@ -22,43 +26,45 @@ class ErnieClient(BaseAIClient):
                     "content": prompt
                 }
             ],
-            "model": "ernie-speed",
-            "temperature": 0.1,
-            "top_p": 0.95
+            "model": self.model,
+            "temperature": self.settings.get('temperature', 0.1),
+            "top_p": self.settings.get('top_p', 0.95),
+            # 重试由 BaseAIClient 统一处理，SDK 只发一次请求
+            "retry_count": 1,
+            "request_timeout": self.timeout
         }
-        
-        return self.client.do(**request_data)
+        if 'max_tokens' in self.settings:
+            request_data["max_output_tokens"] = self.max_tokens
+        return request_data
+    
+    def _call_api(self, prompt: str) -> Dict:
+        """调用文心一言 API"""
+        return self.client.do(**self._request_data(prompt))
+    
+    def _open_stream(self, prompt: str) -> Any:
+        """以流式方式调用文心一言 API"""
+        return self.client.do(stream=True, **self._request_data(prompt))
+    
+    def _stream_text(self, stream: Any) -> Iterator[str]:
+        """取出每个增量响应中的文本"""
+        for response in stream:
+            body = response.body if hasattr(response, 'body') else response
+            text = body.get("result", "") if isinstance(body, dict) else ""
+            if text:
+                yield text
     
     def _build_prompt(self, bookmarks: List[Dict]) -> str:
         """构建发送给文心一言的提示词"""
-        bookmark_texts = []
-        for bookmark in bookmarks:
-            title = bookmark.get('title', '')
-            url = bookmark.get('url', '')
-            bookmark_texts.append(f"标题: {title}\n网址: {url}")
-        
-        prompt = '''请将以下书签按类别整理，直接返回JSON格式，不要包含任何其他内容。
-
-书签列表：
-{0}
-
-返回格式：
-{{
-    "技术/文档": [
-        {{"title": "原始标题", "url": "原始URL"}}
-    ],
-    "技术/工具": [
-        {{"title": "原始标题", "url": "原始URL"}}
-    ]
-}}
-
-注意：
-1. 保持原始标题和URL不变
-2. 使用"/"分隔的路径表示层级，如"技术/文档"
-3. 确保URL完整，不要截断
-4. 不要包含任何其他内容'''.format("\n".join(bookmark_texts))
-        
-        return prompt
+        return build_classification_prompt(bookmarks)
+    
+    def _completion_stats(self, response: Any) -> Tuple[Optional[int], bool]:
+        """输出 token 数取自 usage，is_truncated 或 finish_reason 为 length 表示输出被截断"""
+        body = response.body if hasattr(response, 'body') else response
+        if not isinstance(body, dict):
+            return None, False
+        completion_tokens = (body.get("usage") or {}).get("completion_tokens")
+        truncated = bool(body.get("is_truncated")) or body.get("finish_reason") == "length"
+        return (completion_tokens if isinstance(completion_tokens, int) else None), truncated
     
     def _extract_response_data(self, response: Any) -> str:
         """从响应对象中提取有用的数据"""
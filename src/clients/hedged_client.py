@@ -0,0 +1,163 @@
+from collections import deque
+from typing import Any, Dict, List, Optional
+import queue
+import threading
+import time
+from src.clients.base_client import BaseAIClient
+
+# 每个服务商保留的最近延迟样本数
+LATENCY_WINDOW = 200
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """取样本的分位数（最近秩法）"""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+class HedgedClient(BaseAIClient):
+    """对冲请求客户端：组合主、备两个服务商
+
+    每个批次先发给主服务商；主服务商用时超过其历史延迟的指定分位数后，
+    再向备用服务商发出一份相同的请求，先返回有效结果的一方获胜，另一方被取消。
+    某个服务商的熔断器打开时，全部流量转到另一方；主服务商调用失败时立即转到备用服务商。
+    """
+
+    def __init__(self, primary: BaseAIClient, secondary: BaseAIClient):
+        super().__init__("hedged")
+        self.primary = primary
+        self.secondary = secondary
+        self.hedge_percentile = float(self.settings.get('hedge_percentile', 0.95))
+        self.min_samples = int(self.settings.get('min_samples', 10))
+        # 延迟样本不足时使用的对冲等待时间（秒）
+        self.hedge_after = float(self.settings.get('hedge_after', 15.0))
+
+        # 批次大小和 token 预算取两者中较小的一方，保证同一批次可以发给任意一方
+        self.batch_size = min(primary.batch_size, secondary.batch_size)
+        self.max_tokens = min(primary.max_tokens, secondary.max_tokens)
+        self.context_tokens = min(primary.context_tokens, secondary.context_tokens)
+        self.model = f"{primary.model}|{secondary.model}"
+        if 'concurrency' not in self.settings:
+            self.concurrency = primary.concurrency
+
+        self._lock = threading.Lock()
+        self._latencies = {client.name: deque(maxlen=LATENCY_WINDOW) for client in (primary, secondary)}
+        self.stats = {
+            client.name: {'calls': 0, 'hedges': 0, 'failovers': 0, 'wins': 0, 'failures': 0, 'cancelled': 0}
+            for client in (primary, secondary)
+        }
+
+    # 两个服务商使用相同的提示词协议，以下方法只在直接调用时使用主服务商的实现
+
+    def _build_prompt(self, bookmarks: List[Dict]) -> str:
+        """构建提示词"""
+        return self.primary._build_prompt(bookmarks)
+
+    def _call_api(self, prompt: str) -> Dict:
+        """调用主服务商 API"""
+        return self.primary._call_api(prompt)
+
+    def _extract_response_data(self, response: Any) -> str:
+        """从响应中提取有效数据"""
+        return self.primary._extract_response_data(response)
+
+    def _save_sizers(self):
+        """实际发出请求的是主、备服务商，保存它们各自的批次大小"""
+        self.primary._save_sizers()
+        self.secondary._save_sizers()
+
+    def hedge_delay(self, client: BaseAIClient) -> float:
+        """发出对冲请求前等待的秒数：该服务商延迟的分位数，样本不足时使用 hedge_after"""
+        with self._lock:
+            samples = list(self._latencies[client.name])
+        if len(samples) < self.min_samples:
+            return self.hedge_after
+        return percentile(samples, self.hedge_percentile)
+
+    def _record(self, client: BaseAIClient, key: str, latency: Optional[float] = None):
+        with self._lock:
+            self.stats[client.name][key] += 1
+            if latency is not None:
+                self._latencies[client.name].append(latency)
+
+    def _categorize_batch(self, bookmarks: List[Dict],
+                          cancel: Optional[threading.Event] = None) -> Optional[Dict[int, str]]:
+        """向主服务商发出请求，必要时对冲或转移到备用服务商，返回最先得到的有效结果"""
+        primary, secondary = self.primary, self.secondary
+        if primary.breaker.is_open and not secondary.breaker.is_open:
+            primary, secondary = secondary, primary
+            self._record(primary, 'failovers')
+        secondary_available = not secondary.breaker.is_open
+
+        results: queue.Queue = queue.Queue()
+        cancels: List[tuple] = []
+        finished = set()
+
+        def launch(client: BaseAIClient):
+            event = threading.Event()
+            start = time.monotonic()
+            cancels.append((client, event, start))
+            self._record(client, 'calls')
+
+            def run():
+                try:
+                    client.limiter.acquire(client._estimate_batch_tokens(bookmarks))
+                    result = client._categorize_batch(bookmarks, cancel=event)
+                except Exception as e:
+                    print(f"{client.name} 调用出错：{str(e)}")
+                    result = None
+                results.put((client, result, time.monotonic() - start))
+
+            threading.Thread(target=run, daemon=True).start()
+
+        launch(primary)
+        pending = 1
+        hedged = False
+        fallback = None
+        while pending:
+            wait = self.hedge_delay(primary) if not hedged and secondary_available else None
+            try:
+                client, result, elapsed = results.get(timeout=wait)
+            except queue.Empty:
+                # 主服务商超过延迟阈值仍未返回，发出对冲请求
+                hedged = True
+                self._record(secondary, 'hedges')
+                launch(secondary)
+                pending += 1
+                continue
+            pending -= 1
+            finished.add(client.name)
+
+            if result:
+                self._record(client, 'wins', elapsed)
+                for other, event, start in cancels:
+                    if other.name not in finished:
+                        event.set()
+                        # 被取消一方的用时至少为已经等待的时间，作为下限计入延迟样本；
+                        # 否则样本中只剩较快的调用，分位数逐渐变小，对冲越来越频繁
+                        self._record(other, 'cancelled', time.monotonic() - start)
+                return result
+
+            self._record(client, 'failures', elapsed)
+            if result is not None:
+                fallback = result
+            # 主服务商失败且尚未对冲：立即转到备用服务商
+            if not hedged and secondary_available:
+                hedged = True
+                self._record(secondary, 'failovers')
+                launch(secondary)
+                pending += 1
+        return fallback
+
+    def hedge_report(self) -> Dict[str, Dict]:
+        """每个服务商的调用、对冲、获胜、失败和被取消次数，以及延迟分位数"""
+        report = {}
+        with self._lock:
+            for name, stats in self.stats.items():
+                samples = list(self._latencies[name])
+                report[name] = dict(stats)
+                if samples:
+                    report[name]['p50'] = round(percentile(samples, 0.5), 3)
+                    report[name]['p95'] = round(percentile(samples, 0.95), 3)
+        return report
@@ -0,0 +1,165 @@
+from typing import Any, Dict, List, Tuple
+import json
+import re
+
+_TRAILING_COMMA = re.compile(r',\s*([}\]])')
+
+
+def _loads(text: str) -> Any:
+    """解析单个 JSON 值，容忍尾随逗号"""
+    return json.loads(_TRAILING_COMMA.sub(r'\1', text))
+
+
+def _flatten(category: str, value: Any) -> List[Tuple[str, list]]:
+    """把嵌套的 {"技术": {"文档": [...]}} 展开为 ("技术/文档", [...])"""
+    if isinstance(value, list):
+        return [(category, value)]
+    if isinstance(value, dict):
+        entries = []
+        for key, sub_value in value.items():
+            entries.extend(_flatten(f"{category}/{key}", sub_value))
+        return entries
+    return []
+
+
+class CategoryStreamParser:
+    """增量解析 {"分类": [...], ...} 形式的响应
+
+    文本可以分多次 feed，每当一个顶层 "分类": [...] 条目的列表闭合就立即返回该条目；
+    前面的说明文字和 ```json 代码块标记会被跳过。响应被截断时，已经闭合的分类全部保留，
+    close() 还会从未闭合的列表中取出已经完整写出的元素（最后一个可能被截断的元素除外）。
+    """
+
+    def __init__(self):
+        self._buffer = ''
+        self._pos = 0
+        # seek: 寻找最外层 "{"；key: 等待键；colon: 等待冒号；value: 读取值；
+        # after: 值已闭合，等待逗号或 "}"；done: 对象已结束
+        self._state = 'seek'
+        self._key = None
+        self._key_start = 0
+        self._value_start = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self.entries: List[Tuple[str, list]] = []
+        # 最外层对象是否已经完整闭合
+        self.complete = False
+
+    def feed(self, text: str) -> List[Tuple[str, list]]:
+        """追加一段文本，返回这段文本中新闭合的 (分类, 列表) 条目"""
+        self._buffer += text
+        completed = []
+        buffer = self._buffer
+        pos = self._pos
+        while pos < len(buffer) and self._state != 'done':
+            char = buffer[pos]
+            state = self._state
+
+            if state == 'seek':
+                if char == '{':
+                    self._state = 'key'
+            elif state == 'key':
+                if self._in_string:
+                    if self._escape:
+                        self._escape = False
+                    elif char == '\\':
+                        self._escape = True
+                    elif char == '"':
+                        self._in_string = False
+                        try:
+                            self._key = json.loads(buffer[self._key_start:pos + 1])
+                        except ValueError:
+                            self._key = buffer[self._key_start + 1:pos]
+                        self._state = 'colon'
+                elif char == '"':
+                    self._in_string = True
+                    self._key_start = pos
+                elif char == '}':
+                    self._state = 'done'
+                    self.complete = True
+            elif state == 'colon':
+                if char == ':':
+                    self._state = 'value'
+                    self._value_start = pos + 1
+                    self._depth = 0
+            elif state == 'value':
+                if self._in_string:
+                    if self._escape:
+                        self._escape = False
+                    elif char == '\\':
+                        self._escape = True
+                    elif char == '"':
+                        self._in_string = False
+                elif char == '"':
+                    self._in_string = True
+                elif char in '[{':
+                    self._depth += 1
+                elif char in ']}' and self._depth > 0:
+                    self._depth -= 1
+                    if self._depth == 0:
+                        # 列表或对象闭合即可使用，不必等后面的逗号
+                        completed.extend(self._finish_value(buffer[self._value_start:pos + 1]))
+                        self._state = 'after'
+                elif self._depth == 0 and char in ',}':
+                    completed.extend(self._finish_value(buffer[self._value_start:pos]))
+                    if char == ',':
+                        self._state = 'key'
+                    else:
+                        self._state = 'done'
+                        self.complete = True
+            elif state == 'after':
+                if char == ',':
+                    self._state = 'key'
+                elif char == '}':
+                    self._state = 'done'
+                    self.complete = True
+            pos += 1
+
+        self._pos = pos
+        self.entries.extend(completed)
+        return completed
+
+    def _finish_value(self, text: str) -> List[Tuple[str, list]]:
+        try:
+            return _flatten(self._key, _loads(text))
+        except ValueError:
+            return []
+
+    def close(self) -> List[Tuple[str, list]]:
+        """文本结束：尽量取回被截断的最后一个分类中已经完整的元素"""
+        salvaged = []
+        if self._state == 'value':
+            text = self._buffer[self._value_start:].strip()
+            try:
+                # 值本身已经完整，只是后面的 "," 或 "}" 没有写出
+                salvaged = _flatten(self._key, _loads(text))
+            except ValueError:
+                pass
+            if not salvaged and text.startswith('[') and '{' not in text and '[' not in text[1:]:
+                # 只处理由数字或字符串组成的列表；最后一个逗号之后的内容可能不完整，丢弃
+                head = text[1:].rsplit(',', 1)[0] if ',' in text else ''
+                try:
+                    items = _loads(f"[{head}]")
+                except ValueError:
+                    items = []
+                if items:
+                    salvaged = [(self._key, items)]
+        self._state = 'done'
+        self.entries.extend(salvaged)
+        return salvaged
+
+
+def salvage_categories(text: str) -> Tuple[Dict[str, list], bool]:
+    """从（可能被截断的）响应文本中取出所有可用的分类
+
+    返回 (分类 -> 列表, 响应是否完整)；同名分类的列表会合并。
+    """
+    parser = CategoryStreamParser()
+    parser.feed(text)
+    complete = parser.complete
+    parser.close()
+    categories: Dict[str, list] = {}
+    for category, items in parser.entries:
+        categories.setdefault(category, []).extend(items)
+    return categories, complete
@@ -0,0 +1,56 @@
+from typing import Dict, List
+from urllib.parse import urlsplit
+
+# 提示词中标题和路径的截断长度，分类只需要大意，不需要完整内容
+MAX_TITLE_CHARS = 80
+MAX_PATH_SEGMENTS = 2
+MAX_SEGMENT_CHARS = 24
+
+CLASSIFICATION_PROMPT = '''请将以下书签按类别整理，直接返回JSON格式，不要包含任何其他内容。
+
+书签列表（每行格式为：编号. 标题 | 网站/路径）：
+{0}
+
+返回格式（分类路径 -> 书签编号列表）：
+{{"技术/文档": [1, 3], "技术/工具": [2]}}
+
+注意：
+1. 只返回书签编号，不要返回标题或网址
+2. 每个编号只出现一次，所有编号都要归入某个分类
+3. 使用"/"分隔的路径表示层级，如"技术/文档"
+4. 不要包含任何其他内容'''
+
+
+def compact_location(url: str) -> str:
+    """把 URL 压缩为 "域名/前两级路径"，去掉协议、www、查询参数和锚点"""
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url[:MAX_TITLE_CHARS]
+    host = parts.netloc.lower()
+    if not host:
+        return url[:MAX_TITLE_CHARS]
+    if host.startswith('www.'):
+        host = host[4:]
+    segments = [segment[:MAX_SEGMENT_CHARS] for segment in parts.path.split('/') if segment]
+    return '/'.join([host] + segments[:MAX_PATH_SEGMENTS])
+
+
+def format_bookmark_line(bookmark_id: int, bookmark: Dict) -> str:
+    """生成提示词中的一行：编号. 标题 | 网站/路径"""
+    title = ' '.join(str(bookmark.get('title', '')).split())[:MAX_TITLE_CHARS]
+    return f"{bookmark_id}. {title} | {compact_location(bookmark.get('url', ''))}"
+
+
+def build_classification_prompt(bookmarks: List[Dict]) -> str:
+    """构建按编号分类的提示词，编号从 1 开始，对应书签在批次中的位置"""
+    lines = [format_bookmark_line(index, bookmark) for index, bookmark in enumerate(bookmarks, 1)]
+    return CLASSIFICATION_PROMPT.format("\n".join(lines))
+
+
+def request_bookmarks(bookmarks: List[Dict]) -> List[Dict]:
+    """记录到日志中的书签列表（带编号），用于之后把分类结果对应回书签"""
+    return [
+        {'id': index, 'title': bookmark.get('title', ''), 'url': bookmark.get('url', '')}
+        for index, bookmark in enumerate(bookmarks, 1)
+    ]
@@ -0,0 +1,208 @@
+from typing import Callable, Dict, Optional, Tuple
+import random
+import socket
+import threading
+import time
+
+# 千帆可以重试的错误码：服务不可用、负载过高、QPS/RPM/TPM 限流
+QIANFAN_RETRYABLE_CODES = {2, 4, 18, 336000, 336100, 336501, 336502}
+
+# 可以重试的 HTTP 状态码
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，暂停向该服务商发出请求"""
+
+
+class CallCancelledError(Exception):
+    """调用已被取消（例如对冲请求中另一方已经先返回）"""
+
+
+def _retry_after_seconds(headers) -> Optional[float]:
+    """解析 Retry-After / retry-after-ms 响应头，只支持秒数形式"""
+    if not headers:
+        return None
+    try:
+        value = headers.get('retry-after-ms')
+        if value is not None:
+            return float(value) / 1000
+        value = headers.get('retry-after')
+        if value is not None:
+            return float(value)
+    except (TypeError, ValueError):
+        return None
+    return None
+
+
+def classify_error(error: Exception) -> Tuple[bool, Optional[float]]:
+    """判断错误是否值得重试，返回 (是否可重试, 服务端要求的等待秒数)"""
+    # openai：根据状态码判断，超时和连接错误没有状态码
+    status_code = getattr(error, 'status_code', None)
+    if status_code is not None:
+        response = getattr(error, 'response', None)
+        retry_after = _retry_after_seconds(getattr(response, 'headers', None))
+        return status_code in RETRYABLE_STATUS_CODES, retry_after
+
+    # 千帆：API 错误带错误码，请求超时和网络错误可以重试
+    error_code = getattr(error, 'error_code', None)
+    if error_code is not None:
+        return error_code in QIANFAN_RETRYABLE_CODES, None
+
+    name = type(error).__name__
+    if name in ('APITimeoutError', 'APIConnectionError', 'RequestTimeoutError', 'RequestError'):
+        return True, None
+    if isinstance(error, (TimeoutError, ConnectionError, socket.timeout)):
+        return True, None
+    return False, None
+
+
+class RetryPolicy:
+    """带随机抖动的指数退避
+
+    第 n 次重试前等待 [0, min(max_delay, base_delay * 2^n)] 之间的随机时长（full jitter），
+    服务端给出 Retry-After 时至少等待该时长。
+    """
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 1.0, max_delay: float = 30.0,
+                 rng: Optional[random.Random] = None):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._rng = rng or random.Random()
+
+    @classmethod
+    def from_settings(cls, settings: Dict) -> 'RetryPolicy':
+        retry = settings.get('retry') or {}
+        return cls(
+            max_attempts=int(retry.get('max_attempts', 4)),
+            base_delay=float(retry.get('base_delay', 1.0)),
+            max_delay=float(retry.get('max_delay', 30.0))
+        )
+
+    def delay_for(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """第 attempt 次失败（从 1 开始）后应等待的秒数"""
+        delay = self._rng.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+
+class CircuitBreaker:
+    """熔断器（线程安全）
+
+    连续失败达到 failure_threshold 次后打开，reset_timeout 秒内直接拒绝请求；
+    之后进入半开状态，只放行一个试探请求，成功则关闭，失败则重新打开。
+    """
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def is_open(self) -> bool:
+        """熔断器是否处于打开状态且尚未到达重试时间（只查询，不占用半开试探名额）"""
+        with self._lock:
+            return self.state == self.OPEN and self._clock() - self._opened_at < self.reset_timeout
+
+    def allow(self) -> bool:
+        """是否允许发出请求"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if self._clock() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    return False
+                self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def release_probe(self):
+        """结果既不算成功也不算失败时释放半开试探名额，不改变状态和失败计数"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = self._clock()
+                self._probing = False
+
+
+# 同一服务商的客户端共用熔断器
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(provider: str, settings: Dict) -> CircuitBreaker:
+    """取得服务商对应的共享熔断器"""
+    with _breakers_lock:
+        breaker = _breakers.get(provider)
+        if breaker is None:
+            circuit = settings.get('circuit_breaker') or {}
+            breaker = CircuitBreaker(
+                failure_threshold=int(circuit.get('failure_threshold', 5)),
+                reset_timeout=float(circuit.get('reset_timeout', 60.0))
+            )
+            _breakers[provider] = breaker
+        return breaker
+
+
+def call_with_retry(func: Callable[[], object], policy: RetryPolicy,
+                    breaker: Optional[CircuitBreaker] = None,
+                    sleep: Callable[[float], None] = time.sleep,
+                    cancel: Optional[threading.Event] = None):
+    """调用 func，可重试的错误按退避策略重试，不可重试的错误立即抛出
+
+    熔断器打开时抛出 CircuitOpenError；重试次数用完后抛出最后一次的错误；
+    cancel 被设置后不再发起新的尝试，抛出 CallCancelledError。
+    """
+    attempt = 0
+    while True:
+        if cancel is not None and cancel.is_set():
+            raise CallCancelledError("调用已取消")
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError("服务连续失败，熔断器已打开，暂停请求")
+        attempt += 1
+        try:
+            result = func()
+        except Exception as e:
+            retryable, retry_after = classify_error(e)
+            # 不可重试的错误（参数错误、鉴权失败等）说明请求本身有问题，既不计入故障，
+            # 也不能证明服务已恢复，熔断器保持原状，只归还半开试探名额
+            if breaker is not None:
+                if retryable:
+                    breaker.record_failure()
+                else:
+                    breaker.release_probe()
+            if not retryable or attempt >= policy.max_attempts:
+                raise
+            delay = policy.delay_for(attempt, retry_after)
+            print(f"请求失败（{type(e).__name__}），{delay:.1f} 秒后进行第 {attempt + 1} 次尝试")
+            if cancel is not None:
+                # 等待期间被取消时立即结束
+                cancel.wait(delay)
+            else:
+                sleep(delay)
+        else:
+            if breaker is not None:
+                breaker.record_success()
+            return result
@@ -46,4 +46,16 @@ class Config:
     
     @property
     def monitoring(self) -> Dict:
-        return self.config.get('monitoring', {})
\ No newline at end of file
+        return self.config.get('monitoring', {})
+    
+    @property
+    def cache(self) -> Dict:
+        return self.config.get('cache', {})
+    
+    @property
+    def api_logging(self) -> Dict:
+        return self.config.get('api_logging', {})
+    
+    @property
+    def training_store(self) -> Dict:
+        return self.config.get('training_store', {})
\ No newline at end of file
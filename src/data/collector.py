@@ -1,127 +1,302 @@
-from typing import List, Dict, Optional, Any
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, Any, Tuple
 from pathlib import Path
+import hashlib
 import json
 import re
-from bs4 import BeautifulSoup
+import time
+from src.utils.logger import iter_log_entries, iter_log_files
+from .features import FeaturePipeline
+from .log_index import read_new_entries
+from .models import Bookmark, TrainingSample, to_serializable
+from .parallel import DEFAULT_CHUNK_SIZE, map_chunks
+from .parser import bookmarks_with_path
+from .snapshot import load_events
 from .preprocessor import BookmarkDataPreprocessor
+from .training_store import SOURCE_HTML, SOURCE_LOG, TrainingDataStore
+
+# 进程池中每个进程复用的采集器
+_worker_collector = None
+
+
+def _collect_log_file(log_file: Path) -> Tuple[List[str], Dict[str, int]]:
+    """进程池任务：读取一个日志文件，返回序列化后的样本（每个一行 JSON）和计数"""
+    global _worker_collector
+    if _worker_collector is None:
+        _worker_collector = BookmarkDataCollector(verbose=False)
+    lines = []
+    counts = {'entries': 0, 'errors': 0}
+    try:
+        for log in iter_log_entries(log_file):
+            counts['entries'] += 1
+            try:
+                samples = _worker_collector._samples_from_log(log)
+            except Exception:
+                counts['errors'] += 1
+                continue
+            lines.extend(json.dumps(sample, ensure_ascii=False, default=to_serializable) for sample in samples)
+    except Exception:
+        counts['errors'] += 1
+    return lines, counts
+
+
+def _features_chunk(columns: List[List[str]], pipeline: FeaturePipeline) -> List[Dict]:
+    """进程池任务：提取一个分块中书签的特征"""
+    preprocessor = BookmarkDataPreprocessor(pipeline)
+    return [preprocessor.extract_features(title, url) for title, url in zip(*columns)]
+
 
 class BookmarkDataCollector:
-    def __init__(self):
+    def __init__(self, verbose: bool = True, store: Optional[TrainingDataStore] = None):
         self.preprocessor = BookmarkDataPreprocessor()
-        self.training_data = []
+        # 本次运行收集到的样本（collect_from_* 会追加到这里）
+        self.training_data: List[TrainingSample] = []
+        # 为 False 时不输出逐条日志的调试信息
+        self.verbose = verbose
+        # 持久化的训练数据，ingest_* 只处理其中没有记录过的输入
+        self.store = store
     
-    def collect_from_api_logs(self, logs_dir: Path) -> List[Dict]:
-        """从API调用日志中收集训练数据"""
+    def collect_from_api_logs(self, logs_dir: Path) -> List[TrainingSample]:
+        """从API调用日志中收集训练数据
+        
+        支持 JSON Lines 日志（含压缩后的 .jsonl.gz）和旧版的 JSON 数组日志，逐条读取。
+        """
         collected_data = []
         
         print(f"正在从目录收集数据: {logs_dir}")
         # 遍历所有日志文件
-        for log_file in logs_dir.glob("**/*.json"):
+        for log_file in iter_log_files(logs_dir):
             try:
                 print(f"处理日志文件: {log_file}")
-                with open(log_file, 'r', encoding='utf-8') as f:
-                    logs = json.load(f)
-                
-                print(f"日志条目数量: {len(logs)}")
-                for log in logs:
-                    # 提取请求中的书签数据
-                    bookmarks = []
-                    if 'request' in log and 'messages' in log['request']:
-                        bookmarks = self._extract_bookmarks_from_prompt(
-                            log['request']['messages'][0]['content']
-                        )
-                        print(f"从请求中提取到 {len(bookmarks)} 个书签")
-                    
-                    # 提取响应中的分类结果
-                    if 'response' in log and not log.get('error'):
-                        categories = self._extract_categories_from_response(
-                            log['response']
-                        )
-                        print(f"从响应中提取到 {len(categories)} 个分类")
-                        
-                        # 将书签和分类结果配对
-                        for bookmark in bookmarks:
-                            category = self._find_category_for_bookmark(
-                                bookmark, categories
-                            )
-                            if category:
-                                # 添加特征
-                                features = self.preprocessor.extract_features(
-                                    bookmark['title'], 
-                                    bookmark['url']
-                                )
-                                collected_data.append({
-                                    'input': {
-                                        'title': bookmark['title'],
-                                        'url': bookmark['url'],
-                                        'features': features
-                                    },
-                                    'label': category
-                                })
+                entry_count = 0
+                for log in iter_log_entries(log_file):
+                    entry_count += 1
+                    collected_data.extend(self._samples_from_log(log))
+                print(f"日志条目数量: {entry_count}")
             
             except Exception as e:
                 print(f"处理日志文件 {log_file} 时出错：{str(e)}")
                 continue
         
         print(f"总共收集到 {len(collected_data)} 条数据")
+        self.training_data.extend(collected_data)
         return collected_data
     
-    def collect_from_html(self, html_file: Path) -> List[Dict]:
-        """从已分类的书签HTML文件中收集训练数据"""
-        collected_data = []
+    def stream_from_api_logs(self, logs_dir: Path, output_file: Path, workers: Optional[int] = None,
+                             progress_interval: float = 5.0) -> Dict[str, int]:
+        """流式收集：多个进程并行读取日志文件，样本边收集边写入 output_file（JSON Lines）
         
+        日志逐条读取，不输出逐条的调试信息，只按 progress_interval 秒输出汇总进度；
+        输出顺序与日志文件顺序一致。返回文件数、日志条目数、样本数和出错数。
+        """
+        log_files = iter_log_files(logs_dir)
+        stats = {'files': 0, 'entries': 0, 'samples': 0, 'errors': 0}
+        output_file = Path(output_file)
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        print(f"正在从目录收集数据: {logs_dir}（{len(log_files)} 个日志文件）")
+        
+        def report():
+            print(f"已处理文件 {stats['files']}/{len(log_files)}，日志条目 {stats['entries']}，"
+                  f"样本 {stats['samples']}，出错 {stats['errors']}")
+        
+        executor = None
+        if workers != 1 and len(log_files) > 1:
+            executor = ProcessPoolExecutor(max_workers=workers)
         try:
-            print(f"正在处理HTML文件: {html_file}")
-            with open(html_file, 'r', encoding='utf-8') as f:
-                soup = BeautifulSoup(f, 'html.parser')
+            results = executor.map(_collect_log_file, log_files) if executor else map(_collect_log_file, log_files)
+            last_report = time.monotonic()
+            with open(output_file, 'w', encoding='utf-8') as f:
+                for lines, counts in results:
+                    for line in lines:
+                        f.write(line + '\n')
+                    stats['files'] += 1
+                    stats['entries'] += counts['entries']
+                    stats['errors'] += counts['errors']
+                    stats['samples'] += len(lines)
+                    if time.monotonic() - last_report >= progress_interval:
+                        report()
+                        last_report = time.monotonic()
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        
+        report()
+        print(f"样本已写入: {output_file}")
+        return stats
+    
+    def _samples_from_log(self, log: Dict) -> List[TrainingSample]:
+        """从单条日志中取出训练样本"""
+        samples = []
+        # 编号协议：请求中记录了带编号的书签，result 为 分类 -> 编号列表
+        if log.get('result') and 'bookmarks' in log.get('request', {}):
+            for bookmark, category in self._pair_ids_with_categories(
+                log['request']['bookmarks'], log['result']
+            ):
+                features = self.preprocessor.extract_features(
+                    bookmark.title,
+                    bookmark.url
+                )
+                samples.append(
+                    TrainingSample(bookmark, features, category)
+                )
+            return samples
+        
+        # 提取请求中的书签数据
+        bookmarks = []
+        if 'request' in log and 'messages' in log['request']:
+            bookmarks = self._extract_bookmarks_from_prompt(
+                log['request']['messages'][0]['content']
+            )
+            if self.verbose:
+                print(f"从请求中提取到 {len(bookmarks)} 个书签")
+        
+        # 提取响应中的分类结果
+        if 'response' in log and not log.get('error'):
+            categories = self._extract_categories_from_response(
+                log['response']
+            )
+            if self.verbose:
+                print(f"从响应中提取到 {len(categories)} 个分类")
             
-            def process_folder(element, current_path=""):
-                # 获取文件夹名称
-                folder_name = element.find_previous('h3')
-                if folder_name:
-                    current_path = f"{current_path}/{folder_name.text}" if current_path else folder_name.text
-                    print(f"处理文件夹: {current_path}")
-                
-                # 处理当前文件夹中的书签
-                links = element.find_all('a')
-                print(f"找到 {len(links)} 个书签")
-                for link in links:
-                    bookmark = {
-                        'title': link.text,
-                        'url': link.get('href', '')
-                    }
+            # 将书签和分类结果配对
+            for bookmark in bookmarks:
+                category = self._find_category_for_bookmark(
+                    bookmark, categories
+                )
+                if category:
                     # 添加特征
                     features = self.preprocessor.extract_features(
-                        bookmark['title'], 
-                        bookmark['url']
+                        bookmark.title, 
+                        bookmark.url
                     )
-                    collected_data.append({
-                        'input': {
-                            'title': bookmark['title'],
-                            'url': bookmark['url'],
-                            'features': features
-                        },
-                        'label': current_path
-                    })
-                
-                # 递归处理子文件夹
-                for dl in element.find_all('dl'):
-                    process_folder(dl, current_path)
-            
-            # 从根目录开始处理
-            root_dl = soup.find('dl')
-            if root_dl:
-                process_folder(root_dl)
-                
+                    samples.append(
+                        TrainingSample(bookmark, features, category)
+                    )
+        return samples
+    
+    def collect_from_html(self, html_file: Path, workers: Optional[int] = 1,
+                          chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[TrainingSample]:
+        """从已分类的书签HTML文件中收集训练数据
+        
+        workers 不为 1 时，解析得到的书签按分块在进程池中提取特征（None 表示 CPU 核数），顺序不变。
+        """
+        collected_data = []
+        
+        try:
+            collected_data = self._samples_from_html(html_file, workers, chunk_size)
         except Exception as e:
             print(f"处理HTML文件 {html_file} 时出错：{str(e)}")
             import traceback
             print(traceback.format_exc())
         
         print(f"总共收集到 {len(collected_data)} 条数据")
+        self.training_data.extend(collected_data)
         return collected_data
     
-    def _extract_bookmarks_from_prompt(self, prompt: str) -> List[Dict]:
+    def _samples_from_html(self, html_file: Path, workers: Optional[int] = 1,
+                           chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[TrainingSample]:
+        """解析书签文件并提取特征，出错时抛出异常"""
+        print(f"正在处理HTML文件: {html_file}")
+        # 单次遍历：每个书签只产出一次，标签为其真实的文件夹路径
+        bookmarks = [bookmark for _, bookmark in bookmarks_with_path(load_events(html_file))]
+        if workers == 1:
+            features = (self.preprocessor.extract_features(b.title, b.url) for b in bookmarks)
+        else:
+            features = map_chunks(_features_chunk, [[b.title for b in bookmarks], [b.url for b in bookmarks]],
+                                  self.preprocessor.pipeline, workers=workers, chunk_size=chunk_size)
+        # bookmark.folder 即驻留后的 "/" 路径，同一文件夹的样本共享同一字符串
+        return [
+            TrainingSample(bookmark, bookmark_features, bookmark.folder)
+            for bookmark, bookmark_features in zip(bookmarks, features)
+        ]
+    
+    def ingest_api_logs(self, logs_dir: Path) -> Dict[str, int]:
+        """把日志目录中新增的内容收集到 store
+        
+        JSON Lines 日志从上次读取到的偏移继续，切换后压缩的 .jsonl.gz 沿用原文件的记录，
+        已读完的文件直接跳过；被改写的旧版 .json 或被截断、替换的 .jsonl 从头重新读取，
+        并先撤销该文件上次贡献的标签票数。
+        返回处理、跳过和出错的文件数以及新增、更新和标签冲突的样本数。
+        """
+        store = self._require_store()
+        stats = {'files': 0, 'skipped': 0, 'errors': 0, 'added': 0, 'updated': 0, 'conflicts': 0}
+        for log_file in iter_log_files(logs_dir):
+            path = str(Path(log_file).resolve())
+            key = 'log:' + (path[:-3] if path.endswith('.gz') else path)
+            try:
+                new = read_new_entries(Path(log_file), store.input_state(key))
+                if new is None:
+                    stats['skipped'] += 1
+                    continue
+                entries, offset, finished, reset = new
+                samples = [sample for log in entries for sample in self._samples_from_log(log)]
+            except Exception as e:
+                print(f"处理日志文件 {log_file} 时出错：{str(e)}")
+                stats['errors'] += 1
+                continue
+            stat = Path(log_file).stat()
+            result = store.add_samples(samples, SOURCE_LOG, {
+                'key': key, 'kind': SOURCE_LOG, 'name': path, 'offset': offset,
+                'size': stat.st_size, 'mtime': stat.st_mtime, 'finished': finished, 'reset': reset
+            })
+            stats['files'] += 1
+            for name in ('added', 'updated', 'conflicts'):
+                stats[name] += result[name]
+        print(f"日志：处理 {stats['files']} 个文件，跳过 {stats['skipped']} 个，出错 {stats['errors']} 个，"
+              f"新增样本 {stats['added']}，"
+              f"更新 {stats['updated']}，标签冲突 {stats['conflicts']}")
+        return stats
+    
+    def ingest_html(self, html_file: Path, workers: Optional[int] = 1) -> Dict[str, int]:
+        """把书签文件快照收集到 store；内容相同的快照（即使文件名不同）只处理一次
+
+        解析或提取特征出错时不记录该快照，下次仍会重新收集。
+        """
+        store = self._require_store()
+        digest = hashlib.sha1()
+        with open(html_file, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        key = 'html:' + digest.hexdigest()
+        if store.input_state(key) is not None:
+            print(f"书签文件已收集过，跳过: {html_file}")
+            return {'files': 0, 'skipped': 1, 'errors': 0, 'added': 0, 'updated': 0, 'conflicts': 0}
+        
+        try:
+            samples = self._samples_from_html(html_file, workers=workers)
+        except Exception as e:
+            print(f"处理HTML文件 {html_file} 时出错：{str(e)}")
+            return {'files': 0, 'skipped': 0, 'errors': 1, 'added': 0, 'updated': 0, 'conflicts': 0}
+        self.training_data.extend(samples)
+        stat = Path(html_file).stat()
+        result = store.add_samples(samples, SOURCE_HTML, {
+            'key': key, 'kind': SOURCE_HTML, 'name': str(Path(html_file).resolve()),
+            'size': stat.st_size, 'mtime': stat.st_mtime, 'finished': True
+        })
+        print(f"书签文件：新增样本 {result['added']}，更新 {result['updated']}，标签冲突 {result['conflicts']}")
+        return {'files': 1, 'skipped': 0, 'errors': 0, 'added': result['added'], 'updated': result['updated'],
+                'conflicts': result['conflicts']}
+    
+    def _require_store(self) -> TrainingDataStore:
+        if self.store is None:
+            raise ValueError("增量收集需要提供 TrainingDataStore")
+        return self.store
+    
+    def _pair_ids_with_categories(self, bookmarks: List[Dict], result: Dict) -> List[tuple]:
+        """按编号把请求中的书签与分类结果配对"""
+        by_id = {
+            item.get('id'): Bookmark(title=item.get('title', ''), url=item.get('url', ''))
+            for item in bookmarks if isinstance(item, dict)
+        }
+        pairs = []
+        for category, ids in result.items():
+            for bookmark_id in ids if isinstance(ids, list) else []:
+                bookmark = by_id.pop(bookmark_id, None)
+                if bookmark is not None:
+                    pairs.append((bookmark, category))
+        return pairs
+    
+    def _extract_bookmarks_from_prompt(self, prompt: str) -> List[Bookmark]:
         """从提示词中提取书签数据"""
         bookmarks = []
         lines = prompt.split('\n')
@@ -132,10 +307,7 @@ class BookmarkDataCollector:
                 current_title = line[3:].strip()
             elif line.startswith('网址:') and current_title:
                 url = line[3:].strip()
-                bookmarks.append({
-                    'title': current_title,
-                    'url': url
-                })
+                bookmarks.append(Bookmark(title=current_title, url=url))
                 current_title = None
                 
         return bookmarks
@@ -163,22 +335,35 @@ class BookmarkDataCollector:
                                 categories[item['title']] = category
             
             # 打印调试信息
-            print(f"响应数据类型：{type(data)}")
-            print(f"响应内容：{data}")
-            print(f"提取的分类信息：{categories}")
+            if self.verbose:
+                print(f"响应数据类型：{type(data)}")
+                print(f"响应内容：{data}")
+                print(f"提取的分类信息：{categories}")
                                 
         except Exception as e:
-            print(f"提取分类信息时出错：{str(e)}")
-            print(f"响应数据类型：{type(response)}")
-            print(f"响应内容：{response}")
+            if self.verbose:
+                print(f"提取分类信息时出错：{str(e)}")
+                print(f"响应数据类型：{type(response)}")
+                print(f"响应内容：{response}")
             
         return categories
     
-    def _find_category_for_bookmark(self, bookmark: Dict, categories: Dict[str, str]) -> Optional[str]:
+    def _find_category_for_bookmark(self, bookmark: Bookmark, categories: Dict[str, str]) -> Optional[str]:
         """为书签找到对应的分类"""
-        return categories.get(bookmark['title'])
+        return categories.get(bookmark.title)
     
-    def save_training_data(self, output_file: Path):
-        """保存训练数据"""
+    def save_training_data(self, output_file: Path) -> int:
+        """保存训练数据（JSON 数组），返回样本数：有 store 时写出其中去重后的全部样本，否则写出本次收集到的样本
+        
+        样本逐条写出，不在内存中拼接整个文档。
+        """
+        samples = self.store.iter_samples() if self.store is not None else self.training_data
+        count = 0
         with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(self.training_data, f, ensure_ascii=False, indent=2) 
\ No newline at end of file
+            f.write('[')
+            for sample in samples:
+                f.write(',\n' if count else '\n')
+                f.write(json.dumps(sample, ensure_ascii=False, default=to_serializable))
+                count += 1
+            f.write('\n]\n' if count else ']\n')
+        return count
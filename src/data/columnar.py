@@ -0,0 +1,208 @@
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Union
+import json
+from .models import Bookmark
+from .parser import Event, bookmarks_with_path
+
+try:
+    import numpy as np
+except ImportError:  # 列式存储是可选功能，只有使用时才需要 numpy
+    np = None
+
+STORE_VERSION = 1
+
+# 持久化时写出的数组列
+_ARRAY_COLUMNS = (
+    'title_data', 'title_offsets', 'url_data', 'url_offsets',
+    'domain_codes', 'folder_codes', 'add_dates', 'last_modified'
+)
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("列式书签存储需要 numpy，请先执行 pip install numpy")
+
+
+def _to_timestamp(value: str) -> int:
+    """把 ADD_DATE / LAST_MODIFIED 属性转换为整数时间戳，缺失或非法时为 0"""
+    try:
+        return int(value) if value else 0
+    except ValueError:
+        return 0
+
+
+class ColumnarBookmarkStore:
+    """按列存储的书签集合，面向百万级书签
+
+    - 标题和 URL 存放在连续的 UTF-8 字节缓冲区中，用偏移数组定位每一行；
+    - 域名和文件夹路径做字典编码，每行只保存一个整数编码；
+    - add_date / last_modified 保存为 int64 数组。
+
+    过滤方法返回布尔掩码，全部在 numpy 数组上完成，不会为每行创建 Python 对象；
+    需要具体书签时再用 rows() 按下标取出。
+    """
+
+    def __init__(self, title_data, title_offsets, url_data, url_offsets,
+                 domain_codes, domains: List[str], folder_codes, folders: List[str],
+                 add_dates, last_modified):
+        _require_numpy()
+        self.title_data = title_data
+        self.title_offsets = title_offsets
+        self.url_data = url_data
+        self.url_offsets = url_offsets
+        self.domain_codes = domain_codes
+        self.domains = domains
+        self.folder_codes = folder_codes
+        self.folders = folders
+        self.add_dates = add_dates
+        self.last_modified = last_modified
+        self._domain_index = {domain: code for code, domain in enumerate(domains)}
+
+    @classmethod
+    def from_bookmarks(cls, bookmarks: Iterable[Bookmark]) -> 'ColumnarBookmarkStore':
+        """从书签记录构建列式存储（逐条追加，不保留书签对象）"""
+        _require_numpy()
+        title_data, url_data = bytearray(), bytearray()
+        title_offsets, url_offsets = array('q', [0]), array('q', [0])
+        domain_codes, folder_codes = array('i'), array('i')
+        add_dates, last_modified = array('q'), array('q')
+        domain_index: Dict[str, int] = {}
+        folder_index: Dict[str, int] = {}
+
+        for bookmark in bookmarks:
+            title_data += bookmark.title.encode('utf-8')
+            title_offsets.append(len(title_data))
+            url_data += bookmark.url.encode('utf-8')
+            url_offsets.append(len(url_data))
+            domain_codes.append(domain_index.setdefault(bookmark.domain, len(domain_index)))
+            folder_codes.append(folder_index.setdefault(bookmark.folder, len(folder_index)))
+            add_dates.append(_to_timestamp(bookmark.add_date))
+            last_modified.append(_to_timestamp(bookmark.last_modified))
+
+        return cls(
+            title_data=np.frombuffer(title_data, dtype=np.uint8),
+            title_offsets=np.frombuffer(title_offsets, dtype=np.int64),
+            url_data=np.frombuffer(url_data, dtype=np.uint8),
+            url_offsets=np.frombuffer(url_offsets, dtype=np.int64),
+            domain_codes=np.frombuffer(domain_codes, dtype=np.int32),
+            domains=list(domain_index),
+            folder_codes=np.frombuffer(folder_codes, dtype=np.int32),
+            folders=list(folder_index),
+            add_dates=np.frombuffer(add_dates, dtype=np.int64),
+            last_modified=np.frombuffer(last_modified, dtype=np.int64)
+        )
+
+    @classmethod
+    def from_events(cls, events: Iterable[Event]) -> 'ColumnarBookmarkStore':
+        """从解析事件流构建列式存储"""
+        return cls.from_bookmarks(bookmark for _, bookmark in bookmarks_with_path(events))
+
+    def __len__(self) -> int:
+        return len(self.domain_codes)
+
+    # ---- 按行读取 ----
+
+    @staticmethod
+    def _text(data, offsets, index: int) -> str:
+        return data[offsets[index]:offsets[index + 1]].tobytes().decode('utf-8')
+
+    def title(self, index: int) -> str:
+        return self._text(self.title_data, self.title_offsets, index)
+
+    def url(self, index: int) -> str:
+        return self._text(self.url_data, self.url_offsets, index)
+
+    def bookmark(self, index: int) -> Bookmark:
+        """取出第 index 行并组装为书签记录"""
+        add_date = int(self.add_dates[index])
+        last_modified = int(self.last_modified[index])
+        return Bookmark(
+            title=self.title(index),
+            url=self.url(index),
+            add_date=str(add_date) if add_date else '',
+            last_modified=str(last_modified) if last_modified else '',
+            folder=self.folders[self.folder_codes[index]]
+        )
+
+    def rows(self, selection=None) -> Iterator[Bookmark]:
+        """按下标数组或布尔掩码依次产出书签，默认产出全部"""
+        if selection is None:
+            indices = range(len(self))
+        else:
+            selection = np.asarray(selection)
+            indices = np.flatnonzero(selection) if selection.dtype == np.bool_ else selection
+        for index in indices:
+            yield self.bookmark(int(index))
+
+    # ---- 向量化过滤，返回布尔掩码，可以用 & | ~ 组合 ----
+
+    def by_domain(self, *domains: str, include_subdomains: bool = False):
+        """按域名过滤"""
+        if include_subdomains:
+            codes = [code for code, name in enumerate(self.domains)
+                     if any(name == d or name.endswith('.' + d) for d in domains)]
+        else:
+            codes = [self._domain_index[d] for d in domains if d in self._domain_index]
+        return np.isin(self.domain_codes, np.asarray(codes, dtype=np.int32))
+
+    def added_after(self, timestamp: int):
+        """添加时间晚于 timestamp（秒）的书签"""
+        return self.add_dates > timestamp
+
+    def added_before(self, timestamp: int):
+        """添加时间早于 timestamp（秒）的书签，缺少添加时间的不计入"""
+        return (self.add_dates > 0) & (self.add_dates < timestamp)
+
+    def modified_after(self, timestamp: int):
+        """最后修改时间晚于 timestamp（秒）的书签"""
+        return self.last_modified > timestamp
+
+    def in_folder(self, folder_path: str):
+        """位于指定文件夹及其所有子文件夹中的书签（路径用 "/" 分隔）"""
+        folder_path = folder_path.strip('/')
+        prefix = folder_path + '/'
+        codes = [code for code, path in enumerate(self.folders)
+                 if not folder_path or path == folder_path or path.startswith(prefix)]
+        return np.isin(self.folder_codes, np.asarray(codes, dtype=np.int32))
+
+    def select(self, mask) -> 'np.ndarray':
+        """把布尔掩码转换为行下标"""
+        return np.flatnonzero(mask)
+
+    def count_by_domain(self) -> Dict[str, int]:
+        """统计每个域名的书签数量"""
+        counts = np.bincount(self.domain_codes, minlength=len(self.domains))
+        return {self.domains[code]: int(count) for code, count in enumerate(counts) if count}
+
+    # ---- 持久化 ----
+
+    def save(self, directory: Union[str, Path]):
+        """保存到目录：每列一个 .npy 文件，加上字典和元数据的 meta.json"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in _ARRAY_COLUMNS:
+            np.save(directory / f"{name}.npy", getattr(self, name))
+        meta = {
+            'version': STORE_VERSION,
+            'count': len(self),
+            'domains': self.domains,
+            'folders': self.folders
+        }
+        with open(directory / 'meta.json', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory: Union[str, Path], mmap: bool = True) -> 'ColumnarBookmarkStore':
+        """从目录加载；mmap=True 时以内存映射方式打开，几乎不需要读取时间"""
+        _require_numpy()
+        directory = Path(directory)
+        with open(directory / 'meta.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != STORE_VERSION:
+            raise Exception(f"不支持的列式存储版本: {meta.get('version')}")
+
+        mmap_mode = 'r' if mmap else None
+        columns = {name: np.load(directory / f"{name}.npy", mmap_mode=mmap_mode)
+                   for name in _ARRAY_COLUMNS}
+        return cls(domains=meta['domains'], folders=meta['folders'], **columns)
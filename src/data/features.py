@@ -0,0 +1,234 @@
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Pattern, Tuple, Union
+from urllib.parse import urlsplit, uses_params
+import re
+from .models import Bookmark, FeatureSet, intern_text
+
+# 按主机名缓存解析结果的条目数；书签的域名重复度很高，少量条目即可覆盖绝大多数调用
+HOST_CACHE_SIZE = 4096
+
+# 正则前缀规则（BookmarkDataPreprocessor 使用）
+DEFAULT_PREFIX_PATTERNS = {
+    r'^doc:': '文档',
+    r'^pkg:': '工具',
+    r'^tip:': '教程',
+    r'^res:': '资源',
+    r'^entry:': '入口',
+    r'^site:': '站点'
+}
+
+DEFAULT_DOMAIN_PATTERNS = {
+    r'github.com': '开源项目',
+    r'docs?\.(.*?)\.': '文档',
+    r'help\.(.*?)\.': '帮助文档'
+}
+
+# 冒号前缀表（BookmarkDataProcessor 使用），可以连续出现多个
+DEFAULT_PREFIX_TABLE = {
+    'doc:': '文档',
+    'pkg:': '库',
+    'tip:': '提示',
+    'entry:': '入口',
+    'site:': '站点',
+    'home:': '主页',
+    'api:': '接口',
+    'res:': '资源',
+    'tool:': '工具',
+    'lib:': '库',
+    'sdk:': 'SDK',
+    'app:': '应用',
+    'demo:': '示例',
+    'ref:': '参考',
+    'guide:': '指南',
+    'blog:': '博客',
+    'forum:': '论坛',
+    'course:': '课程',
+    'book:': '书籍',
+    'video:': '视频',
+    'news:': '新闻',
+    'oss:': '对象存储',
+    'cloud:': '云服务'
+}
+
+_find_words = re.compile(r'\w+').findall
+_uses_params = frozenset(uses_params)
+
+
+def _compile_alternation(patterns: Dict[str, str], search: bool) -> Tuple[Pattern, Dict[str, str]]:
+    """把 {正则: 分类} 合并为一个正则，匹配结果与按字典顺序逐个尝试时相同
+
+    每个分支后面跟一个空的命名组，匹配后由 lastgroup 得知是哪个分支；
+    search 为真时每个分支用先行断言在整个字符串中查找，因此排在前面的模式优先，而不是位置靠前的匹配优先。
+    """
+    branches = []
+    categories = {}
+    for index, (pattern, category) in enumerate(patterns.items()):
+        name = f"_m{index}"
+        branches.append(f"(?=.*?(?:{pattern}))(?P<{name}>)" if search else f"(?:{pattern})(?P<{name}>)")
+        categories[name] = category
+    flags = re.I | re.S if search else re.I
+    return re.compile(f"^(?:{'|'.join(branches)})" if branches else r'(?!)', flags), categories
+
+
+def _split_url(url: str) -> Tuple[str, str]:
+    """解析一次 URL，返回 (netloc, path)；path 与 urlparse 相同，不含最后一段的 ;params"""
+    scheme, netloc, path, _, _ = urlsplit(url)
+    if ';' in path and scheme in _uses_params:
+        slash = path.rfind('/')
+        end = path.find(';', slash) if slash >= 0 else path.find(';')
+        if end >= 0:
+            path = path[:end]
+    return netloc, path
+
+
+class FeaturePipeline:
+    """书签特征的统一提取流程
+
+    每个书签的 URL 只解析一次，标题只匹配一次前缀、只分词一次（两种前缀规则去掉的部分相同时共用分词结果），
+    一次得到 BookmarkDataPreprocessor 与 BookmarkDataProcessor 需要的全部特征。
+    主机名相关的结果（驻留后的域名、域名类型）按 netloc 放在 LRU 缓存中。
+    修改规则后需要调用 compile() 重新编译并清空缓存。
+    """
+
+    def __init__(self, prefix_patterns: Optional[Dict[str, str]] = None,
+                 domain_patterns: Optional[Dict[str, str]] = None,
+                 prefix_table: Optional[Dict[str, str]] = None,
+                 host_cache_size: int = HOST_CACHE_SIZE):
+        self.prefix_patterns = dict(prefix_patterns if prefix_patterns is not None else DEFAULT_PREFIX_PATTERNS)
+        self.domain_patterns = dict(domain_patterns if domain_patterns is not None else DEFAULT_DOMAIN_PATTERNS)
+        self.prefix_table = dict(prefix_table if prefix_table is not None else DEFAULT_PREFIX_TABLE)
+        self.host_cache_size = host_cache_size
+        self.compile()
+
+    def compile(self):
+        """预编译前缀和域名规则，并清空主机名缓存"""
+        self._prefix_re, self._prefix_categories = _compile_alternation(self.prefix_patterns, search=False)
+        self._domain_re, self._domain_categories = _compile_alternation(self.domain_patterns, search=True)
+        # 前缀规则都以 ^ 开头且不含捕获组时，依次对每个规则执行一次 re.sub 等价于一次匹配：
+        # 第 i 个分支是 规则i(?P<_mi>)(?:规则i+1)?(?:规则i+2)?...，
+        # 匹配到的分支即标题前缀，匹配的长度即要去掉的部分
+        patterns = list(self.prefix_patterns)
+        self._prefix_res = [re.compile(pattern, re.I) for pattern in patterns]
+        if all(pattern.startswith('^') and '|' not in pattern and compiled.groups == 0
+               for pattern, compiled in zip(patterns, self._prefix_res)):
+            branches = [
+                f"(?:{pattern[1:]})(?P<_m{index}>)" + ''.join(f"(?:{rest[1:]})?" for rest in patterns[index + 1:])
+                for index, pattern in enumerate(patterns)
+            ]
+            self._title_re = re.compile(f"^(?:{'|'.join(branches)})", re.I) if branches else None
+        else:
+            self._title_re = None
+        self.host_info = lru_cache(maxsize=self.host_cache_size)(self._host_info)
+
+    def extract(self, title: str, url: str) -> FeatureSet:
+        """提取单个书签的全部特征"""
+        prefix, rest = self.split_prefix(title)
+        keywords = _find_words(rest.lower())
+
+        prefixes = self.colon_prefixes(title)
+        clean_title = title.rsplit(':', 1)[1].strip() if prefixes else title
+        # 两种规则去掉的前缀相同时（最常见的情况）直接复用分词结果
+        words = keywords if clean_title.strip() == rest.strip() else _find_words(clean_title.lower())
+
+        if url:
+            netloc, path = _split_url(url)
+            domain, domain_type = self.host_info(netloc)
+            path_segments = [seg for seg in path.split('/') if seg]
+        else:
+            domain, domain_type = self.host_info('')
+            path_segments = []
+
+        return FeatureSet(
+            prefix=prefix,
+            keywords=keywords,
+            prefixes=prefixes,
+            clean_title=clean_title,
+            clean_keywords=[w for w in words if len(w) > 1],  # 过滤掉单字符
+            domain=domain,
+            domain_type=domain_type,
+            path_segments=path_segments
+        )
+
+    def extract_many(self, bookmarks: Iterable[Union[Dict, Bookmark]]) -> List[FeatureSet]:
+        """批量提取特征，bookmarks 可以是书签字典或 Bookmark 记录"""
+        extract = self.extract
+        return [extract(bookmark.get('title', ''), bookmark.get('url', '')) for bookmark in bookmarks]
+
+    def _host_info(self, netloc: str) -> Tuple[str, str]:
+        """(驻留后的域名, 域名类型)，经 host_info 缓存调用"""
+        return intern_text(netloc), self.match_domain(netloc)
+
+    def domain_type(self, url: str) -> str:
+        """URL 的域名类型（经主机名缓存）"""
+        return self.host_info(_split_url(url)[0])[1]
+
+    @staticmethod
+    def path_segments(url: str) -> List[str]:
+        """URL 的非空路径段"""
+        return [seg for seg in _split_url(url)[1].split('/') if seg]
+
+    @staticmethod
+    def keywords(text: str) -> List[str]:
+        """把文本转为小写后按 \\w+ 分词"""
+        return _find_words(text.lower())
+
+    def match_domain(self, domain: str) -> str:
+        """按 domain_patterns 的顺序匹配域名类型"""
+        match = self._domain_re.match(domain)
+        return self._domain_categories[match.lastgroup] if match else 'unknown'
+
+    def match_prefix(self, title: str) -> str:
+        """按 prefix_patterns 匹配标题前缀"""
+        match = self._prefix_re.match(title)
+        return self._prefix_categories[match.lastgroup] if match else 'unknown'
+
+    def split_prefix(self, title: str) -> Tuple[str, str]:
+        """一次匹配同时得到标题前缀和依次去掉 prefix_patterns 后的标题"""
+        title_re = self._title_re
+        if title_re is not None:
+            match = title_re.match(title)
+            if match is None:
+                return 'unknown', title
+            return self._prefix_categories[match.lastgroup], title[match.end():]
+
+        # 规则较复杂时逐个移除前缀
+        prefix = self.match_prefix(title)
+        for pattern in self._prefix_res:
+            title = pattern.sub('', title)
+        return prefix, title
+
+    def colon_prefixes(self, title: str) -> List[str]:
+        """按 prefix_table 提取标题中所有以冒号分隔的前缀"""
+        if ':' not in title:
+            return []
+        table = self.prefix_table
+        prefixes = []
+        parts = title.split(':')
+
+        # 处理每个可能的前缀
+        current = ''
+        for part in parts[:-1]:  # 最后一部分不是前缀
+            # 如果当前部分已经是一个完整的前缀
+            if part + ':' in table:
+                if current:  # 如果有累积的前缀，先添加它
+                    if current + ':' in table:
+                        prefixes.append(table[current + ':'])
+                    else:
+                        prefixes.append(current.lower())
+                # 添加当前前缀
+                prefixes.append(table[part + ':'])
+                current = ''
+            else:
+                if current:
+                    current = current + ':' + part
+                else:
+                    current = part
+
+        # 处理最后累积的前缀
+        if current and current + ':' in table:
+            prefixes.append(table[current + ':'])
+        elif current:
+            prefixes.append(current.lower())
+
+        return prefixes
+
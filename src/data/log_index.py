@@ -0,0 +1,324 @@
+from pathlib import Path
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple, Union
+from urllib.parse import urlsplit
+import gzip
+import json
+import sqlite3
+import time
+from src.config import DATA_DIR, LOGS_DIR
+from src.utils.logger import iter_log_files
+from src.utils.url_utils import normalize_url
+
+DEFAULT_INDEX_PATH = DATA_DIR / "cache" / "log_index.db"
+
+# 跳过 gzip 文件中已索引部分时每次读取的字节数
+_SKIP_CHUNK = 1 << 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS log_files (
+    key TEXT PRIMARY KEY,
+    provider TEXT NOT NULL,
+    offset INTEGER NOT NULL DEFAULT 0,
+    size INTEGER NOT NULL DEFAULT 0,
+    mtime REAL NOT NULL DEFAULT 0,
+    finished INTEGER NOT NULL DEFAULT 0,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS calls (
+    id INTEGER PRIMARY KEY,
+    file_key TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    timestamp TEXT,
+    latency REAL,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    total_tokens INTEGER,
+    bookmark_count INTEGER NOT NULL DEFAULT 0,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS assignments (
+    call_id INTEGER NOT NULL,
+    bookmark_id INTEGER,
+    title TEXT NOT NULL,
+    url TEXT NOT NULL,
+    url_key TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    category TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS failed_bookmarks (
+    call_id INTEGER NOT NULL,
+    bookmark_id INTEGER,
+    title TEXT NOT NULL,
+    url TEXT NOT NULL,
+    url_key TEXT NOT NULL,
+    domain TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_calls_file ON calls (file_key);
+CREATE INDEX IF NOT EXISTS idx_calls_timestamp ON calls (timestamp);
+CREATE INDEX IF NOT EXISTS idx_assignments_call ON assignments (call_id);
+CREATE INDEX IF NOT EXISTS idx_assignments_url ON assignments (url_key);
+CREATE INDEX IF NOT EXISTS idx_assignments_domain ON assignments (domain);
+CREATE INDEX IF NOT EXISTS idx_assignments_category ON assignments (category);
+CREATE INDEX IF NOT EXISTS idx_failed_bookmarks_call ON failed_bookmarks (call_id);
+CREATE INDEX IF NOT EXISTS idx_failed_bookmarks_url ON failed_bookmarks (url_key);
+CREATE INDEX IF NOT EXISTS idx_failed_bookmarks_domain ON failed_bookmarks (domain);
+"""
+
+
+def _domain(url: str) -> str:
+    host = urlsplit(url).hostname or ''
+    return host[4:] if host.startswith('www.') else host
+
+
+def _usage(response) -> Dict:
+    """取出响应中的 token 用量（OpenAI 与千帆的 usage 字段名相同）"""
+    usage = response.get('usage') if isinstance(response, dict) else None
+    return usage if isinstance(usage, dict) else {}
+
+
+def read_new_entries(log_file: Path, row: Optional[Mapping]) -> Optional[Tuple[List[Dict], int, bool, bool]]:
+    """读取日志文件中尚未处理的条目，返回 (条目, 新的偏移, 文件是否不会再变化, 是否需要先删除旧结果)；
+    没有新内容时返回 None
+
+    row 为上次读取后记录的状态（含 offset、size、mtime、finished），第一次读取时为 None；
+    切换后被压缩的 .jsonl.gz 应沿用原 .jsonl 文件的状态。
+    """
+    stat = log_file.stat()
+    if log_file.suffix == '.json':
+        # 旧版日志整个文件是一个数组，只能整体重建
+        if row is not None and row['size'] == stat.st_size and row['mtime'] == stat.st_mtime:
+            return None
+        try:
+            with open(log_file, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except ValueError:
+            entries = []
+        entries = [entry for entry in entries if isinstance(entry, dict)] if isinstance(entries, list) else []
+        return entries, stat.st_size, False, row is not None
+
+    if row is not None and row['finished']:
+        return None
+    offset = row['offset'] if row is not None else 0
+    reset = False
+    if log_file.suffix == '.gz':
+        # 压缩后的文件不再变化：跳过原文件中已经读取过的部分
+        f = gzip.open(log_file, 'rb')
+        remaining = offset
+        while remaining > 0:
+            skipped = len(f.read(min(remaining, _SKIP_CHUNK)))
+            if not skipped:
+                break
+            remaining -= skipped
+        finished = True
+    else:
+        if stat.st_size == offset:
+            return None
+        if stat.st_size < offset:
+            # 文件被截断或替换，从头读取
+            offset, reset = 0, True
+        f = open(log_file, 'rb')
+        f.seek(offset)
+        finished = False
+
+    entries = []
+    with f:
+        for line in f:
+            if not line.endswith(b'\n') and not finished:
+                # 最后一行可能还没有写完，下次再读
+                break
+            offset += len(line)
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry, dict):
+                entries.append(entry)
+    return entries, offset, finished, reset
+
+
+class LogIndex:
+    """API 调用日志的 sqlite 索引
+
+    每次 API 调用一行（时间、服务商、用时、token 用量、错误），每个 书签 -> 分类 的结果一行。
+    索引是增量的：JSON Lines 文件记录已读到的字节偏移，下次从该位置继续；
+    切换后被压缩的 .jsonl.gz 与原文件视为同一个文件，不会重复索引；旧版 .json 文件变化后整体重建。
+    """
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_INDEX_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(_SCHEMA)
+
+    def update(self, logs_dir: Union[str, Path] = LOGS_DIR) -> Dict[str, int]:
+        """索引日志目录中新增的内容，返回处理的文件数、新增调用数和新增分类结果数"""
+        logs_dir = Path(logs_dir)
+        stats = {'files': 0, 'calls': 0, 'assignments': 0}
+        for log_file in iter_log_files(logs_dir):
+            relative = log_file.relative_to(logs_dir) if log_file != logs_dir else Path(log_file.name)
+            key = str(relative)[:-3] if log_file.suffix == '.gz' else str(relative)
+            provider = relative.parts[0] if len(relative.parts) > 1 else ''
+            row = self.conn.execute("SELECT * FROM log_files WHERE key = ?", (key,)).fetchone()
+
+            entries = read_new_entries(log_file, row)
+            if entries is None:
+                continue
+            lines, offset, finished, reset = entries
+            with self.conn:
+                if reset:
+                    self._delete_file(key)
+                calls, assignments = self._insert_entries(key, provider, lines)
+                stat = log_file.stat()
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO log_files (key, provider, offset, size, mtime, finished, indexed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, provider, offset, stat.st_size, stat.st_mtime, int(finished), time.time())
+                )
+            stats['files'] += 1
+            stats['calls'] += calls
+            stats['assignments'] += assignments
+        return stats
+
+    def _delete_file(self, key: str):
+        for table in ('assignments', 'failed_bookmarks'):
+            self.conn.execute(
+                f"DELETE FROM {table} WHERE call_id IN (SELECT id FROM calls WHERE file_key = ?)", (key,)
+            )
+        self.conn.execute("DELETE FROM calls WHERE file_key = ?", (key,))
+
+    def _insert_entries(self, key: str, provider: str, entries: List[Dict]) -> Tuple[int, int]:
+        assignment_count = 0
+        for entry in entries:
+            request = entry.get('request') if isinstance(entry.get('request'), dict) else {}
+            bookmarks = request.get('bookmarks') if isinstance(request.get('bookmarks'), list) else []
+            usage = _usage(entry.get('response'))
+            cursor = self.conn.execute(
+                "INSERT INTO calls (file_key, provider, timestamp, latency, prompt_tokens, completion_tokens, "
+                "total_tokens, bookmark_count, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, provider, entry.get('timestamp'), entry.get('latency'), usage.get('prompt_tokens'),
+                 usage.get('completion_tokens'), usage.get('total_tokens'), len(bookmarks), entry.get('error'))
+            )
+            rows = list(self._assignment_rows(cursor.lastrowid, bookmarks, entry.get('result')))
+            if rows:
+                self.conn.executemany(
+                    "INSERT INTO assignments (call_id, bookmark_id, title, url, url_key, domain, category) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                assignment_count += len(rows)
+            if entry.get('error') is not None and bookmarks:
+                # 出错的调用没有分类结果，单独记录请求中的书签，便于按 URL、域名查询
+                self.conn.executemany(
+                    "INSERT INTO failed_bookmarks (call_id, bookmark_id, title, url, url_key, domain) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    self._request_rows(cursor.lastrowid, bookmarks)
+                )
+        return len(entries), assignment_count
+
+    def _assignment_rows(self, call_id: int, bookmarks: List, result) -> Iterator[Tuple]:
+        """按编号把请求中的书签与分类结果配对"""
+        if not isinstance(result, dict):
+            return
+        by_id = {item.get('id'): item for item in bookmarks if isinstance(item, dict)}
+        for category, ids in result.items():
+            for bookmark_id in ids if isinstance(ids, list) else []:
+                item = by_id.get(bookmark_id)
+                if item is None:
+                    continue
+                url = str(item.get('url', ''))
+                yield (call_id, bookmark_id, str(item.get('title', '')), url, normalize_url(url),
+                       _domain(url), category)
+
+    @staticmethod
+    def _request_rows(call_id: int, bookmarks: List) -> Iterator[Tuple]:
+        for item in bookmarks:
+            if isinstance(item, dict):
+                url = str(item.get('url', ''))
+                yield (call_id, item.get('id'), str(item.get('title', '')), url, normalize_url(url), _domain(url))
+
+    @staticmethod
+    def _bookmark_conditions(alias: str, url: Optional[str], domain: Optional[str]) -> Tuple[List[str], List]:
+        """按规范化 URL 或域名（含子域名）匹配书签的条件"""
+        conditions, params = [], []
+        if url is not None:
+            conditions.append(f"{alias}.url_key = ?")
+            params.append(normalize_url(url))
+        if domain is not None:
+            domain = domain.lower()
+            domain = domain[4:] if domain.startswith('www.') else domain
+            conditions.append(f"({alias}.domain = ? OR {alias}.domain LIKE ?)")
+            params.extend([domain, f"%.{domain}"])
+        return conditions, params
+
+    def query(self, url: Optional[str] = None, domain: Optional[str] = None,
+              category: Optional[str] = None, provider: Optional[str] = None,
+              since: Optional[str] = None, until: Optional[str] = None,
+              limit: int = 100) -> List[Dict]:
+        """查询分类结果，category 同时匹配其子分类；since/until 为 ISO 格式的时间（含日期即可）"""
+        conditions, params = self._call_conditions(provider, since, until)
+        bookmark_conditions, bookmark_params = self._bookmark_conditions('a', url, domain)
+        conditions += bookmark_conditions
+        params += bookmark_params
+        if category is not None:
+            conditions.append("(a.category = ? OR a.category LIKE ?)")
+            params.extend([category, f"{category}/%"])
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+        rows = self.conn.execute(
+            "SELECT c.timestamp, c.provider, c.latency, a.category, a.title, a.url, c.file_key "
+            f"FROM assignments a JOIN calls c ON c.id = a.call_id{where} "
+            "ORDER BY c.timestamp DESC LIMIT ?",
+            params + [limit]
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def errors(self, url: Optional[str] = None, domain: Optional[str] = None,
+               provider: Optional[str] = None, since: Optional[str] = None,
+               until: Optional[str] = None, limit: int = 100) -> List[Dict]:
+        """查询出错的调用，url / domain 匹配请求中包含该书签的调用"""
+        conditions, params = self._call_conditions(provider, since, until)
+        conditions.append("c.error IS NOT NULL")
+        bookmark_conditions, bookmark_params = self._bookmark_conditions('f', url, domain)
+        if bookmark_conditions:
+            conditions.append(f"EXISTS (SELECT 1 FROM failed_bookmarks f WHERE f.call_id = c.id AND "
+                              f"{' AND '.join(bookmark_conditions)})")
+            params += bookmark_params
+        rows = self.conn.execute(
+            "SELECT c.timestamp, c.provider, c.latency, c.bookmark_count, c.error, c.file_key "
+            f"FROM calls c WHERE {' AND '.join(conditions)} ORDER BY c.timestamp DESC LIMIT ?",
+            params + [limit]
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _call_conditions(self, provider: Optional[str], since: Optional[str],
+                         until: Optional[str]) -> Tuple[List[str], List]:
+        conditions, params = [], []
+        if provider is not None:
+            conditions.append("c.provider = ?")
+            params.append(provider)
+        if since is not None:
+            conditions.append("c.timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            # 只给日期时包含当天全天
+            conditions.append("c.timestamp <= ?")
+            params.append(until + 'T99' if len(until) == 10 else until)
+        return conditions, params
+
+    def stats(self) -> Dict:
+        """索引统计：文件数、调用数、出错数、分类结果数和按服务商的平均用时与 token 用量"""
+        files = self.conn.execute("SELECT COUNT(*) FROM log_files").fetchone()[0]
+        assignments = self.conn.execute("SELECT COUNT(*) FROM assignments").fetchone()[0]
+        providers = self.conn.execute(
+            "SELECT provider, COUNT(*) AS calls, COUNT(error) AS errors, AVG(latency) AS avg_latency, "
+            "SUM(completion_tokens) AS completion_tokens FROM calls GROUP BY provider ORDER BY provider"
+        ).fetchall()
+        return {
+            'files': files,
+            'calls': sum(row['calls'] for row in providers),
+            'assignments': assignments,
+            'providers': [dict(row) for row in providers]
+        }
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,187 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+import sys
+
+
+class Record:
+    """基于 __slots__ 的轻量记录
+
+    每条记录只占用固定的槽位，不为每个实例分配字典；
+    同时保留字典式访问（record['title']、record.get('url')、'title' in record），
+    以兼容原先按字典处理书签的代码。
+    """
+    __slots__ = ()
+    _fields: Tuple[str, ...] = ()
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._fields:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key not in self._fields:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._fields
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self._fields:
+            return getattr(self, key)
+        return default
+
+    def keys(self) -> Tuple[str, ...]:
+        return self._fields
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        for key in self._fields:
+            yield key, getattr(self, key)
+
+    def to_dict(self) -> Dict:
+        """转换为可 JSON 序列化的字典"""
+        return {key: to_serializable(value) for key, value in self.items()}
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Record):
+            return type(self) is type(other) and tuple(self.items()) == tuple(other.items())
+        if isinstance(other, dict):
+            return dict(self.items()) == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f"{key}={value!r}" for key, value in self.items())
+        return f"{type(self).__name__}({fields})"
+
+
+def intern_text(value: Optional[str]) -> str:
+    """驻留重复度高的字符串（域名、文件夹路径），相同取值只保留一份"""
+    return sys.intern(value) if value else ''
+
+
+class Bookmark(Record):
+    """单个书签"""
+    __slots__ = ('title', 'url', 'add_date', 'last_modified', 'folder', '_domain')
+    _fields = ('title', 'url', 'add_date', 'last_modified', 'folder')
+
+    def __init__(self, title: str = '', url: str = '', add_date: str = '',
+                 last_modified: str = '', folder: str = ''):
+        self.title = title
+        self.url = url
+        self.add_date = add_date
+        self.last_modified = last_modified
+        self.folder = intern_text(folder)
+        self._domain = None
+
+    @property
+    def domain(self) -> str:
+        """书签域名（首次访问时解析并驻留）"""
+        if self._domain is None:
+            self._domain = intern_text(urlsplit(self.url).netloc) if self.url else ''
+        return self._domain
+
+    @classmethod
+    def coerce(cls, item) -> 'Bookmark':
+        """把字典形式的书签转换为 Bookmark，已是 Bookmark 时原样返回"""
+        if isinstance(item, Bookmark):
+            return item
+        return cls(
+            title=item.get('title', ''),
+            url=item.get('url', ''),
+            add_date=item.get('add_date', ''),
+            last_modified=item.get('last_modified', ''),
+            folder=item.get('folder', '')
+        )
+
+
+class Folder(Record):
+    """书签文件夹"""
+    __slots__ = ('name', 'add_date', 'last_modified', 'bookmarks', 'subfolders')
+    _fields = ('name', 'bookmarks', 'subfolders', 'add_date', 'last_modified')
+
+    def __init__(self, name: str = '', add_date: str = '', last_modified: str = '',
+                 bookmarks: Optional[List[Bookmark]] = None,
+                 subfolders: Optional[List['Folder']] = None):
+        self.name = intern_text(name)
+        self.add_date = add_date
+        self.last_modified = last_modified
+        self.bookmarks = bookmarks if bookmarks is not None else []
+        self.subfolders = subfolders if subfolders is not None else []
+
+
+class BookmarkFeatures(Record):
+    """BookmarkDataProcessor 提取的书签特征"""
+    __slots__ = ('prefixes', 'has_prefix', 'clean_title', 'domain', 'folder',
+                 'folder_path', 'keywords')
+    _fields = __slots__
+
+    def __init__(self, prefixes: Optional[List[str]] = None, has_prefix: bool = False,
+                 clean_title: str = '', domain: str = '', folder: str = '',
+                 folder_path: str = '', keywords: Optional[List[str]] = None):
+        self.prefixes = prefixes if prefixes is not None else []
+        self.has_prefix = has_prefix
+        self.clean_title = clean_title
+        self.domain = intern_text(domain)
+        self.folder = intern_text(folder)
+        self.folder_path = intern_text(folder_path)
+        self.keywords = keywords if keywords is not None else []
+
+
+class FeatureSet(Record):
+    """FeaturePipeline 一次提取的全部特征
+
+    prefix/keywords 对应正则前缀规则（BookmarkDataPreprocessor），
+    prefixes/clean_title/clean_keywords 对应冒号前缀表（BookmarkDataProcessor）。
+    """
+    __slots__ = ('prefix', 'keywords', 'prefixes', 'clean_title', 'clean_keywords',
+                 'domain', 'domain_type', 'path_segments')
+    _fields = __slots__
+
+    def __init__(self, prefix: str = 'unknown', keywords: Optional[List[str]] = None,
+                 prefixes: Optional[List[str]] = None, clean_title: str = '',
+                 clean_keywords: Optional[List[str]] = None, domain: str = '',
+                 domain_type: str = 'unknown', path_segments: Optional[List[str]] = None):
+        self.prefix = prefix
+        self.keywords = keywords if keywords is not None else []
+        self.prefixes = prefixes if prefixes is not None else []
+        self.clean_title = clean_title
+        self.clean_keywords = clean_keywords if clean_keywords is not None else []
+        self.domain = intern_text(domain)
+        self.domain_type = domain_type
+        self.path_segments = path_segments if path_segments is not None else []
+
+
+class TrainingSample(Record):
+    """采集到的一条训练样本：书签、特征与分类标签"""
+    __slots__ = ('bookmark', 'features', 'label')
+    _fields = ('input', 'label')
+
+    def __init__(self, bookmark: Bookmark, features: Any, label: Optional[str]):
+        self.bookmark = bookmark
+        self.features = features
+        self.label = intern_text(label) if label else label
+
+    @property
+    def input(self) -> Dict:
+        """兼容原先 {'input': {...}, 'label': ...} 结构的输入部分"""
+        return {
+            'title': self.bookmark.title,
+            'url': self.bookmark.url,
+            'features': self.features
+        }
+
+
+def to_serializable(obj: Any) -> Any:
+    """把记录（以及其中嵌套的记录）转换为普通的字典和列表
+
+    也可以直接作为 json.dump 的 default 钩子使用。
+    """
+    if isinstance(obj, Record):
+        return obj.to_dict()
+    if isinstance(obj, list):
+        return [to_serializable(item) for item in obj]
+    if isinstance(obj, dict):
+        return {key: to_serializable(value) for key, value in obj.items()}
+    return obj
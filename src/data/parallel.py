@@ -0,0 +1,65 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple, Union
+from .features import FeaturePipeline
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# 打包列时使用的分隔符；书签标题和 URL 中不会出现 NUL，出现时退回为普通列表
+_SEPARATOR = '\x00'
+
+# 进程池中每个进程复用的特征流程，由 _init_worker 按主进程的规则创建
+_worker_pipeline: Optional[FeaturePipeline] = None
+
+ChunkTask = Callable[[List[List[str]], FeaturePipeline], List]
+PackedColumn = Union[str, List[str]]
+
+
+def _pack(values: Sequence[str]) -> PackedColumn:
+    """把一列字符串拼成一个字符串：传给子进程时只序列化一个对象，而不是每个书签一个"""
+    packed = _SEPARATOR.join(values)
+    if packed.count(_SEPARATOR) != max(len(values) - 1, 0):
+        return list(values)
+    return packed
+
+
+def _unpack(packed: PackedColumn, count: int) -> List[str]:
+    if not isinstance(packed, str):
+        return packed
+    return packed.split(_SEPARATOR) if count else []
+
+
+def _init_worker(rules: Tuple):
+    global _worker_pipeline
+    _worker_pipeline = FeaturePipeline(*rules)
+
+
+def _run_chunk(task: ChunkTask, packed: Tuple[int, List[PackedColumn]]) -> List:
+    """进程池任务：解开一个分块的各列，交给 task 处理"""
+    count, columns = packed
+    return task([_unpack(column, count) for column in columns], _worker_pipeline)
+
+
+def map_chunks(task: ChunkTask, columns: Sequence[Sequence[str]], pipeline: FeaturePipeline,
+               workers: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator:
+    """把按列给出的书签（如 [标题列表, URL 列表]）切分为分块，在进程池中用 task 处理，按原顺序逐行产出结果
+
+    task(分块的各列, 特征流程) 返回与分块行数相同的结果列表，必须是模块级函数。
+    子进程使用与 pipeline 相同的规则；workers 为 None 时使用 CPU 核数，
+    workers 为 1 或只有一个分块时在当前进程中处理。
+    """
+    total = len(columns[0]) if columns else 0
+    if workers == 1 or total <= chunk_size:
+        for start in range(0, total, chunk_size):
+            yield from task([list(column[start:start + chunk_size]) for column in columns], pipeline)
+        return
+
+    chunks = (
+        (min(chunk_size, total - start), [_pack(column[start:start + chunk_size]) for column in columns])
+        for start in range(0, total, chunk_size)
+    )
+    rules = (pipeline.prefix_patterns, pipeline.domain_patterns, pipeline.prefix_table)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(rules,)) as executor:
+        # map 按提交顺序返回结果，分块处理完成的先后不影响输出顺序
+        for results in executor.map(_run_chunk, repeat(task), chunks):
+            yield from results
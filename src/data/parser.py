@@ -0,0 +1,159 @@
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from .models import Bookmark, Folder, intern_text
+
+# 解析事件类型
+FOLDER_START = 'folder_start'
+FOLDER_END = 'folder_end'
+BOOKMARK = 'bookmark'
+
+Event = Tuple[str, Union[Bookmark, Folder, None]]
+
+# 每次从文件读取的字符数
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+
+class NetscapeBookmarkParser(HTMLParser):
+    """Netscape 书签格式的事件驱动解析器
+
+    通过 feed() 逐块喂入文本，drain() 取出已解析的事件。
+    内存占用只与文件夹嵌套深度和单块大小有关，不会构建整棵 DOM 树。
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._events: List[Event] = []
+        self._dl_stack: List[bool] = []       # 每层 DL 是否对应一个文件夹
+        self._pending_folder: Optional[Folder] = None
+        self._text_tag: Optional[str] = None  # 正在收集文本的标签（a / h3）
+        self._text_attrs: Dict[str, str] = {}
+        self._text_parts: List[str] = []
+
+    def drain(self) -> List[Event]:
+        """取出目前已解析出的事件"""
+        events, self._events = self._events, []
+        return events
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ('a', 'h3', 'dt', 'dl'):
+            self._finish_text()
+            if tag != 'dl':
+                self._flush_empty_folder()
+
+        if tag in ('a', 'h3'):
+            self._text_tag = tag
+            self._text_attrs = {name: value or '' for name, value in attrs}
+            self._text_parts = []
+        elif tag == 'dl':
+            folder, self._pending_folder = self._pending_folder, None
+            self._dl_stack.append(folder is not None)
+            if folder is not None:
+                self._events.append((FOLDER_START, folder))
+
+    def handle_endtag(self, tag):
+        if tag == self._text_tag:
+            self._finish_text()
+        elif tag == 'dl':
+            self._finish_text()
+            self._flush_empty_folder()
+            if self._dl_stack and self._dl_stack.pop():
+                self._events.append((FOLDER_END, None))
+
+    def handle_data(self, data):
+        if self._text_tag:
+            self._text_parts.append(data)
+
+    def close(self):
+        super().close()
+        self._finish_text()
+        self._flush_empty_folder()
+        # 补齐未闭合的文件夹
+        while self._dl_stack:
+            if self._dl_stack.pop():
+                self._events.append((FOLDER_END, None))
+
+    def _finish_text(self):
+        """结束当前 A / H3 标签的文本收集并生成对应事件"""
+        tag = self._text_tag
+        if not tag:
+            return
+        text = ''.join(self._text_parts).strip()
+        attrs = self._text_attrs
+        self._text_tag = None
+        self._text_attrs = {}
+        self._text_parts = []
+
+        if tag == 'a':
+            self._events.append((BOOKMARK, Bookmark(
+                title=text,
+                url=attrs.get('href', ''),
+                add_date=attrs.get('add_date', ''),
+                last_modified=attrs.get('last_modified', '')
+            )))
+        else:
+            self._pending_folder = Folder(
+                name=text,
+                add_date=attrs.get('add_date', ''),
+                last_modified=attrs.get('last_modified', '')
+            )
+
+    def _flush_empty_folder(self):
+        """H3 后面没有 DL 时，按空文件夹处理"""
+        if self._pending_folder is not None:
+            self._events.append((FOLDER_START, self._pending_folder))
+            self._events.append((FOLDER_END, None))
+            self._pending_folder = None
+
+
+def iter_events(file_path: Union[str, Path],
+                chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Event]:
+    """逐块读取书签文件，依次产出解析事件"""
+    parser = NetscapeBookmarkParser()
+    with open(file_path, 'r', encoding='utf-8') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            parser.feed(chunk)
+            yield from parser.drain()
+    parser.close()
+    yield from parser.drain()
+
+
+def bookmarks_from_events(events: Iterable[Event]) -> Iterator[Bookmark]:
+    """从事件流中按文档顺序取出所有书签"""
+    for event, data in events:
+        if event == BOOKMARK:
+            yield data
+
+
+def bookmarks_with_path(events: Iterable[Event]) -> Iterator[Tuple[Tuple[str, ...], Bookmark]]:
+    """单次遍历事件流产出 (文件夹路径, 书签)，路径由文件夹栈维护
+
+    同一文件夹下的书签共享同一个路径元组和驻留后的 "/" 路径字符串（写入 bookmark.folder）。
+    """
+    folder_stack: List[str] = []
+    path: Tuple[str, ...] = ()
+    joined = ''
+    for event, data in events:
+        if event == BOOKMARK:
+            data.folder = joined
+            yield path, data
+        elif event in (FOLDER_START, FOLDER_END):
+            if event == FOLDER_START:
+                folder_stack.append(data.name)
+            else:
+                folder_stack.pop()
+            path = tuple(folder_stack)
+            joined = intern_text('/'.join(path))
+
+
+def iter_bookmarks(file_path: Union[str, Path]) -> Iterator[Bookmark]:
+    """按文档顺序产出所有书签"""
+    return bookmarks_from_events(iter_events(file_path))
+
+
+def iter_bookmarks_with_path(file_path: Union[str, Path]) -> Iterator[Tuple[Tuple[str, ...], Bookmark]]:
+    """单次遍历产出 (文件夹路径, 书签)"""
+    return bookmarks_with_path(iter_events(file_path))
@@ -1,78 +1,75 @@
-from typing import List, Dict, Tuple
-from pathlib import Path
-import json
-import re
-from bs4 import BeautifulSoup
-from urllib.parse import urlparse
+from typing import List, Dict, Iterable, Optional, Tuple, Union
+from .features import FeaturePipeline
+from .models import Bookmark, FeatureSet, TrainingSample
 
 class BookmarkDataPreprocessor:
-    def __init__(self):
-        self.prefix_patterns = {
-            r'^doc:': '文档',
-            r'^pkg:': '工具',
-            r'^tip:': '教程',
-            r'^res:': '资源',
-            r'^entry:': '入口',
-            r'^site:': '站点'
-        }
-        
-        self.domain_patterns = {
-            r'github.com': '开源项目',
-            r'docs?\.(.*?)\.': '文档',
-            r'help\.(.*?)\.': '帮助文档'
-        }
+    """FeaturePipeline 之上的视图：前缀类别、域名类型、路径段和关键词"""
+
+    def __init__(self, pipeline: Optional[FeaturePipeline] = None):
+        self.pipeline = pipeline if pipeline is not None else FeaturePipeline()
+    
+    @property
+    def prefix_patterns(self) -> Dict[str, str]:
+        return self.pipeline.prefix_patterns
+    
+    @prefix_patterns.setter
+    def prefix_patterns(self, patterns: Dict[str, str]):
+        self.pipeline.prefix_patterns = patterns
+    
+    @property
+    def domain_patterns(self) -> Dict[str, str]:
+        return self.pipeline.domain_patterns
+    
+    @domain_patterns.setter
+    def domain_patterns(self, patterns: Dict[str, str]):
+        self.pipeline.domain_patterns = patterns
+    
+    def compile_patterns(self):
+        """预编译前缀和域名规则；修改 prefix_patterns 或 domain_patterns 后需要重新调用"""
+        self.pipeline.compile()
     
     def extract_features(self, title: str, url: str) -> Dict:
         """提取特征"""
-        features = {
-            'prefix': self._extract_prefix(title),
-            'domain_type': self._extract_domain_type(url),
-            'path_segments': self._extract_path_segments(url),
-            'keywords': self._extract_keywords(title)
+        return self._view(self.pipeline.extract(title, url))
+    
+    def extract_features_many(self, bookmarks: Iterable[Union[Dict, Bookmark]]) -> List[Dict]:
+        """批量提取特征，bookmarks 可以是书签字典或 Bookmark 记录"""
+        view = self._view
+        return [view(features) for features in self.pipeline.extract_many(bookmarks)]
+    
+    @staticmethod
+    def _view(features: FeatureSet) -> Dict:
+        return {
+            'prefix': features.prefix,
+            'domain_type': features.domain_type,
+            'path_segments': features.path_segments,
+            'keywords': features.keywords
         }
-        return features
     
     def _extract_prefix(self, title: str) -> str:
         """提取标题前缀"""
-        for pattern, category in self.prefix_patterns.items():
-            if re.match(pattern, title, re.I):
-                return category
-        return 'unknown'
+        return self.pipeline.match_prefix(title)
     
     def _extract_domain_type(self, url: str) -> str:
         """提取域名类型"""
-        domain = urlparse(url).netloc
-        for pattern, category in self.domain_patterns.items():
-            if re.search(pattern, domain, re.I):
-                return category
-        return 'unknown'
+        return self.pipeline.domain_type(url)
     
     def _extract_path_segments(self, url: str) -> List[str]:
         """提取URL路径段"""
-        path = urlparse(url).path
-        return [seg for seg in path.split('/') if seg]
+        return self.pipeline.path_segments(url)
     
     def _extract_keywords(self, title: str) -> List[str]:
         """提取关键词"""
-        # 移除前缀
-        for pattern in self.prefix_patterns:
-            title = re.sub(pattern, '', title, flags=re.I)
-        
-        # 分词（简单实现，后续可以改进）
-        words = re.findall(r'\w+', title.lower())
-        return words
+        return self._split_title(title)[1]
+    
+    def _split_title(self, title: str) -> Tuple[str, List[str]]:
+        """一次匹配同时得到标题前缀和去掉前缀后的关键词"""
+        prefix, rest = self.pipeline.split_prefix(title)
+        return prefix, self.pipeline.keywords(rest)
     
-    def process_bookmark(self, bookmark: Dict) -> Dict:
+    def process_bookmark(self, bookmark: Dict) -> TrainingSample:
         """处理单个书签"""
-        title = bookmark['title']
-        url = bookmark['url']
-        
-        features = self.extract_features(title, url)
-        return {
-            'input': {
-                'title': title,
-                'url': url,
-                'features': features
-            },
-            'label': None  # 需要从已分类数据中获取
-        } 
\ No newline at end of file
+        bookmark = Bookmark.coerce(bookmark)
+        features = self.extract_features(bookmark.title, bookmark.url)
+        # 标签需要从已分类数据中获取
+        return TrainingSample(bookmark, features, None) 
\ No newline at end of file
@@ -1,160 +1,118 @@
-from bs4 import BeautifulSoup
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
 from pathlib import Path
 import re
-from urllib.parse import urlparse
+from .features import FeaturePipeline
+from .models import BookmarkFeatures, FeatureSet
+from .parallel import DEFAULT_CHUNK_SIZE, map_chunks
+from .parser import bookmarks_from_events, bookmarks_with_path
+from .snapshot import load_events
+
+def _training_chunk(columns: List[List[str]], pipeline: FeaturePipeline) -> List[tuple]:
+    """进程池任务：为一个分块生成训练数据，特征记录以字段值元组的形式传回"""
+    processor = BookmarkDataProcessor(pipeline)
+    rows = []
+    for title, url, folder, folder_path in zip(*columns):
+        item = processor._training_item(title, url, folder, folder_path)
+        rows.append((item['text'], item['label'], tuple(value for _, value in item['features'].items())))
+    return rows
+
 
 class BookmarkDataProcessor:
-    def __init__(self):
-        # 扩展特征提取规则
-        self.prefix_patterns = {
-            'doc:': '文档',
-            'pkg:': '库',
-            'tip:': '提示',
-            'entry:': '入口',
-            'site:': '站点',
-            'home:': '主页',
-            'api:': '接口',
-            'res:': '资源',
-            'tool:': '工具',
-            'lib:': '库',
-            'sdk:': 'SDK',
-            'app:': '应用',
-            'demo:': '示例',
-            'ref:': '参考',
-            'guide:': '指南',
-            'blog:': '博客',
-            'forum:': '论坛',
-            'course:': '课程',
-            'book:': '书籍',
-            'video:': '视频',
-            'news:': '新闻',
-            'oss:': '对象存储',
-            'cloud:': '云服务'
-        }
+    """FeaturePipeline 之上的视图：冒号前缀、清理后的标题、域名和关键词，并生成 FastText 训练数据"""
+
+    def __init__(self, pipeline: Optional[FeaturePipeline] = None):
+        self.pipeline = pipeline if pipeline is not None else FeaturePipeline()
     
-    def process_bookmarks_file(self, file_path: Path) -> List[Dict]:
-        """处理书签文件,返回训练数据"""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            soup = BeautifulSoup(f, 'html.parser')
-        
-        training_data = []
-        
-        def process_folder(element, current_folder=""):
-            # 获取文件夹名称
-            folder_name = element.find_previous_sibling('h3')
-            if folder_name:
-                current_folder = folder_name.text.strip()
-            
-            # 处理当前文件夹中的书签
-            for link in element.find_all('a'):
-                bookmark = {
-                    'title': link.text.strip(),
-                    'url': link.get('href', ''),
-                    'folder': current_folder
-                }
-                
-                # 提取特征
-                features = self.extract_features(bookmark)
-                
-                # 生成训练数据
-                text = self._generate_training_text(bookmark, features)
-                label = self._generate_label(current_folder)
-                
-                if current_folder:
-                    training_data.append({
-                        'text': text,
-                        'label': label,
-                        'features': features
-                    })
-            
-            # 递归处理子文件夹
-            for dl in element.find_all('dl'):
-                process_folder(dl, current_folder)
-        
-        # 从根目录开始处理
-        root_dl = soup.find('dl')
-        if root_dl:
-            process_folder(root_dl)
-        
-        return training_data
+    @property
+    def prefix_patterns(self) -> Dict[str, str]:
+        """冒号前缀表（与流程共用）"""
+        return self.pipeline.prefix_table
     
-    def extract_features(self, bookmark: Dict) -> Dict:
-        """提取特征"""
-        features = {
-            'prefixes': [],        # 存储所有前缀
-            'has_prefix': False,   # 是否有前缀标记
-            'clean_title': '',     # 清理前缀后的标题
-            'domain': '',          # 域名
-            'folder': bookmark['folder'],  # 所在文件夹
-            'keywords': []         # 关键词
+    @prefix_patterns.setter
+    def prefix_patterns(self, table: Dict[str, str]):
+        self.pipeline.prefix_table = table
+    
+    def process_bookmarks_file(self, file_path: Path, workers: Optional[int] = 1,
+                               chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[Dict]:
+        """处理书签文件,返回训练数据
+        
+        workers 不为 1 时，解析得到的书签按 chunk_size 分块在进程池中提取特征（None 表示 CPU 核数），
+        结果顺序与逐个处理时相同。
+        """
+        return [item for _, item in self.iter_training_data(file_path, workers, chunk_size)]
+    
+    def iter_training_data(self, file_path: Path, workers: Optional[int] = 1,
+                           chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Tuple[str, Dict]]:
+        """逐条产出 (书签 URL, 训练数据)，不在内存中保留全部结果，参数同 process_bookmarks_file"""
+        # 单次遍历：每个书签只访问一次，文件夹路径由解析器的栈维护
+        titles, urls, folders, folder_paths = [], [], [], []
+        for folder_path, bookmark in bookmarks_with_path(load_events(file_path)):
+            current_folder = folder_path[-1] if folder_path else ""
+            if not current_folder:
+                continue
+            titles.append(bookmark.title)
+            urls.append(bookmark.url)
+            folders.append(current_folder)
+            folder_paths.append(bookmark.folder)
+        
+        if workers == 1:
+            for row in zip(titles, urls, folders, folder_paths):
+                yield row[1], self._training_item(*row)
+            return
+        
+        # 子进程只传回字符串和列表，特征记录在主进程中重建（同时驻留域名和文件夹字符串）
+        rows = map_chunks(_training_chunk, [titles, urls, folders, folder_paths], self.pipeline,
+                          workers=workers, chunk_size=chunk_size)
+        for url, (text, label, values) in zip(urls, rows):
+            yield url, {'text': text, 'label': label, 'features': BookmarkFeatures(*values)}
+    
+    def _training_item(self, title: str, url: str, folder: str, folder_path: str) -> Dict:
+        """生成一条训练数据"""
+        # 提取特征
+        features = self._build_features(title, url, folder, folder_path)
+        
+        # 生成训练数据
+        bookmark = {'title': title, 'url': url, 'folder': folder}
+        return {
+            'text': self._generate_training_text(bookmark, features),
+            'label': self._generate_label(folder),
+            'features': features
         }
-        
-        # 处理标题和前缀
-        title = bookmark['title']
-        prefixes = self._extract_prefixes(title)
-        if prefixes:
-            features['has_prefix'] = True
-            features['prefixes'] = prefixes
-            features['clean_title'] = self._remove_prefixes(title)
-        else:
-            features['clean_title'] = title
-        
-        # 提取域名
-        url = bookmark['url']
-        if url:
-            domain = urlparse(url).netloc
-            features['domain'] = domain
-        
-        # 提取关键词
-        features['keywords'] = self._extract_keywords(features['clean_title'])
-        
-        return features
     
-    def _extract_prefixes(self, title: str) -> List[str]:
-        """提取所有有效的前缀"""
-        prefixes = []
-        parts = title.split(':')
-        
-        # 处理每个可能的前缀
-        current = ''
-        for part in parts[:-1]:  # 最后一部分不是前缀
-            # 如果当前部分已经是一个完整的前缀
-            if part + ':' in self.prefix_patterns:
-                if current:  # 如果有累积的前缀，先添加它
-                    if current + ':' in self.prefix_patterns:
-                        prefixes.append(self.prefix_patterns[current + ':'])
-                    else:
-                        prefixes.append(current.lower())
-                # 添加当前前缀
-                prefixes.append(self.prefix_patterns[part + ':'])
-                current = ''
-            else:
-                if current:
-                    current = current + ':' + part
-                else:
-                    current = part
-        
-        # 处理最后累积的前缀
-        if current and current + ':' in self.prefix_patterns:
-            prefixes.append(self.prefix_patterns[current + ':'])
-        elif current:
-            prefixes.append(current.lower())
-        
-        return prefixes
+    def extract_features(self, bookmark: Dict) -> BookmarkFeatures:
+        """提取特征"""
+        folder = bookmark['folder']
+        return self._build_features(
+            bookmark['title'], bookmark['url'], folder, bookmark.get('folder_path', folder)
+        )
+    
+    def extract_features_many(self, bookmarks: Iterable[Dict]) -> List[BookmarkFeatures]:
+        """批量提取特征"""
+        bookmarks = list(bookmarks)
+        return [
+            self._view(features, bookmark['folder'], bookmark.get('folder_path', bookmark['folder']))
+            for bookmark, features in zip(bookmarks, self.pipeline.extract_many(bookmarks))
+        ]
     
-    def _remove_prefixes(self, title: str) -> str:
-        """移除所有前缀"""
-        parts = title.split(':')
-        if len(parts) > 1:
-            return parts[-1].strip()
-        return title
+    def _build_features(self, title: str, url: str, folder: str, folder_path: str) -> BookmarkFeatures:
+        """根据标题、URL 和文件夹构建特征记录"""
+        return self._view(self.pipeline.extract(title, url), folder, folder_path)
     
-    def _extract_keywords(self, text: str) -> List[str]:
-        """从清理后的标题中提取关键词"""
-        # 简单的分词（可以后续改进）
-        words = re.findall(r'\w+', text.lower())
-        return [w for w in words if len(w) > 1]  # 过滤掉单字符
+    @staticmethod
+    def _view(features: FeatureSet, folder: str, folder_path: str) -> BookmarkFeatures:
+        return BookmarkFeatures(
+            prefixes=features.prefixes,
+            has_prefix=bool(features.prefixes),
+            clean_title=features.clean_title,
+            domain=features.domain,
+            folder=folder,
+            folder_path=folder_path,
+            keywords=features.clean_keywords
+        )
+    
+    def _extract_prefixes(self, title: str) -> List[str]:
+        """提取所有有效的前缀"""
+        return self.pipeline.colon_prefixes(title)
     
     def _generate_training_text(self, bookmark: Dict, features: Dict) -> str:
         """生成训练文本"""
@@ -193,14 +151,11 @@ class BookmarkDataProcessor:
     
     def analyze_prefixes(self, file_path: Path) -> Dict:
         """分析书签中的前缀使用情况"""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            soup = BeautifulSoup(f, 'html.parser')
-        
         prefix_stats = {}  # 存储前缀统计信息
         
         # 遍历所有书签
-        for link in soup.find_all('a'):
-            title = link.text.strip()
+        for link in bookmarks_from_events(load_events(file_path)):
+            title = link.title
             parts = title.split(':')
             
             # 收集所有以冒号结尾的前缀
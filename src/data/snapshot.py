@@ -0,0 +1,186 @@
+from pathlib import Path
+from typing import Iterator, List, Union
+import hashlib
+import marshal
+import os
+import struct
+from .models import Bookmark, Folder
+from .parser import iter_events, Event, FOLDER_START, FOLDER_END, BOOKMARK
+
+# 快照文件格式：
+#   MAGIC | marshal 版本(1字节) | 源文件内容哈希(32字节)
+#   之后是若干数据块：4字节长度 + marshal 序列化的事件列表，长度为 0 的块表示结束
+SNAPSHOT_SUFFIX = '.snapshot'
+SNAPSHOT_MAGIC = b'BMSNAP01'
+DIGEST_SIZE = 32
+BLOCK_EVENTS = 4096
+
+_BLOCK_HEADER = struct.Struct('<I')
+
+# 事件在快照中的紧凑编码
+_BOOKMARK, _FOLDER_START, _FOLDER_END = 0, 1, 2
+
+
+class SnapshotCorruptError(Exception):
+    """快照文件内容损坏"""
+
+
+def file_digest(file_path: Union[str, Path]) -> bytes:
+    """计算文件内容哈希"""
+    digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.digest()
+
+
+def snapshot_path(file_path: Union[str, Path]) -> Path:
+    """书签文件对应的快照路径（与输入文件放在同一目录）"""
+    file_path = Path(file_path)
+    return file_path.with_name(file_path.name + SNAPSHOT_SUFFIX)
+
+
+def _encode(event: Event) -> tuple:
+    kind, data = event
+    if kind == BOOKMARK:
+        return (_BOOKMARK, data.title, data.url, data.add_date, data.last_modified)
+    if kind == FOLDER_START:
+        return (_FOLDER_START, data.name, data.add_date, data.last_modified)
+    return (_FOLDER_END,)
+
+
+def _decode(record: tuple) -> Event:
+    kind = record[0]
+    if kind == _BOOKMARK:
+        return (BOOKMARK, Bookmark(*record[1:]))
+    if kind == _FOLDER_START:
+        return (FOLDER_START, Folder(*record[1:]))
+    return (FOLDER_END, None)
+
+
+def _header(digest: bytes) -> bytes:
+    return SNAPSHOT_MAGIC + bytes([marshal.version]) + digest
+
+
+def _check_blocks(f) -> bool:
+    """检查数据块分帧是否完整：各块长度与文件大小吻合，并以结束块收尾"""
+    start = f.tell()
+    end = os.fstat(f.fileno()).st_size
+    pos = start
+    while True:
+        f.seek(pos)
+        header = f.read(_BLOCK_HEADER.size)
+        if len(header) != _BLOCK_HEADER.size:
+            return False
+        size, = _BLOCK_HEADER.unpack(header)
+        pos += _BLOCK_HEADER.size
+        if size == 0:
+            f.seek(start)
+            return pos == end
+        pos += size
+        if pos > end:
+            return False
+
+
+def _open_snapshot(cache_file: Path, digest: bytes):
+    """打开与源文件哈希匹配的快照，不匹配、不存在或已损坏时返回 None
+
+    损坏（如写入中断导致截断）的快照会被删除，以便重新解析生成。
+    """
+    try:
+        f = open(cache_file, 'rb')
+    except OSError:
+        return None
+    expected = _header(digest)
+    if f.read(len(expected)) != expected:
+        f.close()
+        return None
+    if not _check_blocks(f):
+        f.close()
+        print(f"书签快照已损坏，将重新解析：{cache_file}")
+        try:
+            cache_file.unlink()
+        except OSError:
+            pass
+        return None
+    return f
+
+
+def _read_snapshot(f) -> Iterator[Event]:
+    with f:
+        while True:
+            header = f.read(_BLOCK_HEADER.size)
+            if len(header) != _BLOCK_HEADER.size:
+                raise SnapshotCorruptError(f"书签快照已损坏: {f.name}")
+            size, = _BLOCK_HEADER.unpack(header)
+            if size == 0:
+                return
+            try:
+                records = marshal.loads(f.read(size))
+            except (EOFError, ValueError, TypeError) as e:
+                raise SnapshotCorruptError(f"书签快照已损坏: {f.name}") from e
+            for record in records:
+                yield _decode(record)
+
+
+def _write_block(f, records: List[tuple]):
+    data = marshal.dumps(records)
+    f.write(_BLOCK_HEADER.pack(len(data)))
+    f.write(data)
+
+
+def _parse_and_record(file_path: Path, cache_file: Path, digest: bytes) -> Iterator[Event]:
+    """解析 HTML 的同时按块写出快照，完整遍历后才原子替换旧快照"""
+    tmp_file = cache_file.with_name(cache_file.name + f".{os.getpid()}.tmp")
+    try:
+        out = open(tmp_file, 'wb')
+    except OSError as e:
+        print(f"无法写入书签快照 {cache_file}：{str(e)}")
+        yield from iter_events(file_path)
+        return
+
+    completed = False
+    try:
+        with out:
+            out.write(_header(digest))
+            block = []
+            for event in iter_events(file_path):
+                block.append(_encode(event))
+                if len(block) >= BLOCK_EVENTS:
+                    _write_block(out, block)
+                    block = []
+                yield event
+            if block:
+                _write_block(out, block)
+            out.write(_BLOCK_HEADER.pack(0))
+        os.replace(tmp_file, cache_file)
+        completed = True
+    finally:
+        if not completed and tmp_file.exists():
+            tmp_file.unlink()
+
+
+def load_events(file_path: Union[str, Path], use_snapshot: bool = True) -> Iterator[Event]:
+    """读取书签文件的解析事件
+
+    文件内容未变化时直接从快照读取，否则解析 HTML 并顺带生成新快照。
+    """
+    if not use_snapshot:
+        return iter_events(file_path)
+
+    file_path = Path(file_path)
+    digest = file_digest(file_path)
+    cache_file = snapshot_path(file_path)
+    snapshot = _open_snapshot(cache_file, digest)
+    if snapshot is not None:
+        return _read_snapshot(snapshot)
+    return _parse_and_record(file_path, cache_file, digest)
+
+
+def has_valid_snapshot(file_path: Union[str, Path]) -> bool:
+    """判断书签文件是否已有匹配的快照"""
+    snapshot = _open_snapshot(snapshot_path(file_path), file_digest(file_path))
+    if snapshot is None:
+        return False
+    snapshot.close()
+    return True
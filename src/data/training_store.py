@@ -0,0 +1,238 @@
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Set, Union
+import hashlib
+import json
+import sqlite3
+import time
+from src.config import DATA_DIR
+from src.utils.url_utils import normalize_url
+from .models import TrainingSample, to_serializable
+
+DEFAULT_STORE_PATH = DATA_DIR / "training" / "training_data.db"
+
+# 同一书签出现不同标签时的处理方式：
+#   prefer_html —— 书签文件中的文件夹（人工整理）优先于 API 日志中的分类，同一来源以新的为准
+#   latest      —— 总是以最新的标签为准
+#   keep_first  —— 保留第一次收集到的标签
+#   majority    —— 取出现次数最多的标签，票数相同时保留当前标签
+CONFLICT_POLICIES = ('prefer_html', 'latest', 'keep_first', 'majority')
+
+SOURCE_HTML = 'html'
+SOURCE_LOG = 'log'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    title TEXT NOT NULL,
+    label TEXT NOT NULL,
+    features TEXT NOT NULL,
+    source TEXT NOT NULL,
+    conflicts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS label_votes (
+    key TEXT NOT NULL,
+    label TEXT NOT NULL,
+    votes INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (key, label)
+);
+CREATE TABLE IF NOT EXISTS input_votes (
+    input_key TEXT NOT NULL,
+    key TEXT NOT NULL,
+    label TEXT NOT NULL,
+    votes INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (input_key, key, label)
+);
+CREATE TABLE IF NOT EXISTS inputs (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    offset INTEGER NOT NULL DEFAULT 0,
+    size INTEGER NOT NULL DEFAULT 0,
+    mtime REAL NOT NULL DEFAULT 0,
+    finished INTEGER NOT NULL DEFAULT 0,
+    samples INTEGER NOT NULL DEFAULT 0,
+    ingested_at REAL NOT NULL
+);
+"""
+
+
+class TrainingDataStore:
+    """持久化、去重的训练数据集合（sqlite）
+
+    每个书签按规范化 URL 的哈希只保留一条样本，同一书签的不同标签按 conflict_policy 取舍，
+    每个标签出现的次数记录在 label_votes 中，其中每个输入贡献的次数另记在 input_votes 中。
+    inputs 表记录已经读取过的日志文件（含读取到的偏移）和书签文件快照（按内容哈希），
+    每次刷新只需处理新增的输入；输入被改写而需要重新读取时，先减去它上次贡献的票数。
+    """
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_STORE_PATH, conflict_policy: str = 'prefer_html'):
+        if conflict_policy not in CONFLICT_POLICIES:
+            raise ValueError(f"不支持的标签冲突策略: {conflict_policy}")
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conflict_policy = conflict_policy
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(_SCHEMA)
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Dict]) -> Optional['TrainingDataStore']:
+        """按 config.yaml 的 training_store 配置创建，未启用时返回 None"""
+        if not settings or not settings.get('enabled', False):
+            return None
+        return cls(settings.get('path', DEFAULT_STORE_PATH), settings.get('conflict_policy', 'prefer_html'))
+
+    @staticmethod
+    def make_key(url: str) -> str:
+        return hashlib.sha1(normalize_url(url).encode('utf-8')).hexdigest()
+
+    def input_state(self, key: str) -> Optional[sqlite3.Row]:
+        """已记录的输入状态（offset、size、mtime、finished 等），没有记录时返回 None"""
+        return self.conn.execute("SELECT * FROM inputs WHERE key = ?", (key,)).fetchone()
+
+    def add_samples(self, samples: Iterable[TrainingSample], source: str,
+                    input_record: Optional[Dict] = None) -> Dict[str, int]:
+        """写入一批样本；给出 input_record 时在同一个事务中记录该输入已经处理
+
+        input_record 包含 key、kind、name，以及可选的 offset、size、mtime、finished；
+        reset 为真表示该输入被改写、样本是从头重新读取的，写入前先撤销它上次的贡献。
+        返回新增、更新、未变化和标签冲突的样本数。
+        """
+        stats = {'added': 0, 'updated': 0, 'unchanged': 0, 'conflicts': 0}
+        now = time.time()
+        count = 0
+        input_key = input_record['key'] if input_record is not None else None
+        with self.conn:
+            affected = self._forget_input(input_key) if input_key and input_record.get('reset') else set()
+            for sample in samples:
+                count += 1
+                if not sample.label:
+                    continue
+                self._add_sample(sample, source, now, stats, input_key)
+            if affected:
+                self._recount(affected, now)
+            if input_record is not None:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO inputs (key, kind, name, offset, size, mtime, finished, samples, "
+                    "ingested_at) VALUES (?, ?, ?, ?, ?, ?, ?, "
+                    "COALESCE((SELECT samples FROM inputs WHERE key = ?), 0) + ?, ?)",
+                    (input_record['key'], input_record['kind'], input_record['name'],
+                     input_record.get('offset', 0), input_record.get('size', 0), input_record.get('mtime', 0),
+                     int(input_record.get('finished', False)), input_record['key'], count, now)
+                )
+        return stats
+
+    def _add_sample(self, sample: TrainingSample, source: str, now: float, stats: Dict[str, int],
+                    input_key: Optional[str] = None):
+        bookmark = sample.bookmark
+        key = self.make_key(bookmark.url)
+        label = sample.label
+        self.conn.execute(
+            "INSERT INTO label_votes (key, label, votes) VALUES (?, ?, 1) "
+            "ON CONFLICT (key, label) DO UPDATE SET votes = votes + 1",
+            (key, label)
+        )
+        if input_key is not None:
+            self.conn.execute(
+                "INSERT INTO input_votes (input_key, key, label, votes) VALUES (?, ?, ?, 1) "
+                "ON CONFLICT (input_key, key, label) DO UPDATE SET votes = votes + 1",
+                (input_key, key, label)
+            )
+        features = json.dumps(sample.features, ensure_ascii=False, default=to_serializable)
+        row = self.conn.execute("SELECT label, source FROM samples WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.conn.execute(
+                "INSERT INTO samples (key, url, title, label, features, source, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, bookmark.url, bookmark.title, label, features, source, now, now)
+            )
+            stats['added'] += 1
+            return
+
+        if row['label'] == label:
+            # 标签相同：书签文件确认过的样本记为 html 来源
+            if source == SOURCE_HTML and row['source'] != SOURCE_HTML:
+                self.conn.execute("UPDATE samples SET source = ?, updated_at = ? WHERE key = ?",
+                                  (source, now, key))
+            stats['unchanged'] += 1
+            return
+
+        stats['conflicts'] += 1
+        label = self._resolve(key, row, label, source)
+        if label == row['label']:
+            self.conn.execute("UPDATE samples SET conflicts = conflicts + 1 WHERE key = ?", (key,))
+            stats['unchanged'] += 1
+            return
+        self.conn.execute(
+            "UPDATE samples SET url = ?, title = ?, label = ?, features = ?, source = ?, "
+            "conflicts = conflicts + 1, updated_at = ? WHERE key = ?",
+            (bookmark.url, bookmark.title, label, features, source, now, key)
+        )
+        stats['updated'] += 1
+
+    def _forget_input(self, input_key: str) -> Set[str]:
+        """撤销一个输入上次贡献的票数和读取记录，返回受影响的样本 key"""
+        rows = self.conn.execute("SELECT key, label, votes FROM input_votes WHERE input_key = ?",
+                                 (input_key,)).fetchall()
+        self.conn.executemany("UPDATE label_votes SET votes = votes - ? WHERE key = ? AND label = ?",
+                              [(row['votes'], row['key'], row['label']) for row in rows])
+        self.conn.execute("DELETE FROM input_votes WHERE input_key = ?", (input_key,))
+        self.conn.execute("DELETE FROM inputs WHERE key = ?", (input_key,))
+        return {row['key'] for row in rows}
+
+    def _recount(self, keys: Iterable[str], now: float):
+        """重新读取输入后整理受影响的样本
+
+        不再有任何票数的样本被删除；当前标签已没有票数，或按 majority 策略票数少于其他标签时，
+        改为票数最多的标签。
+        """
+        for key in keys:
+            self.conn.execute("DELETE FROM label_votes WHERE key = ? AND votes <= 0", (key,))
+            votes = dict(self.conn.execute("SELECT label, votes FROM label_votes WHERE key = ?", (key,)).fetchall())
+            if not votes:
+                self.conn.execute("DELETE FROM samples WHERE key = ?", (key,))
+                continue
+            row = self.conn.execute("SELECT label FROM samples WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                continue
+            best = max(votes, key=votes.get)
+            current = votes.get(row['label'], 0)
+            if current == 0 or (self.conflict_policy == 'majority' and current < votes[best]):
+                self.conn.execute("UPDATE samples SET label = ?, updated_at = ? WHERE key = ?", (best, now, key))
+
+    def _resolve(self, key: str, row: sqlite3.Row, label: str, source: str) -> str:
+        """按冲突策略决定保留的标签"""
+        policy = self.conflict_policy
+        if policy == 'keep_first':
+            return row['label']
+        if policy == 'prefer_html' and row['source'] == SOURCE_HTML and source != SOURCE_HTML:
+            return row['label']
+        if policy == 'majority':
+            votes = dict(self.conn.execute("SELECT label, votes FROM label_votes WHERE key = ?", (key,)).fetchall())
+            if votes.get(label, 0) <= votes.get(row['label'], 0):
+                return row['label']
+        return label
+
+    def iter_samples(self) -> Iterator[Dict]:
+        """按收集顺序逐条产出样本，结构与 TrainingSample.to_dict() 相同"""
+        for row in self.conn.execute("SELECT url, title, label, features FROM samples ORDER BY created_at, rowid"):
+            yield {
+                'input': {'title': row['title'], 'url': row['url'], 'features': json.loads(row['features'])},
+                'label': row['label']
+            }
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM samples").fetchone()[0]
+
+    def stats(self) -> Dict:
+        """样本数、有冲突的样本数、按来源的样本数和已处理的输入数"""
+        conflicted = self.conn.execute("SELECT COUNT(*) FROM samples WHERE conflicts > 0").fetchone()[0]
+        sources = dict(self.conn.execute("SELECT source, COUNT(*) FROM samples GROUP BY source").fetchall())
+        inputs = dict(self.conn.execute("SELECT kind, COUNT(*) FROM inputs GROUP BY kind").fetchall())
+        return {'samples': len(self), 'conflicted': conflicted, 'sources': sources, 'inputs': inputs}
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,138 @@
+from pathlib import Path
+from typing import Dict, IO, List, Optional, Union
+import gzip
+import hashlib
+import json
+import os
+from src.utils.url_utils import normalize_url
+from .models import to_serializable
+
+FORMATS = ('jsonl', 'fasttext')
+_EXTENSIONS = {'jsonl': '.jsonl', 'fasttext': '.txt'}
+
+# 写文件时使用的缓冲区大小
+WRITE_BUFFER_SIZE = 1 << 20
+
+
+def is_validation(url: str, validation_ratio: float) -> bool:
+    """按规范化后 URL 的哈希决定样本是否划入验证集
+
+    同一个书签在不同的运行、不同的进程中总是落在同一侧，
+    指向同一页面的不同写法也不会分别出现在训练集和验证集中。
+    """
+    if validation_ratio <= 0:
+        return False
+    digest = hashlib.blake2b(normalize_url(url).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') < validation_ratio * (1 << 64)
+
+
+def format_sample(sample: Dict, format: str = 'jsonl') -> str:
+    """把一条训练数据格式化为一行（不含换行符）
+
+    jsonl 为完整的 JSON 对象；fasttext 为 fastText 原生格式 "__label__x 文本"。
+    """
+    if format == 'fasttext':
+        # fastText 按行读取样本，文本中的换行和制表符替换为空格
+        text = ' '.join(str(sample.get('text', '')).split())
+        return f"{sample['label']} {text}"
+    return json.dumps(sample, ensure_ascii=False, default=to_serializable)
+
+
+class TrainingDataWriter:
+    """流式写出训练数据：边生成边写入，不在内存中保留全部样本
+
+    - format 为 jsonl（每行一个 JSON 对象）或 fasttext（"__label__x 文本"）；
+    - validation_ratio 大于 0 时按 URL 哈希把样本确定性地划分到 train / valid 两组文件；
+    - shard_bytes 为每个分片的大小上限（按写入的未压缩字节数计），超过后切换到下一个分片；
+    - compress 为真时每个分片用 gzip 压缩。
+
+    分片命名为 {name}.{train|valid}-00000{.jsonl|.txt}[.gz]。每个分片先写入 .tmp 文件，写完再改名，
+    中途出错不会留下不完整的分片；close() 时删除同名前缀下本次没有写到的旧分片。
+    """
+
+    def __init__(self, output_dir: Union[str, Path], name: str = 'training_data', format: str = 'jsonl',
+                 shard_bytes: Optional[int] = None, compress: bool = False, validation_ratio: float = 0.0):
+        if format not in FORMATS:
+            raise ValueError(f"不支持的训练数据格式: {format}")
+        if not 0 <= validation_ratio < 1:
+            raise ValueError(f"validation_ratio 必须在 [0, 1) 之间: {validation_ratio}")
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.name = name
+        self.format = format
+        self.shard_bytes = shard_bytes
+        self.compress = compress
+        self.validation_ratio = validation_ratio
+        self.suffix = _EXTENSIONS[format] + ('.gz' if compress else '')
+        self.files: List[Path] = []
+        self.counts = {'train': 0, 'valid': 0}
+        self._shards: Dict[str, Dict] = {}
+
+    def write(self, sample: Dict, url: str) -> str:
+        """写出一条训练数据，返回它所在的数据集（train 或 valid）"""
+        split = 'valid' if is_validation(url, self.validation_ratio) else 'train'
+        self.write_line(format_sample(sample, self.format), split)
+        return split
+
+    def write_line(self, line: str, split: str = 'train'):
+        """写出已经格式化好的一行（例如在子进程中调用 format_sample 得到的结果）"""
+        data = (line + '\n').encode('utf-8')
+        shard = self._shards.get(split)
+        if shard is not None and self.shard_bytes and shard['size'] and shard['size'] + len(data) > self.shard_bytes:
+            self._finish_shard(split)
+            shard = None
+        if shard is None:
+            shard = self._open_shard(split)
+        shard['fp'].write(data)
+        shard['size'] += len(data)
+        self.counts[split] += 1
+
+    def _open_shard(self, split: str) -> Dict:
+        index = sum(1 for path in self.files if path.name.startswith(f"{self.name}.{split}-"))
+        path = self.output_dir / f"{self.name}.{split}-{index:05d}{self.suffix}"
+        tmp_path = path.with_name(path.name + '.tmp')
+        raw: IO[bytes] = open(tmp_path, 'wb', buffering=WRITE_BUFFER_SIZE)
+        fp = gzip.GzipFile(filename=path.name[:-3], mode='wb', fileobj=raw, mtime=0) if self.compress else raw
+        shard = {'path': path, 'tmp_path': tmp_path, 'raw': raw, 'fp': fp, 'size': 0}
+        self._shards[split] = shard
+        return shard
+
+    def _finish_shard(self, split: str):
+        shard = self._shards.pop(split)
+        self._close_files(shard)
+        os.replace(shard['tmp_path'], shard['path'])
+        self.files.append(shard['path'])
+
+    @staticmethod
+    def _close_files(shard: Dict):
+        shard['fp'].close()
+        # GzipFile 不会关闭传入的文件对象
+        shard['raw'].close()
+
+    def close(self) -> Dict[str, int]:
+        """写完所有分片并清理旧分片，返回 train / valid 的样本数"""
+        for split in list(self._shards):
+            self._finish_shard(split)
+        written = set(self.files)
+        for split in ('train', 'valid'):
+            for path in self.output_dir.glob(f"{self.name}.{split}-[0-9][0-9][0-9][0-9][0-9]{self.suffix}"):
+                if path not in written:
+                    path.unlink()
+        return dict(self.counts)
+
+    def abort(self):
+        """放弃尚未写完的分片（已完成的分片保留）"""
+        for shard in self._shards.values():
+            self._close_files(shard)
+            if shard['tmp_path'].exists():
+                shard['tmp_path'].unlink()
+        self._shards.clear()
+
+    def __enter__(self) -> 'TrainingDataWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
@@ -0,0 +1,202 @@
+from array import array
+from functools import lru_cache
+from itertools import islice
+from math import sqrt
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import re
+import zlib
+from .features import FeaturePipeline
+from .models import Bookmark, FeatureSet
+
+try:
+    import numpy as np
+except ImportError:  # 向量化是可选功能，只有使用时才需要 numpy
+    np = None
+
+DEFAULT_N_FEATURES = 1 << 20
+
+# 各类特征的默认权重
+DEFAULT_WEIGHTS = {
+    'prefix': 1.0,
+    'domain': 1.0,
+    'path': 0.5,
+    'keyword': 1.0,
+    'ngram': 0.5
+}
+
+# 中日韩文字：汉字（含扩展 A 与兼容汉字）、假名和谚文
+_CJK_RUN = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]+')
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("特征向量化需要 numpy，请先执行 pip install numpy")
+
+
+class CSRMatrix:
+    """CSR 格式的稀疏矩阵：第 i 行的列号为 indices[indptr[i]:indptr[i+1]]，取值为 data 中的对应部分
+
+    每行的列号已排序且不重复，可以直接交给 scipy.sparse.csr_matrix。
+    """
+
+    def __init__(self, indptr, indices, data, n_features: int):
+        _require_numpy()
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.n_features = n_features
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self), self.n_features
+
+    @property
+    def nnz(self) -> int:
+        return len(self.indices)
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    def row(self, index: int) -> Tuple['np.ndarray', 'np.ndarray']:
+        """第 index 行的 (列号, 取值)"""
+        start, end = self.indptr[index], self.indptr[index + 1]
+        return self.indices[start:end], self.data[start:end]
+
+    def dot(self, vector) -> 'np.ndarray':
+        """矩阵乘以长度为 n_features 的稠密向量，例如与某一行的内积做相似度检索"""
+        products = self.data * np.asarray(vector, dtype=self.data.dtype)[self.indices]
+        return np.bincount(self._row_ids(), weights=products, minlength=len(self))
+
+    def _row_ids(self) -> 'np.ndarray':
+        return np.repeat(np.arange(len(self)), np.diff(self.indptr))
+
+    def to_dense(self) -> 'np.ndarray':
+        """转换为稠密矩阵（只适合少量行）"""
+        dense = np.zeros(self.shape, dtype=self.data.dtype)
+        dense[self._row_ids(), self.indices] = self.data
+        return dense
+
+    def to_scipy(self):
+        """转换为 scipy.sparse.csr_matrix，不复制数据"""
+        try:
+            from scipy.sparse import csr_matrix
+        except ImportError:
+            raise ImportError("转换为 scipy 稀疏矩阵需要 scipy，请先执行 pip install scipy")
+        return csr_matrix((self.data, self.indices, self.indptr), shape=self.shape)
+
+    @classmethod
+    def concatenate(cls, matrices: List['CSRMatrix']) -> 'CSRMatrix':
+        """按行拼接多个矩阵（例如流式模式产出的各个分块）"""
+        _require_numpy()
+        if not matrices:
+            raise ValueError("至少需要一个矩阵")
+        n_features = matrices[0].n_features
+        if any(matrix.n_features != n_features for matrix in matrices):
+            raise ValueError("矩阵的列数不一致")
+        offsets = np.cumsum([0] + [matrix.nnz for matrix in matrices[:-1]])
+        indptr = np.concatenate([matrices[0].indptr[:1]] + [
+            matrix.indptr[1:] + offset for matrix, offset in zip(matrices, offsets)
+        ])
+        return cls(indptr, np.concatenate([m.indices for m in matrices]),
+                   np.concatenate([m.data for m in matrices]), n_features)
+
+
+class HashingVectorizer:
+    """把书签特征哈希为固定宽度的稀疏向量
+
+    前缀、域名（以及上一级域名）、路径段、关键词和标题中中日韩文字的字符 n-gram
+    各自加上类别前缀（p=、d=、s=、k=、c=）后用 CRC32 哈希到 n_features 列中；
+    alternate_sign 为真时用哈希值的最高位决定符号，使冲突在期望上相互抵消。
+    不需要词表，内存占用与书签数量无关，不同进程、不同批次的结果可以直接合并。
+    """
+
+    def __init__(self, n_features: int = DEFAULT_N_FEATURES, ngram_range: Tuple[int, int] = (1, 2),
+                 weights: Optional[Dict[str, float]] = None, max_path_segments: int = 4,
+                 alternate_sign: bool = True, normalize: bool = True,
+                 pipeline: Optional[FeaturePipeline] = None):
+        if not 0 < n_features <= 1 << 31:
+            raise ValueError(f"n_features 必须在 1 到 2^31 之间: {n_features}")
+        self.n_features = n_features
+        self.ngram_range = ngram_range
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.max_path_segments = max_path_segments
+        self.alternate_sign = alternate_sign
+        self.normalize = normalize
+        self.pipeline = pipeline if pipeline is not None else FeaturePipeline()
+        # 域名、关键词等取值重复度很高，缓存每个特征的 (列号, 符号)
+        self._hash = lru_cache(maxsize=1 << 16)(self._hash_token)
+
+    def _hash_token(self, token: str) -> Tuple[int, float]:
+        value = zlib.crc32(token.encode('utf-8'))
+        sign = -1.0 if self.alternate_sign and value & 0x80000000 else 1.0
+        return value % self.n_features, sign
+
+    def tokens(self, features: FeatureSet) -> Iterator[Tuple[str, float]]:
+        """产出一个书签的 (特征, 权重)"""
+        weights = self.weights
+        prefixes = set(features.prefixes)
+        if features.prefix != 'unknown':
+            prefixes.add(features.prefix)
+        for prefix in prefixes:
+            yield 'p=' + prefix, weights['prefix']
+
+        if features.domain:
+            host = features.domain.rsplit('@', 1)[-1].split(':', 1)[0].lower()
+            yield 'd=' + host, weights['domain']
+            parts = host.split('.')
+            if len(parts) > 2:
+                yield 'd=' + '.'.join(parts[-2:]), weights['domain']
+
+        for segment in features.path_segments[:self.max_path_segments]:
+            yield 's=' + segment.lower(), weights['path']
+
+        for keyword in features.clean_keywords:
+            yield 'k=' + keyword, weights['keyword']
+
+        low, high = self.ngram_range
+        for run in _CJK_RUN.findall(features.clean_title):
+            for n in range(low, min(high, len(run)) + 1):
+                for start in range(len(run) - n + 1):
+                    yield 'c=' + run[start:start + n], weights['ngram']
+
+    def _append_row(self, features: FeatureSet, indices: array, data: array):
+        row: Dict[int, float] = {}
+        hashed = self._hash
+        for token, weight in self.tokens(features):
+            index, sign = hashed(token)
+            row[index] = row.get(index, 0.0) + sign * weight
+        norm = sqrt(sum(value * value for value in row.values())) if self.normalize else 1.0
+        for index in sorted(row):
+            value = row[index]
+            if value:
+                indices.append(index)
+                data.append(value / norm)
+
+    def transform(self, features: Iterable[FeatureSet]) -> CSRMatrix:
+        """批量模式：把特征记录转换为稀疏矩阵，每个记录一行"""
+        _require_numpy()
+        indptr, indices, data = array('q', [0]), array('i'), array('f')
+        for item in features:
+            self._append_row(item, indices, data)
+            indptr.append(len(indices))
+        return CSRMatrix(
+            indptr=np.frombuffer(indptr, dtype=np.int64),
+            indices=np.frombuffer(indices, dtype=np.int32),
+            data=np.frombuffer(data, dtype=np.float32),
+            n_features=self.n_features
+        )
+
+    def transform_bookmarks(self, bookmarks: Iterable[Union[Dict, Bookmark]]) -> CSRMatrix:
+        """批量模式：先经特征流程提取特征，再转换为稀疏矩阵"""
+        extract = self.pipeline.extract
+        return self.transform(extract(b.get('title', ''), b.get('url', '')) for b in bookmarks)
+
+    def iter_transform(self, bookmarks: Iterable[Union[Dict, Bookmark]],
+                       batch_size: int = 10000) -> Iterator[CSRMatrix]:
+        """流式模式：逐块读取书签，每 batch_size 个书签产出一个矩阵，内存占用只与分块大小有关"""
+        iterator = iter(bookmarks)
+        while True:
+            chunk = list(islice(iterator, batch_size))
+            if not chunk:
+                return
+            yield self.transform_bookmarks(chunk)
@@ -0,0 +1,144 @@
+from html import escape
+from pathlib import Path
+from typing import IO, Iterable, Union
+import os
+import re
+import tempfile
+from .models import Bookmark, Folder
+
+BOOKMARKS_HEADER = """<!DOCTYPE NETSCAPE-Bookmark-file-1>
+<!-- This is an automatically generated file.
+     It will be read and overwritten.
+     DO NOT EDIT! -->
+<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">
+<TITLE>Bookmarks</TITLE>
+<H1>Bookmarks</H1>
+<DL><p>
+"""
+BOOKMARKS_FOOTER = "</DL><p>"
+INDENT = "    "
+
+# 写文件时使用的缓冲区大小
+WRITE_BUFFER_SIZE = 1 << 20
+
+
+# 绝大多数标题和 URL 不含特殊字符，先判断再转义可以省掉大部分 escape 调用
+_needs_escape = re.compile(r'[&<>"\']').search
+
+
+def _text(value) -> str:
+    value = str(value)
+    return escape(value, quote=False) if _needs_escape(value) else value
+
+
+def _attr(value) -> str:
+    value = str(value)
+    return escape(value, quote=True) if _needs_escape(value) else value
+
+
+def _date_attrs(add_date, last_modified) -> str:
+    """生成 ADD_DATE / LAST_MODIFIED 属性"""
+    attributes = ''
+    if add_date:
+        attributes += f' ADD_DATE="{_attr(add_date)}"'
+    if last_modified:
+        attributes += f' LAST_MODIFIED="{_attr(last_modified)}"'
+    return attributes
+
+
+class NetscapeBookmarkWriter:
+    """把书签和文件夹按 Netscape 格式直接写入文件句柄
+
+    每个书签/文件夹写一行，不在内存中拼接整份文档；标题和属性都会做 HTML 转义。
+    文件夹树用显式栈遍历，深层嵌套也不会触发递归限制。
+    """
+
+    def __init__(self, fp: IO[str]):
+        self.fp = fp
+        self.depth = 1
+
+    def write_header(self):
+        self.fp.write(BOOKMARKS_HEADER)
+
+    def write_footer(self):
+        self.fp.write(BOOKMARKS_FOOTER)
+
+    def start_folder(self, folder):
+        indent = INDENT * self.depth
+        attrs = _date_attrs(folder.get('add_date', ''), folder.get('last_modified', ''))
+        self.fp.write(f'{indent}<DT><H3{attrs}>{_text(folder.get("name", ""))}</H3>\n'
+                      f'{indent}<DL><p>\n')
+        self.depth += 1
+
+    def end_folder(self):
+        self.depth -= 1
+        self.fp.write(f'{INDENT * self.depth}</DL><p>\n')
+
+    def write_bookmark(self, bookmark):
+        if isinstance(bookmark, Bookmark):
+            title, url = bookmark.title, bookmark.url
+            add_date, last_modified = bookmark.add_date, bookmark.last_modified
+        else:
+            title, url = bookmark.get('title', ''), bookmark.get('url', '')
+            add_date, last_modified = bookmark.get('add_date', ''), bookmark.get('last_modified', '')
+        self.fp.write(
+            f'{INDENT * self.depth}<DT><A HREF="{_attr(url)}"{_date_attrs(add_date, last_modified)}>'
+            f'{_text(title)}</A>\n'
+        )
+
+    def write_folder(self, folder):
+        """写出文件夹及其全部内容"""
+        stack = [(folder, False)]
+        while stack:
+            node, finished = stack.pop()
+            if finished:
+                self.end_folder()
+                continue
+            self.start_folder(node)
+            for bookmark in node.get('bookmarks') or []:
+                self.write_bookmark(bookmark)
+            stack.append((node, True))
+            stack.extend((subfolder, False) for subfolder in reversed(node.get('subfolders') or []))
+
+    def write_items(self, items: Iterable):
+        """写出书签数据列表：书签、文件夹或 {'folders': [...]} 结构"""
+        for item in items:
+            if isinstance(item, Folder):
+                self.write_folder(item)
+            elif isinstance(item, dict) and 'folders' in item:
+                for folder in item['folders']:
+                    self.write_folder(folder)
+            elif 'title' in item and 'url' in item:
+                self.write_bookmark(item)
+
+    def write_document(self, items: Iterable):
+        """写出完整的书签文档"""
+        self.write_header()
+        self.write_items(items)
+        self.write_footer()
+
+
+def write_bookmarks_file(output_path: Union[str, Path], items: Iterable):
+    """以流的方式写出书签文件
+
+    先写入同目录下的临时文件，完成后再原子替换目标文件，
+    写到一半出错时不会留下损坏的输出。
+    """
+    output_path = Path(output_path)
+    fd, tmp_path = tempfile.mkstemp(dir=output_path.parent,
+                                    prefix=f".{output_path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as f:
+            # mkstemp 创建的文件权限为 0600，替换前沿用原文件权限
+            try:
+                os.fchmod(f.fileno(), output_path.stat().st_mode & 0o777)
+            except FileNotFoundError:
+                os.fchmod(f.fileno(), 0o644)
+            NetscapeBookmarkWriter(f).write_document(items)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
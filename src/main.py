@@ -1,23 +1,46 @@
 from src.bookmark_processor import BookmarkProcessor
 from src.clients.ernie_client import ErnieClient
 from src.clients.chatgpt_client import ChatGPTClient
-from src.config import DEFAULT_INPUT_FILE, DEFAULT_OUTPUT_FILE
+from src.clients.hedged_client import HedgedClient
+from src.config import Config, DEFAULT_INPUT_FILE, DEFAULT_OUTPUT_FILE
 import argparse
 
+CLIENTS = {'ernie': ErnieClient, 'chatgpt': ChatGPTClient}
+
+def create_client(name: str):
+    """按名称创建客户端；hedged 组合 config.yaml 中 api.hedged 指定的主、备服务商"""
+    if name != 'hedged':
+        return CLIENTS[name]()
+    settings = Config().api_settings.get('hedged') or {}
+    primary = settings.get('primary', 'ernie')
+    secondary = settings.get('secondary', 'chatgpt' if primary == 'ernie' else 'ernie')
+    return HedgedClient(CLIENTS[primary](), CLIENTS[secondary]())
+
 def main():
     # 解析命令行参数
     parser = argparse.ArgumentParser(description='书签整理工具')
-    parser.add_argument('--client', type=str, choices=['ernie', 'chatgpt'], 
+    parser.add_argument('--client', type=str, choices=['ernie', 'chatgpt', 'hedged'], 
                        default='ernie', help='选择使用的AI客户端')
     parser.add_argument('--input', type=str, default=str(DEFAULT_INPUT_FILE),
                        help='输入文件路径')
     parser.add_argument('--output', type=str, default=str(DEFAULT_OUTPUT_FILE),
                        help='输出文件路径')
+    parser.add_argument('--columnar', action='store_true',
+                       help='使用列式存储加载书签（适合百万级书签，需要 numpy）')
+    parser.add_argument('--stream', action='store_true',
+                       help='使用流式响应，每个分类完成后立即输出')
     args = parser.parse_args()
     
     # 初始化处理器和客户端
-    processor = BookmarkProcessor()
-    client = ErnieClient() if args.client == 'ernie' else ChatGPTClient()
+    processor = BookmarkProcessor(columnar=args.columnar)
+    client = create_client(args.client)
+    # 对冲客户端的实际请求由主、备两个客户端发出
+    callers = [client.primary, client.secondary] if isinstance(client, HedgedClient) else [client]
+    for caller in callers:
+        if args.stream and caller.supports_stream:
+            caller.stream = True
+        if caller.stream:
+            caller.on_category = lambda category, items: print(f"已完成分类：{category}（{len(items)} 个书签）")
     
     try:
         print("开始加载书签文件...")
@@ -46,6 +69,11 @@ def main():
         
         print(f"书签整理完成！输出文件：{args.output}")
         
+        if isinstance(client, HedgedClient):
+            print("\n对冲请求统计：")
+            for provider, stats in client.hedge_report().items():
+                print(f"- {provider}: {stats}")
+        
     except Exception as e:
         print(f"处理过程中出现错误：{str(e)}")
 
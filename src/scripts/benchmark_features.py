@@ -0,0 +1,212 @@
+from typing import Callable, Dict, List
+from urllib.parse import urlparse, urlsplit
+import argparse
+import gc
+import os
+import random
+import re
+import time
+from src.data.features import FeaturePipeline
+from src.data.models import BookmarkFeatures
+from src.data.preprocessor import BookmarkDataPreprocessor
+from src.data.parallel import map_chunks
+from src.data.processor import BookmarkDataProcessor, _training_chunk
+from src.data.vectorizer import HashingVectorizer, np
+
+# 预编译匹配器的标题特征吞吐量目标（相对旧实现的倍数）
+TARGET_SPEEDUP = 5.0
+
+
+class LegacyPreprocessor(BookmarkDataPreprocessor):
+    """旧实现：每次调用都按字典逐个模式调用 re.match / re.search / re.sub"""
+
+    def extract_features(self, title: str, url: str) -> Dict:
+        return {
+            'prefix': self._extract_prefix(title),
+            'domain_type': self._extract_domain_type(url),
+            'path_segments': self._extract_path_segments(url),
+            'keywords': self._extract_keywords(title)
+        }
+
+    def _extract_prefix(self, title: str) -> str:
+        for pattern, category in self.prefix_patterns.items():
+            if re.match(pattern, title, re.I):
+                return category
+        return 'unknown'
+
+    def _extract_domain_type(self, url: str) -> str:
+        domain = urlparse(url).netloc
+        for pattern, category in self.domain_patterns.items():
+            if re.search(pattern, domain, re.I):
+                return category
+        return 'unknown'
+
+    def _extract_keywords(self, title: str) -> List[str]:
+        for pattern in self.prefix_patterns:
+            title = re.sub(pattern, '', title, flags=re.I)
+        return re.findall(r'\w+', title.lower())
+
+
+class LegacyProcessor(BookmarkDataProcessor):
+    """旧实现：单独解析 URL、按冒号拆分前缀后再次分词"""
+
+    def _build_features(self, title: str, url: str, folder: str, folder_path: str) -> BookmarkFeatures:
+        prefixes = self._extract_prefixes(title)
+        clean_title = title.split(':')[-1].strip() if prefixes else title
+        words = re.findall(r'\w+', clean_title.lower())
+        return BookmarkFeatures(prefixes=prefixes, has_prefix=bool(prefixes), clean_title=clean_title,
+                                domain=urlsplit(url).netloc if url else '', folder=folder,
+                                folder_path=folder_path, keywords=[w for w in words if len(w) > 1])
+
+
+PREFIXES = ['doc:', 'pkg:', 'tip:', 'res:', 'entry:', 'site:', '', '', '', '']
+WORDS = ['Python', '文档', 'API', 'Reference', '教程', 'GitHub', 'guide', '入门', 'React', '工具']
+HOSTS = ['github.com', 'docs.python.org', 'help.example.com', 'www.zhihu.com', 'news.ycombinator.com',
+         'developer.mozilla.org', 'blog.example.cn', 'docs.djangoproject.com']
+
+
+def synthetic_bookmarks(count: int, seed: int = 0) -> List[Dict]:
+    """生成带随机前缀、标题词和常见域名的合成书签"""
+    rng = random.Random(seed)
+    return [{
+        'title': rng.choice(PREFIXES) + ' '.join(rng.choices(WORDS, k=rng.randint(2, 6))) + f" {index}",
+        'url': f"https://{rng.choice(HOSTS)}/section{index % 50}/page{index}"
+    } for index in range(count)]
+
+
+def timed(func: Callable) -> float:
+    """运行一次并返回耗时；计时期间关闭垃圾回收，避免大量结果列表触发回收干扰对比"""
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+TITLE_CASE = '标题特征（前缀 + 关键词）'
+
+
+def bench_preprocessor(count: int):
+    """BookmarkDataPreprocessor：逐模式调用 re 与预编译合并正则的吞吐量对比
+
+    目标是标题特征提速 5 倍。100 万个合成书签上实测约 4.3-4.6 倍，未达到目标：
+    剩余耗时几乎全部是两种实现共用的 \\w+ 分词。
+    """
+    bookmarks = synthetic_bookmarks(count)
+    titles = [bookmark['title'] for bookmark in bookmarks]
+    legacy, compiled = LegacyPreprocessor(), BookmarkDataPreprocessor()
+    print(f"\n[preprocessor] {count} 个合成书签")
+
+    sample = bookmarks[:1000]
+    if [legacy.extract_features(b['title'], b['url']) for b in sample] != compiled.extract_features_many(sample):
+        print("  ⚠ 结果与旧实现不一致")
+
+    cases = {
+        TITLE_CASE: (
+            lambda: [(legacy._extract_prefix(t), legacy._extract_keywords(t)) for t in titles],
+            lambda: [compiled._split_title(t) for t in titles],
+        ),
+        'extract_features 全部特征': (
+            lambda: [legacy.extract_features(b['title'], b['url']) for b in bookmarks],
+            lambda: compiled.extract_features_many(bookmarks),
+        ),
+    }
+    for name, (run_legacy, run_compiled) in cases.items():
+        legacy_seconds = timed(run_legacy)
+        compiled_seconds = timed(run_compiled)
+        print(f"{name}: 旧实现 {legacy_seconds:.2f}s ({count / legacy_seconds:,.0f}/s)  "
+              f"预编译 {compiled_seconds:.2f}s ({count / compiled_seconds:,.0f}/s)  "
+              f"加速 {legacy_seconds / compiled_seconds:.1f}x")
+        if name == TITLE_CASE and legacy_seconds / compiled_seconds < TARGET_SPEEDUP:
+            print(f"  未达到 {TARGET_SPEEDUP:.0f}x 目标：剩余耗时主要是两种实现共用的 \\w+ 分词")
+
+
+def bench_pipeline(count: int):
+    """两个提取器各自解析与 FeaturePipeline 一次提取全部特征的吞吐量对比"""
+    bookmarks = synthetic_bookmarks(count)
+    for bookmark in bookmarks:
+        bookmark['folder'] = '技术'
+    legacy_preprocessor, legacy_processor = LegacyPreprocessor(), LegacyProcessor()
+    pipeline = FeaturePipeline()
+    print(f"\n[pipeline] {count} 个合成书签")
+
+    def run_legacy():
+        for bookmark in bookmarks:
+            legacy_preprocessor.extract_features(bookmark['title'], bookmark['url'])
+            legacy_processor.extract_features(bookmark)
+
+    sample = bookmarks[:1000]
+    preprocessor, processor = BookmarkDataPreprocessor(pipeline), BookmarkDataProcessor(pipeline)
+    if ([legacy_preprocessor.extract_features(b['title'], b['url']) for b in sample]
+            != preprocessor.extract_features_many(sample)
+            or [legacy_processor.extract_features(b) for b in sample] != processor.extract_features_many(sample)):
+        print("  ⚠ 结果与旧实现不一致")
+
+    legacy_seconds = timed(run_legacy)
+    pipeline_seconds = timed(lambda: pipeline.extract_many(bookmarks))
+    info = pipeline.host_info.cache_info()
+    print(f"两种特征: 旧实现 {legacy_seconds:.2f}s ({count / legacy_seconds:,.0f}/s)  "
+          f"统一流程 {pipeline_seconds:.2f}s ({count / pipeline_seconds:,.0f}/s)  "
+          f"加速 {legacy_seconds / pipeline_seconds:.1f}x  主机名缓存命中 {info.hits:,} / 未命中 {info.misses:,}")
+
+
+def bench_vectorizer(count: int):
+    """HashingVectorizer：批量与流式模式的吞吐量和稀疏矩阵大小"""
+    if np is None:
+        print("\n[vectorizer] 需要 numpy，跳过")
+        return
+    bookmarks = synthetic_bookmarks(count)
+    vectorizer = HashingVectorizer()
+    print(f"\n[vectorizer] {count} 个合成书签，{vectorizer.n_features} 列")
+
+    result = {}
+    batch_seconds = timed(lambda: result.setdefault('matrix', vectorizer.transform_bookmarks(bookmarks)))
+    matrix = result['matrix']
+    size = matrix.indptr.nbytes + matrix.indices.nbytes + matrix.data.nbytes
+    print(f"批量: {batch_seconds:.2f}s ({count / batch_seconds:,.0f}/s)  非零元 {matrix.nnz:,} "
+          f"(每行 {matrix.nnz / count:.1f})  数组 {size / 1024 / 1024:.1f} MB")
+
+    rows = []
+    stream_seconds = timed(lambda: rows.extend(len(chunk) for chunk in vectorizer.iter_transform(iter(bookmarks))))
+    print(f"流式: {stream_seconds:.2f}s ({count / stream_seconds:,.0f}/s)  {len(rows)} 个分块")
+
+
+def bench_parallel(count: int):
+    """并行特征提取：1 到 8 个进程生成训练数据的耗时与加速比"""
+    bookmarks = synthetic_bookmarks(count)
+    columns = [[b['title'] for b in bookmarks], [b['url'] for b in bookmarks],
+               ['技术'] * count, ['技术'] * count]
+    pipeline = FeaturePipeline()
+    print(f"\n[parallel] {count} 个合成书签，CPU 核数 {os.cpu_count()}")
+
+    baseline = None
+    for workers in (1, 2, 4, 8):
+        seconds = timed(lambda: list(map_chunks(_training_chunk, columns, pipeline, workers=workers)))
+        baseline = baseline or seconds
+        print(f"{workers} 个进程: {seconds:.2f}s ({count / seconds:,.0f}/s)  加速 {baseline / seconds:.1f}x")
+
+
+SCENARIOS = {
+    'preprocessor': bench_preprocessor,
+    'pipeline': bench_pipeline,
+    'vectorizer': bench_vectorizer,
+    'parallel': bench_parallel,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='特征提取性能基准')
+    parser.add_argument('--count', type=int, default=1000000, help='合成书签数量')
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), action='append',
+                        help='要运行的场景（可重复，默认全部）')
+    args = parser.parse_args()
+
+    for name in args.scenario or list(SCENARIOS):
+        SCENARIOS[name](args.count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+from pathlib import Path
+from typing import Callable, List, Dict
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from bs4 import BeautifulSoup
+from src.bookmark_processor import BookmarkProcessor
+from src.data.columnar import ColumnarBookmarkStore
+from src.data.collector import BookmarkDataCollector
+from src.data.preprocessor import BookmarkDataPreprocessor
+from src.data.processor import BookmarkDataProcessor
+from src.data.models import Bookmark, Folder
+from src.data.parser import bookmarks_from_events
+from src.data.snapshot import load_events, snapshot_path
+from src.data.writer import BOOKMARKS_HEADER, write_bookmarks_file
+from src.tests.test_data_generator import TestDataGenerator
+
+
+def legacy_load_bookmarks(file_path: Path) -> List[Dict]:
+    """旧实现：用 BeautifulSoup 构建整棵树后 find_all('a')"""
+    with open(file_path, 'r', encoding='utf-8') as file:
+        soup = BeautifulSoup(file, 'html.parser')
+    return [{
+        'title': link.get_text().strip(),
+        'url': link.get('href', ''),
+        'add_date': link.get('add_date', ''),
+        'last_modified': link.get('last_modified', '')
+    } for link in soup.find_all('a')]
+
+
+def streaming_load_bookmarks(file_path: Path) -> List[Dict]:
+    """新实现：BookmarkProcessor 的流式解析"""
+    processor = BookmarkProcessor()
+    processor.load_bookmarks(str(file_path))
+    return processor.get_bookmarks_data()
+
+
+def legacy_process_bookmarks_file(file_path: Path) -> List[Dict]:
+    """旧实现：递归 find_all('a') + find_all('dl')，书签会按祖先层数重复处理"""
+    processor = BookmarkDataProcessor()
+    with open(file_path, 'r', encoding='utf-8') as f:
+        soup = BeautifulSoup(f, 'html.parser')
+
+    training_data = []
+
+    def process_folder(element, current_folder=""):
+        folder_name = element.find_previous_sibling('h3')
+        if folder_name:
+            current_folder = folder_name.text.strip()
+        for link in element.find_all('a'):
+            bookmark = {
+                'title': link.text.strip(),
+                'url': link.get('href', ''),
+                'folder': current_folder
+            }
+            features = processor.extract_features(bookmark)
+            if current_folder:
+                training_data.append({
+                    'text': processor._generate_training_text(bookmark, features),
+                    'label': processor._generate_label(current_folder),
+                    'features': features
+                })
+        for dl in element.find_all('dl'):
+            process_folder(dl, current_folder)
+
+    root_dl = soup.find('dl')
+    if root_dl:
+        process_folder(root_dl)
+    return training_data
+
+
+def legacy_collect_from_html(file_path: Path) -> List[Dict]:
+    """旧实现：递归 find_all + find_previous('h3')，路径会错误累积"""
+    preprocessor = BookmarkDataPreprocessor()
+    with open(file_path, 'r', encoding='utf-8') as f:
+        soup = BeautifulSoup(f, 'html.parser')
+
+    collected_data = []
+
+    def process_folder(element, current_path=""):
+        folder_name = element.find_previous('h3')
+        if folder_name:
+            current_path = f"{current_path}/{folder_name.text}" if current_path else folder_name.text
+        for link in element.find_all('a'):
+            collected_data.append({
+                'input': {
+                    'title': link.text,
+                    'url': link.get('href', ''),
+                    'features': preprocessor.extract_features(link.text, link.get('href', ''))
+                },
+                'label': current_path
+            })
+        for dl in element.find_all('dl'):
+            process_folder(dl, current_path)
+
+    root_dl = soup.find('dl')
+    if root_dl:
+        process_folder(root_dl)
+    return collected_data
+
+
+def legacy_generate_bookmarks_html(items: List) -> str:
+    """旧实现：html += 拼接，文件夹递归返回字符串，且不做转义"""
+    def bookmark_html(bookmark) -> str:
+        attrs = []
+        if bookmark.get('add_date', ''):
+            attrs.append(f'ADD_DATE="{bookmark["add_date"]}"')
+        if bookmark.get('last_modified', ''):
+            attrs.append(f'LAST_MODIFIED="{bookmark["last_modified"]}"')
+        return f'<DT><A HREF="{bookmark["url"]}" {" ".join(attrs)}>{bookmark["title"]}</A>\n'
+
+    def folder_html(folder, indent: int = 1) -> str:
+        html = "    " * indent
+        html += f'<DT><H3>{folder["name"]}</H3>\n'
+        html += "    " * indent + "<DL><p>\n"
+        for bookmark in folder.get('bookmarks', []):
+            html += "    " * (indent + 1)
+            html += bookmark_html(bookmark)
+        for subfolder in folder.get('subfolders', []):
+            html += folder_html(subfolder, indent + 1)
+        html += "    " * indent + "</DL><p>\n"
+        return html
+
+    html = BOOKMARKS_HEADER
+    for item in items:
+        for folder in item['folders']:
+            html += folder_html(folder)
+    html += "</DL><p>"
+    return html
+
+
+def build_folder_tree(count: int, depth: int, per_folder: int = 20) -> List[Dict]:
+    """构建与 generate_nested_test_html 相同形状的内存文件夹树"""
+    roots = []
+    written = 0
+    branch = 0
+    while written < count:
+        parent = None
+        for level in range(depth):
+            folder = Folder(name=f"分类{branch}-{level}", add_date="1700000000")
+            for _ in range(min(per_folder, count - written)):
+                # 每 10 个书签有一个标题包含需要转义的字符
+                special = " <&> \"quoted\"" if written % 10 == 0 else ""
+                folder.bookmarks.append(Bookmark(
+                    title=f"doc: 测试书签 {written}{special}",
+                    url=f"https://site{written % 97}.example.com/page/{written}?a=1&b=2",
+                    add_date=str(1700000000 + written)
+                ))
+                written += 1
+            if parent is None:
+                roots.append(folder)
+            else:
+                parent.subfolders.append(folder)
+            parent = folder
+        branch += 1
+    return [{'folders': roots}]
+
+
+def ensure_test_file(workdir: Path, count: int, depth: int) -> Path:
+    """生成（或复用）指定规模的嵌套测试文件"""
+    file_path = workdir / f"bookmarks_{count}_d{depth}.html"
+    if not file_path.exists():
+        print(f"生成测试文件: {file_path}")
+        TestDataGenerator.generate_nested_test_html(file_path, count, depth)
+    return file_path
+
+
+def measure(func: Callable, *args) -> Dict:
+    """分别测量耗时和峰值内存（tracemalloc 会拖慢执行，因此分两次运行）"""
+    start = time.perf_counter()
+    result = func(*args)
+    duration = time.perf_counter() - start
+    del result
+
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds': duration, 'peak_mb': peak / (1024 * 1024)}
+
+
+def report(name: str, stats: Dict, count: int):
+    """打印单项结果"""
+    per_item = stats['seconds'] / count * 1e6 if count else 0
+    print(f"{name:<28} {stats['seconds']:>8.2f}s  {per_item:>8.2f}µs/书签  "
+          f"峰值内存 {stats['peak_mb']:>8.1f}MB")
+
+
+def bench_load(workdir: Path, count: int, depth: int):
+    """对比 load_bookmarks 的 BeautifulSoup 路径与流式解析"""
+    file_path = ensure_test_file(workdir, count, depth)
+    print("\n[load] BookmarkProcessor.load_bookmarks")
+    report("BeautifulSoup + find_all", measure(legacy_load_bookmarks, file_path), count)
+    report("流式解析", measure(streaming_load_bookmarks, file_path), count)
+
+
+def bench_process(workdir: Path, count: int, depth: int):
+    """不同嵌套深度下 process_bookmarks_file 的单书签耗时"""
+    print("\n[process] BookmarkDataProcessor.process_bookmarks_file")
+    for level in (1, 2, 4, 8, 16):
+        file_path = ensure_test_file(workdir, count, level)
+        start = time.perf_counter()
+        current = BookmarkDataProcessor().process_bookmarks_file(file_path)
+        seconds = time.perf_counter() - start
+        line = f"深度 {level:>2}: 单次遍历 {seconds / count * 1e6:>8.2f}µs/书签 ({len(current)} 条)"
+
+        # 旧实现的重复处理随深度指数增长，只在浅层小规模文件上对比
+        if level <= 4 and count <= 20000:
+            start = time.perf_counter()
+            legacy = legacy_process_bookmarks_file(file_path)
+            legacy_seconds = time.perf_counter() - start
+            line += f"  旧实现 {legacy_seconds / count * 1e6:>8.2f}µs/书签 ({len(legacy)} 条)"
+        print(line)
+
+
+def bench_collect(workdir: Path, count: int, depth: int):
+    """collect_from_html 在 8 层嵌套文件上的回归基准"""
+    print("\n[collect] BookmarkDataCollector.collect_from_html（8 层嵌套）")
+    collector = BookmarkDataCollector()
+    for size in (count // 10, count):
+        file_path = ensure_test_file(workdir, size, 8)
+        start = time.perf_counter()
+        data = collector.collect_from_html(file_path)
+        seconds = time.perf_counter() - start
+        max_depth = max((item['label'].count('/') + 1 for item in data if item['label']), default=0)
+        print(f"{size:>8} 个书签: {seconds:>7.2f}s  {seconds / size * 1e6:>8.2f}µs/书签  "
+              f"产出 {len(data)} 条, 最大路径深度 {max_depth}")
+        if len(data) != size or max_depth > 8:
+            print("  ⚠ 回归：书签重复或路径累积错误")
+
+    # 旧实现对照（规模较小，否则耗时与内存都会失控）
+    size = min(count, 2000)
+    file_path = ensure_test_file(workdir, size, 8)
+    start = time.perf_counter()
+    legacy = legacy_collect_from_html(file_path)
+    seconds = time.perf_counter() - start
+    print(f"旧实现 {size} 个书签: {seconds:.2f}s  {seconds / size * 1e6:.2f}µs/书签  产出 {len(legacy)} 条")
+
+
+def bench_snapshot(workdir: Path, count: int, depth: int):
+    """同一文件重复处理时，首次解析与复用快照的耗时对比"""
+    file_path = ensure_test_file(workdir, count, depth)
+    print("\n[snapshot] 首次解析 vs 复用快照")
+    entry_points = {
+        'load_bookmarks': lambda: BookmarkProcessor().load_bookmarks(str(file_path)),
+        'analyze_prefixes': lambda: BookmarkDataProcessor().analyze_prefixes(file_path),
+    }
+    for name, run in entry_points.items():
+        cache_file = snapshot_path(file_path)
+        if cache_file.exists():
+            cache_file.unlink()
+        start = time.perf_counter()
+        run()
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        run()
+        warm = time.perf_counter() - start
+        print(f"{name:<20} 首次 {cold:>7.2f}s  复用快照 {warm * 1000:>9.1f}ms  "
+              f"快照大小 {cache_file.stat().st_size / (1024 * 1024):.1f}MB")
+
+
+def bench_memory(workdir: Path, count: int, depth: int):
+    """每个书签常驻内存：字典 vs 带 __slots__ 的 Bookmark 记录"""
+    file_path = ensure_test_file(workdir, count, depth)
+    print("\n[memory] 每个书签的常驻内存")
+    for name, load in (("dict（旧）", legacy_load_bookmarks), ("Bookmark 记录", streaming_load_bookmarks)):
+        tracemalloc.start()
+        bookmarks = load(file_path)
+        gc.collect()  # BeautifulSoup 树存在循环引用，需要回收后再统计
+        retained, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        containers = sum(sys.getsizeof(item) for item in bookmarks)
+        print(f"{name:<16} 总计 {retained / count:>7.0f}B/书签  其中容器本身 {containers / count:>5.0f}B/书签")
+        del bookmarks
+
+
+def bench_columnar(workdir: Path, count: int, depth: int):
+    """列式存储：常驻内存、向量化过滤与内存映射重新加载"""
+    file_path = ensure_test_file(workdir, count, depth)
+    print("\n[columnar] ColumnarBookmarkStore")
+    list(load_events(file_path))  # 预先生成快照，两种方式都从快照读取
+
+    tracemalloc.start()
+    records = list(bookmarks_from_events(load_events(file_path)))
+    gc.collect()
+    record_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+
+    start = time.perf_counter()
+    tracemalloc.start()
+    store = ColumnarBookmarkStore.from_events(load_events(file_path))
+    gc.collect()
+    store_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    build_seconds = time.perf_counter() - start
+    print(f"Bookmark 记录列表 {record_bytes / count:>6.0f}B/书签  "
+          f"列式存储 {store_bytes / count:>6.0f}B/书签（构建 {build_seconds:.2f}s，含 tracemalloc 开销）")
+
+    domain = store.domains[0]
+    folder = store.folders[-1].split('/')[0]
+    filters = {
+        f'by_domain({domain})': lambda: store.by_domain(domain),
+        'added_after': lambda: store.added_after(1700000000 + count // 2),
+        f'in_folder({folder})': lambda: store.in_folder(folder),
+        '组合过滤': lambda: store.in_folder(folder) & store.by_domain(domain)
+                    & store.added_after(1700000000 + count // 2),
+    }
+    for name, run in filters.items():
+        start = time.perf_counter()
+        matched = int(run().sum())
+        print(f"{name:<24} {(time.perf_counter() - start) * 1000:>8.2f}ms  命中 {matched}")
+
+    store_dir = workdir / f"store_{count}_d{depth}"
+    start = time.perf_counter()
+    store.save(store_dir)
+    save_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    loaded = ColumnarBookmarkStore.load(store_dir)
+    int(loaded.by_domain(domain).sum())
+    print(f"保存 {save_seconds:.2f}s  内存映射加载并过滤 {(time.perf_counter() - start) * 1000:.1f}ms")
+
+
+def bench_write(workdir: Path, count: int, depth: int):
+    """save_bookmarks：旧的字符串拼接 vs 流式写出（两种规模用于观察线性度）"""
+    print("\n[write] BookmarkProcessor.save_bookmarks")
+    output_path = workdir / "written_bookmarks.html"
+    for level in (depth, 16):
+        for size in (count // 10, count):
+            tree = build_folder_tree(size, level)
+
+            def legacy_save():
+                html = legacy_generate_bookmarks_html(tree)
+                with open(output_path, 'w', encoding='utf-8') as f:
+                    f.write(html)
+
+            def streaming_save():
+                write_bookmarks_file(output_path, tree)
+
+            print(f"嵌套深度 {level}, {size} 个书签:")
+            report("  html += 拼接（旧）", measure(legacy_save), size)
+            report("  流式写出", measure(streaming_save), size)
+    output_path.unlink()
+
+
+SCENARIOS = {
+    'write': bench_write,
+    'columnar': bench_columnar,
+    'memory': bench_memory,
+    'snapshot': bench_snapshot,
+    'collect': bench_collect,
+    'load': bench_load,
+    'process': bench_process,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='书签解析性能基准')
+    parser.add_argument('--count', type=int, default=200000, help='书签数量')
+    parser.add_argument('--depth', type=int, default=3, help='文件夹嵌套深度')
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), action='append',
+                        help='要运行的场景（可重复，默认全部）')
+    parser.add_argument('--workdir', type=str, default='data/benchmark',
+                        help='生成测试文件的目录')
+    args = parser.parse_args()
+
+    workdir = Path(args.workdir)
+    workdir.mkdir(parents=True, exist_ok=True)
+    print(f"书签数: {args.count}, 嵌套深度: {args.depth}")
+
+    for name in args.scenario or list(SCENARIOS):
+        SCENARIOS[name](workdir, args.count, args.depth)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+from pathlib import Path
+from src.config import Config, DATA_DIR, LOGS_DIR
+from src.data.collector import BookmarkDataCollector
+from src.data.training_store import TrainingDataStore
+import argparse
+
+def main():
+    parser = argparse.ArgumentParser(description='从 API 调用日志中收集训练数据（流式、多进程）')
+    parser.add_argument('--logs-dir', type=str, default=str(LOGS_DIR), help='日志目录')
+    parser.add_argument('--output', type=str, default=str(DATA_DIR / "training" / "api_log_samples.jsonl"),
+                        help='输出文件（JSON Lines，每行一个样本）')
+    parser.add_argument('--workers', type=int, default=None, help='进程数（默认为 CPU 核数，1 表示不使用进程池）')
+    parser.add_argument('--progress-interval', type=float, default=5.0, help='输出进度的间隔（秒）')
+    parser.add_argument('--incremental', action='store_true',
+                        help='增量收集到 config.yaml 中 training_store 指定的训练数据库，只处理新增的日志和书签文件')
+    parser.add_argument('--html', type=str, action='append', default=[],
+                        help='增量模式下一并收集的书签文件快照（可重复）')
+    parser.add_argument('--export', type=str, default=None, help='增量模式下把去重后的全部样本导出为 JSON 文件')
+    args = parser.parse_args()
+
+    if not args.incremental:
+        collector = BookmarkDataCollector(verbose=False)
+        stats = collector.stream_from_api_logs(Path(args.logs_dir), Path(args.output),
+                                               workers=args.workers, progress_interval=args.progress_interval)
+        print(f"共处理 {stats['files']} 个文件、{stats['entries']} 条日志，收集到 {stats['samples']} 条样本")
+        return
+
+    settings = {**Config().training_store, 'enabled': True}
+    store = TrainingDataStore.from_settings(settings)
+    try:
+        collector = BookmarkDataCollector(verbose=False, store=store)
+        collector.ingest_api_logs(Path(args.logs_dir))
+        for html_file in args.html:
+            collector.ingest_html(Path(html_file), workers=args.workers)
+        stats = store.stats()
+        print(f"训练数据库 {store.path}: 样本 {stats['samples']}（有标签冲突的 {stats['conflicted']}），"
+              f"已收集的输入 {stats['inputs']}")
+        if args.export:
+            count = collector.save_training_data(Path(args.export))
+            print(f"已导出 {count} 条样本到: {args.export}")
+    finally:
+        store.close()
+
+if __name__ == "__main__":
+    main()
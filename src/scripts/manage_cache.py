@@ -0,0 +1,62 @@
+from src.clients.cache import ClassificationCache, DEFAULT_CACHE_PATH, DEFAULT_MAX_ENTRIES
+from src.config import Config
+import argparse
+import time
+
+def main():
+    parser = argparse.ArgumentParser(description='管理书签分类缓存')
+    parser.add_argument('--path', type=str, default=None, help='缓存数据库路径（默认读取 config.yaml）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('stats', help='显示缓存统计')
+
+    invalidate = subparsers.add_parser('invalidate', help='按条件删除缓存条目')
+    invalidate.add_argument('--provider', type=str, help='服务商，如 ernie / chatgpt')
+    invalidate.add_argument('--model', type=str, help='模型名称')
+    invalidate.add_argument('--url', type=str, help='书签 URL')
+    invalidate.add_argument('--prompt-version', type=str, help='提示词版本')
+    invalidate.add_argument('--older-than-days', type=float, help='只删除早于指定天数的条目')
+    invalidate.add_argument('--all', action='store_true', help='清空全部缓存')
+
+    evict = subparsers.add_parser('evict', help='按最近使用时间淘汰到指定条目数')
+    evict.add_argument('--max-entries', type=int, required=True)
+
+    args = parser.parse_args()
+
+    settings = Config().cache
+    cache = ClassificationCache(
+        args.path or settings.get('path', DEFAULT_CACHE_PATH),
+        int(settings.get('max_entries', DEFAULT_MAX_ENTRIES))
+    )
+
+    try:
+        if args.command == 'stats':
+            stats = cache.stats()
+            print(f"缓存文件: {cache.path}")
+            print(f"条目数: {stats['entries']} / {stats['max_entries']}")
+            print(f"累计命中: {stats['total_hits']}")
+            for group in stats['groups']:
+                print(f"- {group['provider']} / {group['model']} "
+                      f"(提示词版本 {group['prompt_version']}): {group['entries']} 条")
+
+        elif args.command == 'invalidate':
+            filters = [args.provider, args.model, args.url, args.prompt_version, args.older_than_days]
+            if not args.all and all(value is None for value in filters):
+                parser.error("请指定过滤条件，或使用 --all 清空全部缓存")
+            older_than = None
+            if args.older_than_days is not None:
+                older_than = time.time() - args.older_than_days * 86400
+            removed = cache.invalidate(
+                provider=args.provider, model=args.model, url=args.url,
+                prompt_version=args.prompt_version, older_than=older_than
+            )
+            print(f"已删除 {removed} 条缓存")
+
+        elif args.command == 'evict':
+            removed = cache.evict(args.max_entries)
+            print(f"已淘汰 {removed} 条缓存，剩余 {len(cache)} 条")
+    finally:
+        cache.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,22 @@
 from pathlib import Path
+from src.data.parallel import DEFAULT_CHUNK_SIZE
 from src.data.processor import BookmarkDataProcessor
-import json
+from src.data.training_writer import FORMATS, TrainingDataWriter
+import argparse
 
 def main():
+    parser = argparse.ArgumentParser(description='处理书签文件，生成 FastText 训练数据')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='提取特征的进程数（默认为 CPU 核数，1 表示不使用进程池）')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='每个进程任务处理的书签数')
+    parser.add_argument('--format', choices=FORMATS, default='jsonl',
+                        help='输出格式：jsonl 每行一个 JSON 对象，fasttext 为 "__label__x 文本"')
+    parser.add_argument('--shard-mb', type=int, default=0, help='每个分片的大小上限（MB，0 表示不分片）')
+    parser.add_argument('--compress', action='store_true', help='用 gzip 压缩输出分片')
+    parser.add_argument('--validation-ratio', type=float, default=0.0,
+                        help='按 URL 哈希划入验证集的比例（0 表示不划分）')
+    args = parser.parse_args()
+    
     # 初始化处理器
     processor = BookmarkDataProcessor()
     
@@ -14,32 +28,38 @@ def main():
     print(f"开始处理书签文件: {input_file}")
     
     try:
-        # 处理书签文件
-        training_data = processor.process_bookmarks_file(input_file)
-        
-        # 保存处理结果
-        output_file = output_dir / "training_data.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(training_data, f, ensure_ascii=False, indent=2)
+        folders, prefixes, domains = set(), set(), set()
+        examples = []
         
-        # 生成统计信息
-        folders = set(item['features']['folder'] for item in training_data)
-        prefixes = set()
-        for item in training_data:
-            if item['features'].get('has_prefix'):
-                prefixes.update(item['features'].get('prefixes', []))
-        domains = set(item['features']['domain'] for item in training_data)
+        # 边处理边写出，不在内存中保留全部训练数据
+        with TrainingDataWriter(output_dir, format=args.format, shard_bytes=args.shard_mb * 1024 * 1024 or None,
+                                compress=args.compress, validation_ratio=args.validation_ratio) as writer:
+            for url, item in processor.iter_training_data(input_file, workers=args.workers,
+                                                          chunk_size=args.chunk_size):
+                writer.write(item, url)
+                
+                # 累计统计信息
+                features = item['features']
+                folders.add(features['folder'])
+                if features.get('has_prefix'):
+                    prefixes.update(features.get('prefixes', []))
+                domains.add(features['domain'])
+                if len(examples) < 3:
+                    examples.append(item)
         
         print("\n处理完成！")
-        print(f"总书签数: {len(training_data)}")
+        print(f"总书签数: {writer.counts['train'] + writer.counts['valid']}"
+              f"（训练集 {writer.counts['train']}，验证集 {writer.counts['valid']}）")
         print(f"文件夹数: {len(folders)}")
         print(f"前缀类型: {len(prefixes)}")
         print(f"域名数量: {len(domains)}")
-        print(f"\n结果已保存到: {output_file}")
+        print(f"\n结果已保存到: {output_dir}（{len(writer.files)} 个分片）")
+        for path in writer.files:
+            print(f"  {path.name}")
         
         # 显示一些示例
         print("\n数据示例:")
-        for item in training_data[:3]:
+        for item in examples:
             print(f"\n标签: {item['label']}")
             print(f"文本: {item['text']}")
             print(f"特征: {item['features']}")
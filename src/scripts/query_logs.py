@@ -0,0 +1,70 @@
+from src.config import LOGS_DIR
+from src.data.log_index import DEFAULT_INDEX_PATH, LogIndex
+import argparse
+import time
+
+def add_filters(parser: argparse.ArgumentParser):
+    parser.add_argument('--provider', type=str, help='服务商，如 ernie / chatgpt')
+    parser.add_argument('--since', type=str, help='起始时间，如 2024-05-01 或 2024-05-01T08:00')
+    parser.add_argument('--until', type=str, help='结束时间（只给日期时包含当天）')
+    parser.add_argument('--limit', type=int, default=50, help='最多显示的条数')
+
+def main():
+    parser = argparse.ArgumentParser(description='查询 API 调用日志索引')
+    parser.add_argument('--db', type=str, default=str(DEFAULT_INDEX_PATH), help='索引数据库路径')
+    parser.add_argument('--logs-dir', type=str, default=str(LOGS_DIR), help='日志目录')
+    parser.add_argument('--no-update', action='store_true', help='查询前不更新索引')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('index', help='增量索引新的日志')
+    subparsers.add_parser('stats', help='显示索引统计')
+
+    search = subparsers.add_parser('search', help='按 URL、域名或分类查询分类结果')
+    search.add_argument('--url', type=str, help='书签 URL（按规范化后的 URL 匹配）')
+    search.add_argument('--domain', type=str, help='域名，同时匹配其子域名')
+    search.add_argument('--category', type=str, help='分类路径，同时匹配其子分类')
+    add_filters(search)
+
+    errors = subparsers.add_parser('errors', help='查询出错的调用')
+    errors.add_argument('--url', type=str, help='请求中包含该书签 URL 的调用')
+    errors.add_argument('--domain', type=str, help='请求中包含该域名（含子域名）书签的调用')
+    add_filters(errors)
+
+    args = parser.parse_args()
+
+    index = LogIndex(args.db)
+    try:
+        if args.command == 'index' or not args.no_update:
+            start = time.time()
+            stats = index.update(args.logs_dir)
+            print(f"索引更新：{stats['files']} 个文件，新增 {stats['calls']} 次调用、"
+                  f"{stats['assignments']} 条分类结果，用时 {time.time() - start:.2f} 秒")
+
+        if args.command == 'stats':
+            stats = index.stats()
+            print(f"索引文件: {index.path}")
+            print(f"日志文件: {stats['files']}，调用: {stats['calls']}，分类结果: {stats['assignments']}")
+            for row in stats['providers']:
+                latency = f"{row['avg_latency']:.2f} 秒" if row['avg_latency'] is not None else '-'
+                print(f"- {row['provider'] or '(未知)'}: {row['calls']} 次调用，{row['errors']} 次出错，"
+                      f"平均用时 {latency}，输出 token {row['completion_tokens'] or 0}")
+
+        elif args.command == 'search':
+            rows = index.query(url=args.url, domain=args.domain, category=args.category,
+                               provider=args.provider, since=args.since, until=args.until, limit=args.limit)
+            for row in rows:
+                print(f"{row['timestamp']}  {row['provider']}  {row['category']}  {row['title']}  {row['url']}")
+            print(f"共 {len(rows)} 条")
+
+        elif args.command == 'errors':
+            rows = index.errors(url=args.url, domain=args.domain, provider=args.provider, since=args.since, until=args.until, limit=args.limit)
+            for row in rows:
+                latency = f"{row['latency']:.2f} 秒" if row['latency'] is not None else '-'
+                print(f"{row['timestamp']}  {row['provider']}  {row['bookmark_count']} 个书签  {latency}  "
+                      f"{row['error']}  ({row['file_key']})")
+            print(f"共 {len(rows)} 条")
+    finally:
+        index.close()
+
+if __name__ == "__main__":
+    main()
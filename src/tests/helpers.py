@@ -0,0 +1,81 @@
+import unittest
+from unittest.mock import patch
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Union
+import json
+import tempfile
+import threading
+from src.clients.base_client import BaseAIClient
+from src.clients.cache import ClassificationCache
+from src.clients.resilience import CircuitBreaker, RetryPolicy
+from src.utils import logger as logger_module
+
+# 脚本：收到一个批次（[{'title', 'url'}]）后返回响应文本，或依次返回流式片段；抛出异常模拟调用失败
+Script = Callable[[List[Dict]], Union[str, Iterable[str]]]
+
+
+class IsolatedTestCase(unittest.TestCase):
+    """测试输出写入临时目录的测试基类
+
+    self.temp_dir 在每个测试结束后删除；API 日志写到临时目录，
+    客户端不打开 data/cache 下的分类缓存和批次大小状态，需要时由测试自行设置。
+    """
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = Path(temp_dir.name)
+        # 删除临时目录之前先写完并关闭仍在运行的日志记录器
+        self.addCleanup(logger_module._close_live_loggers)
+
+        for patcher in (
+            patch.object(logger_module, 'LOGS_DIR', self.temp_dir / "logs"),
+            patch.object(ClassificationCache, 'from_settings', return_value=None),
+            patch('src.clients.base_client.sizer_for', return_value=None),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+class ScriptedClient(BaseAIClient):
+    """按脚本返回响应的测试客户端
+
+    每个批次的书签记录在 calls 中；流式模式下脚本返回的片段逐个交给流式解析，
+    非流式模式下拼接成完整响应。调用只尝试一次，熔断器不与其他客户端共用。
+    """
+    supports_stream = True
+
+    def __init__(self, script: Script, name: str = "chatgpt"):
+        super().__init__(name)
+        self.script = script
+        self.retry_policy = RetryPolicy(max_attempts=1)
+        self.breaker = CircuitBreaker()
+        self.calls: List[List[Dict]] = []
+        # 批次被取消（如对冲请求的另一方先返回）时设置
+        self.cancelled = threading.Event()
+
+    def _build_prompt(self, bookmarks: List[Dict]) -> str:
+        self.calls.append(list(bookmarks))
+        return json.dumps([{'title': b['title'], 'url': b['url']} for b in bookmarks], ensure_ascii=False)
+
+    def _respond(self, prompt: str) -> Iterable[str]:
+        output = self.script(json.loads(prompt))
+        return [output] if isinstance(output, str) else output
+
+    def _call_api(self, prompt: str) -> Dict:
+        return {"result": ''.join(self._respond(prompt))}
+
+    def _open_stream(self, prompt: str) -> Any:
+        return iter(self._respond(prompt))
+
+    def _stream_text(self, stream: Any) -> Iterator[str]:
+        yield from stream
+
+    def _extract_response_data(self, response: Any) -> str:
+        return response["result"]
+
+    def _categorize_batch(self, bookmarks, cancel=None):
+        result = super()._categorize_batch(bookmarks, cancel)
+        if cancel is not None and cancel.is_set():
+            self.cancelled.set()
+        return result
@@ -0,0 +1,80 @@
+import unittest
+from typing import Dict, List
+import json
+from src.clients.adaptive import AdaptiveBatchSizer
+from src.tests.helpers import IsolatedTestCase, ScriptedClient
+
+def capacity_script(capacity: int):
+    """每次最多输出 capacity 个书签，批次更大时输出在列表中途被截断"""
+    def script(batch: List[Dict]) -> str:
+        ids = ', '.join(str(i) for i in range(1, min(len(batch), capacity) + 1))
+        return '{"阅读": [' + ids + (']}' if len(batch) <= capacity else ', 9')
+    return script
+
+class TestAdaptiveBatchSizer(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = self.temp_dir / "batch_sizes.json"
+
+    def make_sizer(self, initial: int = 10, **kwargs) -> AdaptiveBatchSizer:
+        kwargs.setdefault('path', self.path)
+        return AdaptiveBatchSizer("ernie|ernie-speed", initial, **kwargs)
+
+    def test_additive_increase_on_full_healthy_batch(self):
+        """测试满载且正常的批次使批次大小加一，未满的批次不增长"""
+        sizer = self.make_sizer(target_latency=5)
+        self.assertEqual(sizer.observe(10, latency=1.0), 11)
+        self.assertEqual(sizer.observe(4, latency=1.0), 11)
+
+    def test_multiplicative_decrease(self):
+        """测试截断、延迟超标、超时和大量漏项都会成倍缩小批次"""
+        sizer = self.make_sizer(initial=40, target_latency=5)
+        self.assertEqual(sizer.observe(40, latency=9.0), 20)
+        self.assertEqual(sizer.observe(20, latency=1.0, missing=5), 10)
+        self.assertEqual(sizer.observe(10, timed_out=True), 5)
+        # 截断按出问题的批次大小减半
+        sizer = self.make_sizer(initial=40)
+        self.assertEqual(sizer.observe(12, truncated=True), 6)
+
+    def test_bounds_and_output_budget(self):
+        """测试批次大小限制在上下限之间，并受每个书签输出 token 数约束"""
+        sizer = self.make_sizer(initial=10, min_size=4, max_size=11)
+        sizer.observe(10)
+        sizer.observe(11)
+        self.assertEqual(sizer.size, 11)
+        for _ in range(5):
+            sizer.observe(11, timed_out=True)
+        self.assertEqual(sizer.size, 4)
+
+        # 每个书签约 20 个输出 token，max_tokens 1000 时最多 1000 * 0.8 / 20 = 40 个
+        sizer = self.make_sizer(initial=50, max_size=100)
+        self.assertEqual(sizer.observe(50, completion_tokens=1000, max_tokens=1000), 40)
+
+    def test_state_persisted_between_runs(self):
+        """测试学到的批次大小保存到文件，新的实例继续使用"""
+        sizer = self.make_sizer()
+        sizer.observe(10, completion_tokens=30, max_tokens=2000)
+        sizer.save()
+        AdaptiveBatchSizer("chatgpt|gpt-3.5-turbo", 8, path=self.path).save()
+
+        restored = self.make_sizer(initial=3)
+        self.assertEqual(restored.size, 11)
+        self.assertEqual(restored.tokens_per_item, 3.0)
+        self.assertEqual(set(json.loads(self.path.read_text(encoding='utf-8'))), {"ernie|ernie-speed"})
+
+    def test_client_shrinks_batches_after_truncation(self):
+        """测试客户端在同一次运行中根据截断缩小后续批次，并重新提交漏掉的书签"""
+        sizer = self.make_sizer(initial=8, min_size=1, target_latency=60)
+        client = ScriptedClient(capacity_script(3))
+        client.sizer = sizer
+        client.concurrency = 1
+        bookmarks = [{"title": f"t{i}", "url": f"https://example.com/{i}"} for i in range(20)]
+
+        result = client.categorize_bookmarks(bookmarks)
+        self.assertEqual([len(batch) for batch in client.calls[:3]], [8, 4, 2])
+        self.assertEqual(len(result[0]['folders'][0].bookmarks), 20)
+        self.assertEqual(len(result), 1)
+        self.assertTrue(self.path.exists())
+
+if __name__ == '__main__':
+    unittest.main()
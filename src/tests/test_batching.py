@@ -0,0 +1,175 @@
+import unittest
+from typing import Dict, List
+import json
+import threading
+import time
+from src.clients.base_client import BaseAIClient
+from src.clients.batching import FolderTreeBuilder, estimate_tokens, split_batches
+from src.clients.dispatcher import BatchDispatcher, RateLimiter, TokenBucket
+from src.data.models import Bookmark, Folder
+from src.tests.helpers import IsolatedTestCase, ScriptedClient
+from src.utils.logger import iter_log_entries
+
+def make_client(batch_size: int = None, fail_batches=(), truncate_after: int = None) -> ScriptedClient:
+    """按书签标题前缀返回分类结果的测试客户端"""
+    def script(batch: List[Dict]) -> str:
+        if len(client.calls) in fail_batches:
+            raise Exception("API Error")
+        result = {}
+        for item in batch:
+            category = "技术/文档" if item['title'].startswith('doc') else "娱乐"
+            result.setdefault(category, []).append(item)
+        text = json.dumps(result, ensure_ascii=False)
+        if truncate_after and len(batch) > truncate_after:
+            # 模拟超出 max_tokens：响应在第一个分类之后被截断
+            text = text[:text.index(']') + 3]
+        return text
+
+    client = ScriptedClient(script)
+    if batch_size:
+        client.batch_size = batch_size
+    return client
+
+class TestBatching(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.bookmarks = [
+            {"title": f"{'doc' if i % 2 else 'fun'} {i}", "url": f"https://example.com/{i}"}
+            for i in range(5)
+        ]
+
+    def test_estimate_tokens(self):
+        """测试 token 估算"""
+        self.assertEqual(estimate_tokens(""), 0)
+        self.assertEqual(estimate_tokens("abcdefgh"), 2)
+        self.assertEqual(estimate_tokens("中文标题"), 4)
+
+    def test_split_batches_limits(self):
+        """测试按数量和 token 预算切分批次"""
+        cost = lambda item: (10, 20)
+        self.assertEqual([len(b) for b in split_batches(range(7), 3, 1000, 1000, cost)], [3, 3, 1])
+        self.assertEqual([len(b) for b in split_batches(range(7), 10, 30, 1000, cost)], [3, 3, 1])
+        self.assertEqual([len(b) for b in split_batches(range(7), 10, 1000, 40, cost)], [2, 2, 2, 1])
+        # 单个超出预算的书签独占一批
+        self.assertEqual(split_batches([1, 2], 10, 5, 5, cost), [[1], [2]])
+
+    def test_folder_tree_builder(self):
+        """测试相同分类路径的书签合并到同一个文件夹"""
+        builder = FolderTreeBuilder()
+        builder.add("技术/文档", [Bookmark(title="a", url="u1")])
+        builder.add("技术/文档", [Bookmark(title="b", url="u2")])
+        builder.add("技术/工具", [Bookmark(title="c", url="u3")])
+
+        tree = builder.tree
+        self.assertEqual(len(tree['folders']), 1)
+        tech = tree['folders'][0]
+        self.assertIsInstance(tech, Folder)
+        self.assertEqual([f.name for f in tech.subfolders], ["文档", "工具"])
+        self.assertEqual([b.title for b in tech.subfolders[0].bookmarks], ["a", "b"])
+
+    def test_categorize_in_batches(self):
+        """测试分批调用并合并结果"""
+        client = make_client(batch_size=2)
+        result = client.categorize_bookmarks(self.bookmarks)
+
+        self.assertEqual([len(batch) for batch in client.calls], [2, 2, 1])
+        self.assertEqual(len(result), 1)
+        names = {folder.name: folder for folder in result[0]['folders']}
+        self.assertEqual(set(names), {"技术", "娱乐"})
+        self.assertEqual(len(names["技术"].subfolders[0].bookmarks), 2)
+        self.assertEqual(len(names["娱乐"].bookmarks), 3)
+
+    def test_failed_batch_kept_unclassified(self):
+        """测试失败批次的书签原样保留"""
+        client = make_client(batch_size=2, fail_batches={2})
+        result = client.categorize_bookmarks(self.bookmarks)
+        client.logger.close()
+
+        self.assertEqual(len(result), 3)
+        self.assertEqual(result[1:], self.bookmarks[2:4])
+        # 出错的调用同样记录请求中的书签和用时
+        failed = [entry for entry in iter_log_entries(client.logger.log_dir) if entry['error']]
+        self.assertEqual([b['url'] for b in failed[0]['request']['bookmarks']],
+                         [b['url'] for b in self.bookmarks[2:4]])
+        self.assertIn('latency', failed[0])
+
+    def test_all_batches_failed(self):
+        """测试全部失败时返回原始书签"""
+        client = make_client(batch_size=2, fail_batches={1, 2, 3})
+        self.assertEqual(client.categorize_bookmarks(self.bookmarks), self.bookmarks)
+
+    def test_truncated_batches_requeued(self):
+        """测试被截断的响应保留已完成的分类，漏掉的书签以更小的批次重新提交"""
+        client = make_client(batch_size=4, truncate_after=2)
+        result = client.categorize_bookmarks(self.bookmarks)
+
+        self.assertEqual([len(batch) for batch in client.calls], [4, 1, 2])
+        self.assertEqual(len(result), 1)
+        classified = [b.title for folder in result[0]['folders']
+                      for b in folder.bookmarks + [x for sub in folder.subfolders for x in sub.bookmarks]]
+        self.assertEqual(sorted(classified), sorted(b['title'] for b in self.bookmarks))
+
+    def test_batch_size_from_config(self):
+        """测试从配置读取批次大小和模型"""
+        client = make_client()
+        settings = client.settings
+        self.assertEqual(client.batch_size, settings.get('batch_size', BaseAIClient.default_batch_size))
+        self.assertEqual(client.model, settings.get('model', ''))
+        self.assertGreater(client.context_tokens, client.max_tokens)
+
+class TestDispatcher(IsolatedTestCase):
+    def test_token_bucket_waits_for_refill(self):
+        """测试令牌不足时按补充速率等待"""
+        now = [0.0]
+        sleeps = []
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+        bucket = TokenBucket(60, clock=lambda: now[0], sleep=sleep)
+
+        self.assertEqual(bucket.acquire(60), 0)
+        self.assertAlmostEqual(bucket.acquire(30), 30.0)
+        self.assertEqual(len(sleeps), 1)
+
+    def test_rate_limiter_tpm(self):
+        """测试 tpm 限流按批次 token 数计算"""
+        now = [0.0]
+        def sleep(seconds):
+            now[0] += seconds
+        limiter = RateLimiter(rpm=1000, tpm=600, clock=lambda: now[0], sleep=sleep)
+
+        limiter.acquire(600)
+        self.assertAlmostEqual(limiter.acquire(300), 30.0)
+
+    def test_results_keep_input_order(self):
+        """测试并发执行时结果仍按输入顺序返回"""
+        active = []
+        peak = []
+        lock = threading.Lock()
+        def work(batch):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.05 if batch[0] % 2 == 0 else 0.01)
+            with lock:
+                active.pop()
+            return [batch[0] * 10]
+
+        batches = [[i] for i in range(8)]
+        results = BatchDispatcher(concurrency=4).map(work, batches)
+        self.assertEqual(results, [[i * 10] for i in range(8)])
+        self.assertGreater(max(peak), 1)
+        self.assertLessEqual(max(peak), 4)
+
+    def test_concurrent_categorize_is_deterministic(self):
+        """测试并发分批分类与串行结果一致"""
+        bookmarks = [{"title": f"{'doc' if i % 3 else 'fun'} {i}", "url": f"https://example.com/{i}"}
+                     for i in range(20)]
+        serial = make_client(batch_size=3).categorize_bookmarks(bookmarks)
+        client = make_client(batch_size=3)
+        client.concurrency = 4
+        concurrent = client.categorize_bookmarks(bookmarks)
+        self.assertEqual(serial, concurrent)
+
+if __name__ == '__main__':
+    unittest.main()
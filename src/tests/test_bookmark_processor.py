@@ -1,14 +1,14 @@
 import unittest
-from pathlib import Path
 from src.bookmark_processor import BookmarkProcessor
 from src.config import Config
+from src.tests.helpers import IsolatedTestCase
 
-class TestBookmarkProcessor(unittest.TestCase):
+class TestBookmarkProcessor(IsolatedTestCase):
     def setUp(self):
+        super().setUp()
         self.config = Config()
         self.processor = BookmarkProcessor()
-        self.test_data_dir = Path("tests/data")
-        self.test_data_dir.mkdir(parents=True, exist_ok=True)
+        self.test_data_dir = self.temp_dir
         self.test_data_path = self.test_data_dir / "bookmarks_test.html"
         
         # 创建测试数据
@@ -51,4 +51,13 @@ class TestBookmarkProcessor(unittest.TestCase):
         self.processor.update_bookmarks_data([test_data])
         html = self.processor._generate_bookmarks_html()
         self.assertIn('Test Folder', html)
-        self.assertIn('http://test.com', html) 
\ No newline at end of file
+        self.assertIn('http://test.com', html)
+    
+    def test_save_loaded_bookmarks(self):
+        """测试加载后再保存的书签不会丢失"""
+        self.processor.load_bookmarks(str(self.test_data_path))
+        output_path = self.test_data_dir / "bookmarks_saved.html"
+        self.processor.save_bookmarks(str(output_path))
+        html = output_path.read_text(encoding='utf-8')
+        self.assertIn('HREF="https://test.com"', html)
+        self.assertIn('Test Bookmark', html)
@@ -0,0 +1,83 @@
+import unittest
+from typing import Dict, List
+import json
+from src.clients.base_client import PROMPT_VERSION
+from src.clients.cache import ClassificationCache
+from src.tests.helpers import IsolatedTestCase, ScriptedClient
+from src.utils.url_utils import normalize_url
+
+def echo(batch: List[Dict]) -> str:
+    """把所有书签归入 技术/文档 分类"""
+    return json.dumps({"技术/文档": batch}, ensure_ascii=False)
+
+class TestClassificationCache(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = ClassificationCache(self.temp_dir / "cache.db", max_entries=100)
+        self.addCleanup(self.cache.close)
+
+    def make_client(self) -> ScriptedClient:
+        client = ScriptedClient(echo)
+        client.cache = self.cache
+        return client
+
+    def test_normalize_url(self):
+        """测试 URL 规范化"""
+        self.assertEqual(
+            normalize_url("HTTPS://Example.com:443/docs/?b=2&a=1&utm_source=feed#intro"),
+            "https://example.com/docs?a=1&b=2"
+        )
+        self.assertEqual(normalize_url("http://example.com"), "http://example.com/")
+        self.assertEqual(normalize_url("https://app.io/#/home"), "https://app.io/#/home")
+        self.assertEqual(normalize_url("javascript:void(0)"), "javascript:void(0)")
+
+    def test_lookup_and_store(self):
+        """测试写入后按规范化 URL 命中"""
+        bookmark = {"title": "Python 文档", "url": "https://docs.python.org/3/"}
+        self.cache.store([(bookmark, "技术/文档")], "ernie", "ernie-speed", "1")
+
+        same_page = {"title": "Python 文档", "url": "https://DOCS.python.org/3"}
+        self.assertEqual(self.cache.lookup([same_page], "ernie", "ernie-speed", "1"), {0: "技术/文档"})
+        # 模型或提示词版本不同视为未命中
+        self.assertEqual(self.cache.lookup([same_page], "ernie", "ernie-lite", "1"), {})
+        self.assertEqual(self.cache.lookup([same_page], "ernie", "ernie-speed", "2"), {})
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+
+    def test_eviction_by_last_used(self):
+        """测试超出容量时淘汰最久未用的条目"""
+        self.cache.max_entries = 3
+        bookmarks = [{"title": f"t{i}", "url": f"https://example.com/{i}"} for i in range(3)]
+        self.cache.store([(b, "分类") for b in bookmarks], "ernie", "m", "1")
+        self.cache.conn.execute("UPDATE classifications SET last_used = 0 WHERE title = 't1'")
+
+        self.cache.store([({"title": "t3", "url": "https://example.com/3"}, "分类")], "ernie", "m", "1")
+        self.assertEqual(len(self.cache), 3)
+        self.assertEqual(self.cache.lookup(bookmarks, "ernie", "m", "1"), {0: "分类", 2: "分类"})
+
+    def test_invalidate(self):
+        """测试按条件失效"""
+        bookmark = {"title": "a", "url": "https://a.com"}
+        self.cache.store([(bookmark, "x")], "ernie", "m1", "1")
+        self.cache.store([(bookmark, "y")], "chatgpt", "m2", "1")
+
+        self.assertEqual(self.cache.invalidate(provider="ernie"), 1)
+        self.assertEqual(self.cache.invalidate(url="https://A.com/"), 1)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_client_skips_cached_bookmarks(self):
+        """测试命中缓存的书签不再调用 API"""
+        bookmarks = [{"title": f"t{i}", "url": f"https://example.com/{i}"} for i in range(4)]
+        first = self.make_client()
+        first.categorize_bookmarks(bookmarks[:2])
+        self.assertEqual(len(first.calls[0]), 2)
+
+        second = self.make_client()
+        result = second.categorize_bookmarks(bookmarks)
+        self.assertEqual([b['url'] for batch in second.calls for b in batch], [b['url'] for b in bookmarks[2:]])
+        docs = result[0]['folders'][0].subfolders[0]
+        self.assertEqual(sorted(b.url for b in docs.bookmarks), sorted(b['url'] for b in bookmarks))
+        self.assertEqual(self.cache.stats()['entries'], 4)
+        self.assertEqual(PROMPT_VERSION, self.cache.stats()['groups'][0]['prompt_version'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,9 +3,11 @@ from unittest.mock import Mock, patch
 from src.clients.ernie_client import ErnieClient
 from src.clients.chatgpt_client import ChatGPTClient
 from src.config import Config
+from src.tests.helpers import IsolatedTestCase
 
-class TestErnieClient(unittest.TestCase):
+class TestErnieClient(IsolatedTestCase):
     def setUp(self):
+        super().setUp()
         self.client = ErnieClient()
         self.test_bookmarks = [
             {"title": "test1", "url": "http://test1.com"},
@@ -28,12 +30,13 @@ class TestErnieClient(unittest.TestCase):
 
     def test_build_prompt(self):
         prompt = self.client._build_prompt(self.test_bookmarks)
-        self.assertIn("test1", prompt)
-        self.assertIn("http://test1.com", prompt)
+        self.assertIn("1. test1 | test1.com", prompt)
+        self.assertIn("2. test2 | test2.com", prompt)
         self.assertIn("JSON", prompt)
 
-class TestChatGPTClient(unittest.TestCase):
+class TestChatGPTClient(IsolatedTestCase):
     def setUp(self):
+        super().setUp()
         self.client = ChatGPTClient()
         self.test_bookmarks = [
             {"title": "test1", "url": "http://test1.com"},
@@ -53,4 +56,45 @@ class TestChatGPTClient(unittest.TestCase):
         
         result = self.client.categorize_bookmarks(self.test_bookmarks)
         self.assertIsNotNone(result)
-        self.assertTrue(len(result) > 0) 
\ No newline at end of file
+        self.assertTrue(len(result) > 0) 
+
+class TestCompactProtocol(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = ErnieClient()
+        self.bookmarks = [
+            {"title": "Python 文档", "url": "https://www.python.org/doc/tutorial/index.html?x=1"},
+            {"title": "Hacker News", "url": "https://news.ycombinator.com/"},
+            {"title": "GitHub", "url": "https://github.com"}
+        ]
+    
+    def test_prompt_uses_ids_and_compact_location(self):
+        """测试提示词只包含编号、标题和压缩后的网址"""
+        prompt = self.client._build_prompt(self.bookmarks)
+        self.assertIn("1. Python 文档 | python.org/doc/tutorial", prompt)
+        self.assertIn("2. Hacker News | news.ycombinator.com", prompt)
+        self.assertNotIn("https://", prompt)
+    
+    def test_parse_ids(self):
+        """测试按编号对应回原始书签，忽略越界和重复的编号"""
+        response = '```json\n{"技术/文档": [1, "3", 9], "阅读": [2, 1]}\n```'
+        result = self.client._parse_response(response, self.bookmarks)
+        self.assertEqual(result, {0: "技术/文档", 2: "技术/文档", 1: "阅读"})
+    
+    def test_parse_legacy_echo_format(self):
+        """测试兼容回显标题和URL的旧响应格式"""
+        response = '{"阅读": [{"title": "HN", "url": "https://news.ycombinator.com"}]}'
+        self.assertEqual(self.client._parse_response(response, self.bookmarks), {1: "阅读"})
+    
+    def test_missing_ids_stay_unclassified(self):
+        """测试模型漏掉的书签保留为未分类，分类结果使用原始书签"""
+        self.client.cache = None
+        self.client.sizer = None
+        self.client.requeue_rounds = 0
+        self.client.client = Mock()
+        self.client.client.do.return_value = {"result": '{"技术/文档": [1]}'}
+        
+        result = self.client.categorize_bookmarks(self.bookmarks)
+        folder = result[0]['folders'][0].subfolders[0]
+        self.assertEqual(folder.bookmarks[0].url, self.bookmarks[0]['url'])
+        self.assertEqual(result[1:], self.bookmarks[1:])
@@ -0,0 +1,72 @@
+import unittest
+from src.bookmark_processor import BookmarkProcessor
+from src.data.columnar import ColumnarBookmarkStore, np
+from src.data.models import Bookmark
+from src.tests.helpers import IsolatedTestCase
+
+@unittest.skipIf(np is None, "需要 numpy")
+class TestColumnarBookmarkStore(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.test_data_dir = self.temp_dir
+        self.store_dir = self.test_data_dir / "columnar_store"
+        self.store = ColumnarBookmarkStore.from_bookmarks([
+            Bookmark(title="doc: Python 文档", url="https://docs.python.org/3/",
+                     add_date="1600000000", folder="技术/文档"),
+            Bookmark(title="pkg: CPython", url="https://github.com/python/cpython",
+                     add_date="1700000000", folder="技术/工具"),
+            Bookmark(title="Hacker News", url="https://news.ycombinator.com",
+                     folder="阅读"),
+            Bookmark(title="Gist", url="https://gist.github.com/x",
+                     add_date="1800000000", folder="技术文档"),
+        ])
+    
+    def test_rows_roundtrip(self):
+        """测试按行取回的书签与原始数据一致"""
+        self.assertEqual(len(self.store), 4)
+        first = self.store.bookmark(0)
+        self.assertEqual(first.title, "doc: Python 文档")
+        self.assertEqual(first.url, "https://docs.python.org/3/")
+        self.assertEqual(first.add_date, "1600000000")
+        self.assertEqual(first.folder, "技术/文档")
+        self.assertEqual(self.store.bookmark(2).add_date, "")
+    
+    def test_vectorized_filters(self):
+        """测试域名、时间与文件夹子树过滤"""
+        store = self.store
+        self.assertEqual(store.select(store.by_domain("github.com")).tolist(), [1])
+        self.assertEqual(
+            store.select(store.by_domain("github.com", include_subdomains=True)).tolist(), [1, 3])
+        self.assertEqual(store.select(store.added_after(1650000000)).tolist(), [1, 3])
+        self.assertEqual(store.select(store.added_before(1650000000)).tolist(), [0])
+        # "技术文档" 不属于 "技术" 子树
+        self.assertEqual(store.select(store.in_folder("技术")).tolist(), [0, 1])
+        combined = store.in_folder("技术") & store.added_after(1650000000)
+        self.assertEqual([b.title for b in store.rows(combined)], ["pkg: CPython"])
+    
+    def test_save_and_mmap_load(self):
+        """测试保存后以内存映射方式重新加载"""
+        self.store.save(self.store_dir)
+        loaded = ColumnarBookmarkStore.load(self.store_dir)
+        self.assertIsInstance(loaded.title_data, np.memmap)
+        self.assertEqual([b.url for b in loaded.rows()], [b.url for b in self.store.rows()])
+        self.assertEqual(loaded.select(loaded.in_folder("阅读")).tolist(), [2])
+    
+    def test_processor_columnar_mode(self):
+        """测试 BookmarkProcessor 的列式模式"""
+        html_file = self.test_data_dir / "columnar_test.html"
+        html_file.write_text("""<DL><p>
+    <DT><H3>技术</H3>
+    <DL><p>
+        <DT><A HREF="https://docs.python.org" ADD_DATE="1600000000">doc: Python</A>
+    </DL><p>
+    <DT><A HREF="https://root.com">Root</A>
+</DL><p>""", encoding='utf-8')
+        try:
+            processor = BookmarkProcessor(columnar=True)
+            processor.load_bookmarks(str(html_file))
+            bookmarks = processor.get_simplified_bookmarks()
+            self.assertEqual([b.title for b in bookmarks], ["doc: Python", "Root"])
+            self.assertEqual(bookmarks[0].folder, "技术")
+        finally:
+            html_file.unlink()
@@ -4,10 +4,12 @@ from pathlib import Path
 from src.config import Config
 from src.utils.performance import monitor_performance, setup_logging
 from src.bookmark_processor import BookmarkProcessor
+from src.tests.helpers import IsolatedTestCase
 from src.tests.test_data_generator import TestDataGenerator
 
-class TestConfigIntegration(unittest.TestCase):
+class TestConfigIntegration(IsolatedTestCase):
     def setUp(self):
+        super().setUp()
         self.config = Config()
         self.test_data_dir = Path("tests/data")
         self.test_data_dir.mkdir(parents=True, exist_ok=True)
@@ -37,7 +39,7 @@ class TestConfigIntegration(unittest.TestCase):
         
         # 4. 测试文件操作性能
         processor = BookmarkProcessor()
-        test_file = self.test_data_dir / "perf_test.html"
+        test_file = self.temp_dir / "perf_test.html"
         TestDataGenerator.generate_test_html(self.test_bookmarks, test_file)
         
         @monitor_performance(threshold=0.1)
@@ -64,9 +66,3 @@ class TestConfigIntegration(unittest.TestCase):
                 path.exists(), 
                 f"目录不存在: {dir_path}"
             )
-    
-    def tearDown(self):
-        """清理测试文件"""
-        test_file = self.test_data_dir / "perf_test.html"
-        if test_file.exists():
-            test_file.unlink() 
\ No newline at end of file
@@ -1,14 +1,18 @@
 import unittest
-from pathlib import Path
+from contextlib import redirect_stdout
+import io
 import json
+import shutil
 from src.data.collector import BookmarkDataCollector
 from src.data.preprocessor import BookmarkDataPreprocessor
+from src.tests.helpers import IsolatedTestCase
+from src.utils.logger import APILogger
 
-class TestDataCollection(unittest.TestCase):
+class TestDataCollection(IsolatedTestCase):
     def setUp(self):
+        super().setUp()
         self.collector = BookmarkDataCollector()
-        self.test_data_dir = Path("tests/data")
-        self.test_data_dir.mkdir(parents=True, exist_ok=True)
+        self.test_data_dir = self.temp_dir
         
         # 创建测试用的API日志
         self.test_log_file = self.test_data_dir / "test_api_log.json"
@@ -85,6 +89,113 @@ class TestDataCollection(unittest.TestCase):
             self.assertIn('title', item['input'])
             self.assertIn('url', item['input'])
     
+    def test_collect_from_nested_html(self):
+        """测试嵌套文件夹的书签只收集一次且标签为完整路径"""
+        self.test_html_file.write_text("""<DL><p>
+    <DT><H3>技术</H3>
+    <DL><p>
+        <DT><A HREF="https://docs.python.org">doc: Python</A>
+        <DT><H3>工具</H3>
+        <DL><p>
+            <DT><A HREF="https://github.com/FakerPHP/Faker">pkg: Faker</A>
+        </DL><p>
+    </DL><p>
+    <DT><H3>阅读</H3>
+    <DL><p>
+        <DT><A HREF="https://news.ycombinator.com">Hacker News</A>
+    </DL><p>
+</DL><p>""", encoding='utf-8')
+        
+        collected_data = self.collector.collect_from_html(self.test_html_file)
+        
+        labels = {item['input']['url']: item['label'] for item in collected_data}
+        self.assertEqual(len(collected_data), 3)
+        self.assertEqual(labels['https://docs.python.org'], '技术')
+        self.assertEqual(labels['https://github.com/FakerPHP/Faker'], '技术/工具')
+        self.assertEqual(labels['https://news.ycombinator.com'], '阅读')
+    
+    def test_collect_from_id_based_logs(self):
+        """测试从编号协议的API日志收集数据"""
+        id_log_file = self.test_data_dir / "test_api_log_ids.json"
+        id_log_file.write_text(json.dumps([{
+            "request": {
+                "prompt": "...",
+                "bookmarks": [
+                    {"id": 1, "title": "doc: FastAPI 中文文档", "url": "https://fastapi.tiangolo.com/zh/"},
+                    {"id": 2, "title": "pkg: FakerPHP/Faker", "url": "https://github.com/FakerPHP/Faker"},
+                    {"id": 3, "title": "未分类书签", "url": "https://example.com"}
+                ]
+            },
+            "response": {"result": '{"技术/文档": [1], "技术/工具": [2]}'},
+            "result": {"技术/文档": [1], "技术/工具": [2]},
+            "error": None
+        }], ensure_ascii=False), encoding='utf-8')
+        
+        try:
+            collected_data = self.collector.collect_from_api_logs(self.test_data_dir)
+        finally:
+            id_log_file.unlink()
+        
+        labels = {item['input']['url']: item['label'] for item in collected_data}
+        self.assertEqual(labels['https://fastapi.tiangolo.com/zh/'], '技术/文档')
+        self.assertEqual(labels['https://github.com/FakerPHP/Faker'], '技术/工具')
+        self.assertNotIn('https://example.com', labels)
+    
+    def test_collect_from_jsonl_logs(self):
+        """测试从 JSON Lines 日志（含切换后压缩的文件）收集数据"""
+        log_dir = self.test_data_dir / "jsonl_logs"
+        logger = APILogger("test", max_bytes=1, compress=True, log_dir=log_dir)
+        for title, url, category in [
+            ("doc: FastAPI 中文文档", "https://fastapi.tiangolo.com/zh/", "技术/文档"),
+            ("pkg: FakerPHP/Faker", "https://github.com/FakerPHP/Faker", "技术/工具")
+        ]:
+            logger.log_api_call(
+                request_data={"prompt": "...", "bookmarks": [{"id": 1, "title": title, "url": url}]},
+                response_data={},
+                result={category: [1]}
+            )
+            logger.flush()
+        logger.close()
+        
+        try:
+            self.assertEqual(len(list(log_dir.glob("*.jsonl.gz"))), 1)
+            collected_data = self.collector.collect_from_api_logs(log_dir)
+        finally:
+            shutil.rmtree(log_dir)
+        
+        labels = {item['input']['url']: item['label'] for item in collected_data}
+        self.assertEqual(labels, {
+            'https://fastapi.tiangolo.com/zh/': '技术/文档',
+            'https://github.com/FakerPHP/Faker': '技术/工具'
+        })
+    
+    def test_stream_from_api_logs(self):
+        """测试多进程流式收集：样本按日志文件顺序写入，只输出汇总进度"""
+        log_dir = self.test_data_dir / "stream_logs"
+        log_dir.mkdir(exist_ok=True)
+        for index in range(3):
+            entries = [{
+                "request": {"bookmarks": [{"id": 1, "title": f"t{index}-{n}", "url": f"https://example.com/{index}/{n}"}]},
+                "result": {"阅读": [1]}
+            } for n in range(2)]
+            (log_dir / f"api_call_{index}.jsonl").write_text(
+                ''.join(json.dumps(entry) + '\n' for entry in entries) + '{"broken', encoding='utf-8')
+        output_file = log_dir / "samples.jsonl"
+        
+        output = io.StringIO()
+        try:
+            with redirect_stdout(output):
+                stats = BookmarkDataCollector(verbose=False).stream_from_api_logs(log_dir, output_file, workers=2)
+            samples = [json.loads(line) for line in output_file.read_text(encoding='utf-8').splitlines()]
+        finally:
+            shutil.rmtree(log_dir)
+        
+        self.assertEqual(stats, {'files': 3, 'entries': 6, 'samples': 6, 'errors': 0})
+        self.assertEqual([sample['input']['title'] for sample in samples],
+                         ['t0-0', 't0-1', 't1-0', 't1-1', 't2-0', 't2-1'])
+        self.assertEqual(samples[0]['label'], '阅读')
+        self.assertLess(len(output.getvalue().splitlines()), 10)
+    
     def test_data_preprocessing(self):
         """测试数据预处理"""
         preprocessor = BookmarkDataPreprocessor()
@@ -50,4 +50,37 @@ class TestDataGenerator:
         html += "</DL><p>"
         
         output_path.write_text(html, encoding='utf-8')
-        return output_path 
\ No newline at end of file
+        return output_path
+    
+    @staticmethod
+    def generate_nested_test_html(output_path: Path, count: int = 1000,
+                                  depth: int = 3, bookmarks_per_folder: int = 20):
+        """生成多层嵌套的大型书签HTML文件（逐行写入，不在内存中拼接）"""
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write("""<!DOCTYPE NETSCAPE-Bookmark-file-1>
+<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">
+<TITLE>Bookmarks</TITLE>
+<H1>Bookmarks</H1>
+<DL><p>
+""")
+            written = 0
+            branch = 0
+            while written < count:
+                # 每个分支是一条 depth 层深的文件夹链，每层放若干书签
+                for level in range(depth):
+                    indent = "    " * (level + 1)
+                    f.write(f'{indent}<DT><H3 ADD_DATE="1700000000">分类{branch}-{level}</H3>\n')
+                    f.write(f'{indent}<DL><p>\n')
+                    for _ in range(bookmarks_per_folder):
+                        if written >= count:
+                            break
+                        f.write(
+                            f'{indent}    <DT><A HREF="https://site{written % 97}.example.com/page/{written}" '
+                            f'ADD_DATE="{1700000000 + written}">doc: 测试书签 {written}</A>\n'
+                        )
+                        written += 1
+                for level in reversed(range(depth)):
+                    f.write("    " * (level + 1) + "</DL><p>\n")
+                branch += 1
+            f.write("</DL><p>\n")
+        return output_path
@@ -1,13 +1,13 @@
 # src/tests/test_data_processor.py
 import unittest
-from pathlib import Path
 from src.data.processor import BookmarkDataProcessor
+from src.tests.helpers import IsolatedTestCase
 
-class TestBookmarkDataProcessor(unittest.TestCase):
+class TestBookmarkDataProcessor(IsolatedTestCase):
     def setUp(self):
+        super().setUp()
         self.processor = BookmarkDataProcessor()
-        self.test_data_dir = Path("tests/data")
-        self.test_data_dir.mkdir(parents=True, exist_ok=True)
+        self.test_data_dir = self.temp_dir
         
         # 创建测试用的书签文件
         self.test_bookmarks = """<!DOCTYPE NETSCAPE-Bookmark-file-1>
@@ -83,8 +83,24 @@ class TestBookmarkDataProcessor(unittest.TestCase):
         self.assertEqual(set(features['prefixes']), {'资源', '库'})
         self.assertEqual(features['clean_title'], 'FastText 库')
     
-    def tearDown(self):
-        """清理测试文件"""
-        import shutil
-        if self.test_data_dir.exists():
-            shutil.rmtree(self.test_data_dir)
\ No newline at end of file
+    def test_nested_folders_processed_once(self):
+        """测试嵌套文件夹中的书签只处理一次，并记录完整路径"""
+        nested_file = self.test_data_dir / "nested_bookmarks.html"
+        nested_file.write_text("""<DL><p>
+            <DT><H3>技术</H3>
+            <DL><p>
+                <DT><A HREF="https://docs.python.org">doc: Python 文档</A>
+                <DT><H3>工具</H3>
+                <DL><p>
+                    <DT><A HREF="https://github.com/python/cpython">pkg: CPython</A>
+                </DL><p>
+            </DL><p>
+        </DL><p>""", encoding='utf-8')
+        
+        data = self.processor.process_bookmarks_file(nested_file)
+        
+        self.assertEqual(len(data), 2)
+        self.assertEqual(data[0]['features']['folder'], '技术')
+        self.assertEqual(data[1]['features']['folder'], '工具')
+        self.assertEqual(data[1]['features']['folder_path'], '技术/工具')
+        self.assertEqual(data[1]['label'], '__label__工具')
@@ -3,10 +3,12 @@ from unittest.mock import Mock, patch
 from src.clients.ernie_client import ErnieClient
 from src.clients.chatgpt_client import ChatGPTClient
 from src.bookmark_processor import BookmarkProcessor
+from src.tests.helpers import IsolatedTestCase
 from src.utils.logger import APILogger
 
-class TestErrorHandling(unittest.TestCase):
+class TestErrorHandling(IsolatedTestCase):
     def setUp(self):
+        super().setUp()
         self.processor = BookmarkProcessor()
         self.ernie_client = ErnieClient()
         self.chatgpt_client = ChatGPTClient()
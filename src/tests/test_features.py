@@ -0,0 +1,67 @@
+import unittest
+from src.data.features import FeaturePipeline
+from src.data.models import Bookmark
+from src.data.preprocessor import BookmarkDataPreprocessor
+from src.data.processor import BookmarkDataProcessor
+
+class TestFeaturePipeline(unittest.TestCase):
+    def setUp(self):
+        self.pipeline = FeaturePipeline()
+
+    def test_extract_all_features(self):
+        """测试一次提取同时得到两种前缀规则的结果和 URL 特征"""
+        features = self.pipeline.extract("doc:pkg: FastAPI 文档 a", "https://docs.python.org/3/library/re.html;p?q=1")
+        self.assertEqual(features.prefix, '文档')
+        self.assertEqual(features.keywords, ['fastapi', '文档', 'a'])
+        self.assertEqual(features.prefixes, ['文档', '库'])
+        self.assertEqual(features.clean_title, 'FastAPI 文档 a')
+        self.assertEqual(features.clean_keywords, ['fastapi', '文档'])
+        self.assertEqual(features.domain, 'docs.python.org')
+        self.assertEqual(features.domain_type, '文档')
+        self.assertEqual(features.path_segments, ['3', 'library', 're.html'])
+        # 单项提取与整体提取的结果一致
+        url = "https://docs.python.org/3/library/re.html;p?q=1"
+        self.assertEqual(self.pipeline.domain_type(url), features.domain_type)
+        self.assertEqual(self.pipeline.path_segments(url), features.path_segments)
+        self.assertEqual(self.pipeline.keywords("FastAPI 文档 a"), features.keywords)
+
+    def test_divergent_prefix_rules(self):
+        """测试两种规则去掉的前缀不同时分别分词"""
+        features = self.pipeline.extract("blog:doc: 标题", "")
+        self.assertEqual((features.prefix, features.keywords), ('unknown', ['blog', 'doc', '标题']))
+        self.assertEqual((features.prefixes, features.clean_keywords), (['博客', '文档'], ['标题']))
+        self.assertEqual((features.domain, features.domain_type, features.path_segments), ('', 'unknown', []))
+
+    def test_host_cache(self):
+        """测试相同主机名只解析一次，修改规则重新编译后缓存失效"""
+        urls = [f"https://github.com/a/{i}" for i in range(10)]
+        features = self.pipeline.extract_many([{'title': 'x', 'url': url} for url in urls])
+        self.assertEqual({f.domain_type for f in features}, {'开源项目'})
+        self.assertEqual(self.pipeline.host_info.cache_info().misses, 1)
+        self.assertIs(features[0].domain, features[-1].domain)
+
+        self.pipeline.domain_patterns = {r'github': '代码托管'}
+        self.pipeline.compile()
+        self.assertEqual(self.pipeline.extract('x', urls[0]).domain_type, '代码托管')
+
+    def test_shared_pipeline_views(self):
+        """测试两个视图共用同一个流程时结果与各自的特征一致"""
+        preprocessor = BookmarkDataPreprocessor(self.pipeline)
+        processor = BookmarkDataProcessor(self.pipeline)
+        bookmark = {'title': 'res:pkg: FastText 库', 'url': 'https://github.com/facebook/fastText',
+                    'folder': '工具'}
+
+        self.assertEqual(preprocessor.extract_features(bookmark['title'], bookmark['url']), {
+            'prefix': '资源', 'domain_type': '开源项目', 'path_segments': ['facebook', 'fastText'],
+            'keywords': ['pkg', 'fasttext', '库']
+        })
+        features = processor.extract_features(bookmark)
+        self.assertEqual(features['prefixes'], ['资源', '库'])
+        self.assertEqual(features['keywords'], ['fasttext'])
+        self.assertEqual(features['folder_path'], '工具')
+        self.assertEqual(processor.extract_features_many(iter([bookmark])), [features])
+        self.assertEqual(self.pipeline.extract_many([Bookmark(title=bookmark['title'], url=bookmark['url'])]),
+                         [self.pipeline.extract(bookmark['title'], bookmark['url'])])
+
+if __name__ == '__main__':
+    unittest.main()
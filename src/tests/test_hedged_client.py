@@ -0,0 +1,123 @@
+import unittest
+from typing import Dict, List
+import json
+import time
+from unittest.mock import MagicMock
+from src.clients.hedged_client import HedgedClient, percentile
+from src.clients.resilience import CircuitBreaker
+from src.tests.helpers import IsolatedTestCase, ScriptedClient
+
+def delayed_client(name: str, delay: float = 0.0, fail: bool = False) -> ScriptedClient:
+    """按 client.delay 延迟返回结果的测试客户端，把所有书签归入以自身名称命名的分类"""
+    def script(batch: List[Dict]) -> str:
+        time.sleep(client.delay)
+        if fail:
+            raise Exception("provider down")
+        return json.dumps({name: list(range(1, len(batch) + 1))})
+
+    client = ScriptedClient(script, name)
+    client.delay = delay
+    return client
+
+class TestHedgedClient(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.bookmarks = [{"title": f"t{i}", "url": f"https://example.com/{i}"} for i in range(3)]
+
+    def make_client(self, primary: ScriptedClient, secondary: ScriptedClient) -> HedgedClient:
+        client = HedgedClient(primary, secondary)
+        client.cache = None
+        client.hedge_after = 0.1
+        return client
+
+    def categories(self, result) -> List[str]:
+        return [folder.name for folder in result[0]['folders']]
+
+    def test_fast_primary_not_hedged(self):
+        """测试主服务商及时返回时不发出对冲请求"""
+        primary, secondary = delayed_client("ernie", 0.01), delayed_client("chatgpt")
+        client = self.make_client(primary, secondary)
+
+        self.assertEqual(self.categories(client.categorize_bookmarks(self.bookmarks)), ["ernie"])
+        self.assertEqual(len(secondary.calls), 0)
+        self.assertEqual(client.stats["ernie"]["wins"], 1)
+
+    def test_slow_primary_hedged_to_secondary(self):
+        """测试主服务商超过阈值后对冲，先返回的一方获胜，另一方被取消"""
+        primary, secondary = delayed_client("ernie", 0.6), delayed_client("chatgpt", 0.01)
+        client = self.make_client(primary, secondary)
+
+        start = time.time()
+        result = client.categorize_bookmarks(self.bookmarks)
+        self.assertLess(time.time() - start, 0.5)
+        self.assertEqual(self.categories(result), ["chatgpt"])
+        self.assertEqual(client.stats["chatgpt"]["hedges"], 1)
+        self.assertEqual(client.stats["chatgpt"]["wins"], 1)
+        self.assertEqual(client.stats["ernie"]["cancelled"], 1)
+        self.assertTrue(primary.cancelled.wait(1))
+
+    def test_failed_primary_fails_over(self):
+        """测试主服务商调用失败时立即转到备用服务商"""
+        primary, secondary = delayed_client("ernie", fail=True), delayed_client("chatgpt")
+        client = self.make_client(primary, secondary)
+
+        self.assertEqual(self.categories(client.categorize_bookmarks(self.bookmarks)), ["chatgpt"])
+        self.assertEqual(client.stats["ernie"]["failures"], 1)
+        self.assertEqual(client.stats["chatgpt"]["failovers"], 1)
+        self.assertEqual(client.stats["ernie"]["cancelled"], 0)
+
+    def test_open_circuit_routes_to_secondary(self):
+        """测试主服务商熔断时全部请求直接发给备用服务商"""
+        primary, secondary = delayed_client("ernie"), delayed_client("chatgpt")
+        primary.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        primary.breaker.record_failure()
+        client = self.make_client(primary, secondary)
+
+        self.assertEqual(self.categories(client.categorize_bookmarks(self.bookmarks)), ["chatgpt"])
+        self.assertEqual(len(primary.calls), 0)
+
+    def test_both_down_returns_original(self):
+        """测试两个服务商都失败时返回原始书签"""
+        client = self.make_client(delayed_client("ernie", fail=True), delayed_client("chatgpt", fail=True))
+        self.assertEqual(client.categorize_bookmarks(self.bookmarks), self.bookmarks)
+
+    def test_hedge_delay_uses_latency_percentile(self):
+        """测试样本足够后按延迟分位数决定对冲时机"""
+        primary = delayed_client("ernie")
+        client = self.make_client(primary, delayed_client("chatgpt"))
+        client.min_samples = 5
+        self.assertEqual(client.hedge_delay(primary), 0.1)
+        for latency in (1.0, 2.0, 3.0, 4.0, 10.0):
+            client._record(primary, 'wins', latency)
+        self.assertEqual(client.hedge_delay(primary), 10.0)
+        self.assertEqual(percentile([1, 2, 3, 4], 0.5), 2)
+
+    def test_cancelled_primary_keeps_hedge_threshold(self):
+        """测试被对冲取消的主服务商用时计入延迟样本，反复对冲后阈值不会变小"""
+        primary, secondary = delayed_client("ernie", 0.3), delayed_client("chatgpt", 0.01)
+        client = self.make_client(primary, secondary)
+        client.min_samples = 4
+        for _ in range(4):
+            client.categorize_bookmarks(self.bookmarks)
+        self.assertEqual(client.stats["ernie"]["cancelled"], 4)
+        self.assertGreaterEqual(client.hedge_delay(primary), 0.1)
+
+        primary.delay = 0.01
+        for _ in range(4):
+            client.categorize_bookmarks(self.bookmarks)
+        self.assertEqual(client.stats["ernie"]["wins"], 4)
+        self.assertGreaterEqual(client.hedge_delay(primary), 0.1)
+
+    def test_sub_client_sizers_saved(self):
+        """测试对冲调用结束后保存主、备服务商各自的自适应批次大小"""
+        primary, secondary = delayed_client("ernie", 0.3), delayed_client("chatgpt", 0.01)
+        primary.sizer, secondary.sizer = MagicMock(size=10), MagicMock(size=10)
+        client = self.make_client(primary, secondary)
+        client.categorize_bookmarks(self.bookmarks)
+
+        primary.sizer.save.assert_called_once()
+        secondary.sizer.save.assert_called_once()
+        secondary.sizer.observe.assert_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,17 +1,17 @@
 import unittest
-from pathlib import Path
 from src.bookmark_processor import BookmarkProcessor
 from src.clients.ernie_client import ErnieClient
 from src.clients.chatgpt_client import ChatGPTClient
+from src.tests.helpers import IsolatedTestCase
 from src.tests.test_data_generator import TestDataGenerator
 from src.config import Config
 
-class TestIntegration(unittest.TestCase):
+class TestIntegration(IsolatedTestCase):
     def setUp(self):
+        super().setUp()
         self.config = Config()
         self.processor = BookmarkProcessor()
-        self.test_data_dir = Path("tests/data")
-        self.test_data_dir.mkdir(parents=True, exist_ok=True)
+        self.test_data_dir = self.temp_dir
         
         # 生成测试数据
         self.test_bookmarks = TestDataGenerator.generate_test_bookmarks(
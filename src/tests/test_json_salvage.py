@@ -0,0 +1,47 @@
+import unittest
+from src.clients.json_salvage import CategoryStreamParser, salvage_categories
+
+class TestJsonSalvage(unittest.TestCase):
+    def test_complete_response(self):
+        """测试完整响应，跳过说明文字和代码块标记"""
+        text = '好的，结果如下：\n```json\n{"技术/文档": [1, 2,], "阅读": [3]}\n```'
+        data, complete = salvage_categories(text)
+        self.assertTrue(complete)
+        self.assertEqual(data, {"技术/文档": [1, 2], "阅读": [3]})
+
+    def test_truncated_response_keeps_closed_categories(self):
+        """测试截断的响应保留已闭合的分类和未闭合列表中的完整元素"""
+        data, complete = salvage_categories('{"技术/文档": [1, 2], "阅读": [3], "娱乐": [4, 5, 1')
+        self.assertFalse(complete)
+        self.assertEqual(data, {"技术/文档": [1, 2], "阅读": [3], "娱乐": [4, 5]})
+
+    def test_truncated_after_closed_list(self):
+        """测试列表已闭合但对象未结束时保留该分类"""
+        self.assertEqual(salvage_categories('{"阅读": [1, 2]'), ({"阅读": [1, 2]}, False))
+
+    def test_truncated_inside_object_item(self):
+        """测试截断在旧格式的对象元素中时丢弃不完整的分类"""
+        data, complete = salvage_categories('{"阅读": [{"title": "a", "url": "u"}], "技术": [{"title": "b", "ur')
+        self.assertFalse(complete)
+        self.assertEqual(data, {"阅读": [{"title": "a", "url": "u"}]})
+
+    def test_nested_categories_flattened(self):
+        """测试嵌套的分类对象展开为路径"""
+        data, _ = salvage_categories('{"技术": {"文档": [1], "工具": [2]}, "a\\"b": [3]}')
+        self.assertEqual(data, {"技术/文档": [1], "技术/工具": [2], 'a"b': [3]})
+
+    def test_incremental_feed(self):
+        """测试逐字符输入时每个分类闭合后立即返回"""
+        parser = CategoryStreamParser()
+        emitted = []
+        for char in '{"x": [1, {"t": "]},"}], "y": [2]}':
+            emitted.extend(parser.feed(char))
+        self.assertEqual(emitted, [("x", [1, {"t": "]},"}]), ("y", [2])])
+        self.assertTrue(parser.complete)
+
+    def test_no_json(self):
+        """测试没有 JSON 时返回空结果"""
+        self.assertEqual(salvage_categories("Invalid JSON"), ({}, False))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import json
+from src.data.log_index import LogIndex
+from src.tests.helpers import IsolatedTestCase
+from src.utils.logger import APILogger
+
+class TestLogIndex(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.test_dir = self.temp_dir
+        self.logs_dir = self.test_dir / "logs"
+        self.logs_dir.mkdir(parents=True, exist_ok=True)
+        self.index = LogIndex(self.test_dir / "index.db")
+
+    def tearDown(self):
+        self.index.close()
+
+    def log_batch(self, logger: APILogger, bookmarks, result, error=None):
+        logger.log_api_call(
+            request_data={"prompt": "...", "bookmarks": [
+                {"id": i, "title": title, "url": url} for i, (title, url) in enumerate(bookmarks, 1)
+            ]},
+            response_data={"result": "...", "usage": {"prompt_tokens": 100, "completion_tokens": 12,
+                                                      "total_tokens": 112}},
+            result=result,
+            error=error,
+            latency=1.5
+        )
+        logger.flush()
+
+    def test_index_and_query(self):
+        """测试按 URL、域名、分类、时间和错误查询"""
+        logger = APILogger("ernie", log_dir=self.logs_dir / "ernie")
+        self.log_batch(logger, [("Python 文档", "https://www.python.org/doc/"),
+                                ("Hacker News", "https://news.ycombinator.com/")],
+                       {"技术/文档": [1], "阅读": [2]})
+        logger.log_api_call(request_data={"prompt": "...", "bookmarks": [
+            {"id": 1, "title": "Rust Book", "url": "https://doc.rust-lang.org/book/"}
+        ]}, response_data={}, error="timeout", latency=60.0)
+        logger.close()
+
+        self.assertEqual(self.index.update(self.logs_dir), {'files': 1, 'calls': 2, 'assignments': 2})
+        self.assertEqual(self.index.query(url="https://WWW.python.org/doc")[0]['category'], "技术/文档")
+        self.assertEqual(self.index.query(domain="ycombinator.com")[0]['title'], "Hacker News")
+        self.assertEqual(len(self.index.query(category="技术")), 1)
+        self.assertEqual(len(self.index.query(provider="chatgpt")), 0)
+        self.assertEqual(len(self.index.query(since="2000-01-01", until="2999-12-31")), 2)
+        self.assertEqual(len(self.index.query(until="2000-01-01")), 0)
+
+        errors = self.index.errors()
+        self.assertEqual([(row['provider'], row['error'], row['latency']) for row in errors],
+                         [("ernie", "timeout", 60.0)])
+        self.assertEqual(len(self.index.errors(domain="rust-lang.org")), 1)
+        self.assertEqual(len(self.index.errors(url="https://doc.rust-lang.org/book")), 1)
+        self.assertEqual(len(self.index.errors(domain="python.org")), 0)
+        stats = self.index.stats()
+        self.assertEqual(stats['providers'][0]['completion_tokens'], 12)
+        self.assertEqual(stats['providers'][0]['avg_latency'], 30.75)
+
+    def test_incremental_update_across_rotation(self):
+        """测试增量索引：只读取新增的行，切换并压缩后的文件不会重复索引"""
+        logger = APILogger("chatgpt", log_dir=self.logs_dir / "chatgpt", max_bytes=10 ** 6, compress=True)
+        self.log_batch(logger, [("a", "https://a.com")], {"x": [1]})
+        self.assertEqual(self.index.update(self.logs_dir)['calls'], 1)
+        self.assertEqual(self.index.update(self.logs_dir)['files'], 0)
+
+        # 写入一条后切换文件：原文件压缩为 .jsonl.gz，新内容写入新文件
+        self.log_batch(logger, [("b", "https://b.com")], {"y": [1]})
+        logger.max_bytes = 1
+        self.log_batch(logger, [("c", "https://c.com")], {"z": [1]})
+        logger.close()
+        self.assertEqual(len(list((self.logs_dir / "chatgpt").glob("*.jsonl.gz"))), 1)
+
+        self.assertEqual(self.index.update(self.logs_dir), {'files': 2, 'calls': 2, 'assignments': 2})
+        self.assertEqual(sorted(row['category'] for row in self.index.query()), ["x", "y", "z"])
+        self.assertEqual(self.index.update(self.logs_dir)['files'], 0)
+
+    def test_partial_line_and_legacy_json(self):
+        """测试未写完的最后一行留到下次读取，旧版 JSON 日志变化后整体重建"""
+        entry = {"timestamp": "2024-01-01T00:00:00", "request": {"bookmarks": [{"id": 1, "title": "a",
+                 "url": "https://a.com"}]}, "result": {"x": [1]}}
+        active = self.logs_dir / "ernie" / "api_call_1.jsonl"
+        active.parent.mkdir()
+        line = json.dumps(entry)
+        active.write_text(line + '\n' + line[:10], encoding='utf-8')
+        legacy = self.logs_dir / "ernie" / "api_call_0.json"
+        legacy.write_text(json.dumps([entry]), encoding='utf-8')
+
+        self.assertEqual(self.index.update(self.logs_dir)['calls'], 2)
+        active.write_text(line + '\n' + line + '\n', encoding='utf-8')
+        legacy.write_text(json.dumps([entry, entry]), encoding='utf-8')
+        self.assertEqual(self.index.update(self.logs_dir)['calls'], 3)
+        self.assertEqual(self.index.stats()['calls'], 4)
+
+if __name__ == '__main__':
+    unittest.main()
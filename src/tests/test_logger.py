@@ -0,0 +1,102 @@
+import unittest
+import gc
+import gzip
+import json
+import threading
+import weakref
+from src.tests.helpers import IsolatedTestCase
+from src.utils import logger as logger_module
+from src.utils.logger import APILogger, iter_log_entries, iter_log_files
+
+class TestAPILogger(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.test_dir = self.temp_dir
+
+    def make_logger(self, **kwargs) -> APILogger:
+        return APILogger("test", log_dir=self.test_dir, **kwargs)
+
+    def test_append_and_read_back(self):
+        """测试条目逐行追加，读取时保持写入顺序"""
+        logger = self.make_logger()
+        for i in range(3):
+            logger.log_api_call({"batch": i}, {"result": "{}"}, result={"阅读": [i]}, latency=0.12345)
+        logger.close()
+
+        lines = logger.log_file.read_text(encoding='utf-8').splitlines()
+        self.assertEqual(len(lines), 3)
+        entries = list(iter_log_entries(self.test_dir))
+        self.assertEqual([entry["request"]["batch"] for entry in entries], [0, 1, 2])
+        self.assertEqual(entries[0]["latency"], 0.123)
+
+    def test_exit_hook_does_not_retain_loggers(self):
+        """测试退出时关闭仍在写入的记录器，已关闭的记录器可以被回收"""
+        logger = self.make_logger()
+        logger.log_api_call({"batch": 0}, {})
+        self.assertIn(logger, logger_module._live_loggers)
+        logger_module._close_live_loggers()
+        self.assertEqual(len(list(iter_log_entries(self.test_dir))), 1)
+        self.assertFalse(logger._thread.is_alive())
+        self.assertNotIn(logger, logger_module._live_loggers)
+
+        ref = weakref.ref(logger)
+        del logger
+        gc.collect()
+        self.assertIsNone(ref())
+
+    def test_concurrent_writers(self):
+        """测试多个线程同时记录时每条日志都完整写入"""
+        logger = self.make_logger()
+
+        def write(worker: int):
+            for i in range(50):
+                logger.log_api_call({"worker": worker, "i": i}, {})
+
+        threads = [threading.Thread(target=write, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        logger.flush()
+
+        entries = list(iter_log_entries(self.test_dir))
+        self.assertEqual(len(entries), 400)
+        self.assertEqual(len({(e["request"]["worker"], e["request"]["i"]) for e in entries}), 400)
+        logger.close()
+
+    def test_size_rotation_with_gzip(self):
+        """测试超过大小上限后切换文件，旧文件压缩后仍可读取"""
+        logger = self.make_logger(max_bytes=200, compress=True)
+        for i in range(5):
+            logger.log_api_call({"i": i, "padding": "x" * 200}, {})
+            logger.flush()
+        logger.close()
+
+        compressed = sorted(self.test_dir.glob("*.jsonl.gz"))
+        self.assertEqual(len(compressed), 4)
+        with gzip.open(compressed[0], 'rt', encoding='utf-8') as f:
+            self.assertEqual(json.loads(f.readline())["request"]["i"], 0)
+        self.assertEqual(len(iter_log_files(self.test_dir)), 5)
+        self.assertEqual(sorted(e["request"]["i"] for e in iter_log_entries(self.test_dir)), list(range(5)))
+
+    def test_error_entry_keeps_earlier_entries(self):
+        """测试无法序列化的条目只记录为错误，不影响之前的日志"""
+        logger = self.make_logger()
+        logger.log_api_call({"ok": True}, {})
+        circular_ref = {}
+        circular_ref['self'] = circular_ref
+        logger.log_api_call(circular_ref, {}, error="Test error")
+        logger.close()
+
+        entries = list(iter_log_entries(self.test_dir))
+        self.assertEqual(entries[0]["request"], {"ok": True})
+        self.assertIn("日志记录错误", entries[1]["error"])
+
+    def test_reader_skips_partial_line_and_reads_legacy(self):
+        """测试读取时跳过中断写入的最后一行，并兼容旧版 JSON 数组日志"""
+        (self.test_dir / "a.jsonl").write_text('{"request": {"i": 1}}\n{"request": {"i"', encoding='utf-8')
+        (self.test_dir / "b.json").write_text(json.dumps([{"request": {"i": 2}}]), encoding='utf-8')
+        self.assertEqual([e["request"]["i"] for e in iter_log_entries(self.test_dir)], [1, 2])
+
+if __name__ == '__main__':
+    unittest.main()
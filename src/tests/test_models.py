@@ -0,0 +1,40 @@
+import unittest
+import json
+from src.data.models import Bookmark, Folder, TrainingSample, to_serializable
+
+class TestModels(unittest.TestCase):
+    def test_bookmark_is_slotted(self):
+        """测试书签记录不分配实例字典"""
+        bookmark = Bookmark(title="Test", url="https://test.com/a")
+        self.assertFalse(hasattr(bookmark, '__dict__'))
+        with self.assertRaises(AttributeError):
+            bookmark.extra = 1
+    
+    def test_mapping_compatibility(self):
+        """测试记录兼容字典式访问"""
+        bookmark = Bookmark(title="Test", url="https://test.com/a")
+        self.assertIn('title', bookmark)
+        self.assertEqual(bookmark['url'], "https://test.com/a")
+        self.assertEqual(bookmark.get('add_date', 'x'), '')
+        self.assertEqual(bookmark.get('missing', 'x'), 'x')
+        self.assertEqual(bookmark, {'title': 'Test', 'url': 'https://test.com/a',
+                                    'add_date': '', 'last_modified': '', 'folder': ''})
+        with self.assertRaises(KeyError):
+            bookmark['missing']
+    
+    def test_interned_strings(self):
+        """测试域名与文件夹路径被驻留共享"""
+        a = Bookmark(title="a", url="https://" + "example.com" + "/a", folder="技术/" + "文档")
+        b = Bookmark(title="b", url="https://example.com/b", folder="".join(["技术/", "文档"]))
+        self.assertIs(a.domain, b.domain)
+        self.assertIs(a.folder, b.folder)
+        self.assertIs(Folder(name="".join(["技", "术"])).name, Folder(name="技术").name)
+    
+    def test_serialization(self):
+        """测试嵌套记录可以序列化为 JSON"""
+        folder = Folder(name="技术", bookmarks=[Bookmark(title="Test", url="https://test.com")])
+        sample = TrainingSample(Bookmark(title="Test", url="https://test.com"), {'prefix': 'unknown'}, "技术")
+        data = json.loads(json.dumps([folder, sample], default=to_serializable))
+        self.assertEqual(data[0]['bookmarks'][0]['title'], "Test")
+        self.assertEqual(data[1]['input']['features'], {'prefix': 'unknown'})
+        self.assertEqual(data[1]['label'], "技术")
@@ -0,0 +1,61 @@
+import unittest
+from src.data.collector import BookmarkDataCollector
+from src.data.features import FeaturePipeline
+from src.data.parallel import _pack, _unpack, map_chunks
+from src.data.processor import BookmarkDataProcessor
+from src.tests.helpers import IsolatedTestCase
+
+def domain_types(columns, pipeline):
+    return [pipeline.extract(title, url).domain_type for title, url in zip(*columns)]
+
+class TestParallelExtraction(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.test_data_dir = self.temp_dir
+        links = ''.join(
+            f'<DT><A HREF="https://{host}/p{i}">{prefix}标题 {i}</A>\n'
+            for i, (host, prefix) in enumerate(
+                [("github.com", "pkg: "), ("docs.python.org", "doc: "), ("example.com", "")] * 7
+            )
+        )
+        self.test_file = self.test_data_dir / "bookmarks.html"
+        self.test_file.write_text(
+            f"<DL><p>\n<DT><H3>技术</H3>\n<DL><p>\n{links}<DT><H3>工具</H3>\n<DL><p>\n{links}</DL><p>\n</DL><p>\n</DL><p>",
+            encoding='utf-8'
+        )
+
+    def test_pack_roundtrip(self):
+        """测试列打包后还原，含 NUL 的列退回为普通列表"""
+        for values in (["a", "", "中文"], [], [""], ["a\x00b", "c"]):
+            self.assertEqual(_unpack(_pack(values), len(values)), values)
+
+    def test_map_chunks_keeps_order_and_rules(self):
+        """测试多进程分块处理的结果顺序不变，子进程使用主进程修改后的规则"""
+        pipeline = FeaturePipeline(domain_patterns={r'example': '示例'})
+        urls = [f"https://{host}/{i}" for i, host in enumerate(["example.com", "github.com"] * 10)]
+        titles = [''] * len(urls)
+        expected = domain_types([titles, urls], pipeline)
+        self.assertEqual(expected[:2], ['示例', 'unknown'])
+        self.assertEqual(list(map_chunks(domain_types, [titles, urls], pipeline, workers=2, chunk_size=3)),
+                         expected)
+        self.assertEqual(list(map_chunks(domain_types, [titles, urls], pipeline, workers=1, chunk_size=3)),
+                         expected)
+
+    def test_processor_parallel_matches_serial(self):
+        """测试并行生成的训练数据与单进程结果一致"""
+        processor = BookmarkDataProcessor()
+        serial = processor.process_bookmarks_file(self.test_file)
+        parallel = processor.process_bookmarks_file(self.test_file, workers=2, chunk_size=4)
+        self.assertEqual(len(serial), 42)
+        self.assertEqual(parallel, serial)
+        self.assertIs(parallel[0]['features'].domain, serial[0]['features'].domain)
+
+    def test_collector_parallel_matches_serial(self):
+        """测试采集器并行提取特征的结果与单进程一致"""
+        collector = BookmarkDataCollector(verbose=False)
+        serial = collector.collect_from_html(self.test_file)
+        parallel = collector.collect_from_html(self.test_file, workers=2, chunk_size=5)
+        self.assertEqual([sample.to_dict() for sample in parallel], [sample.to_dict() for sample in serial])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+from src.data.parser import (
+    NetscapeBookmarkParser, iter_events, iter_bookmarks,
+    FOLDER_START, FOLDER_END, BOOKMARK
+)
+from src.tests.helpers import IsolatedTestCase
+
+class TestNetscapeBookmarkParser(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.test_data_dir = self.temp_dir
+        self.test_file = self.test_data_dir / "parser_test.html"
+        self.test_file.write_text("""<!DOCTYPE NETSCAPE-Bookmark-file-1>
+<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">
+<TITLE>Bookmarks</TITLE>
+<H1>Bookmarks</H1>
+<DL><p>
+    <DT><H3 ADD_DATE="1600000000">技术</H3>
+    <DL><p>
+        <DT><A HREF="https://docs.python.org" ADD_DATE="1600000001">doc: Python &amp; 文档</A>
+        <DT><H3>工具</H3>
+        <DL><p>
+            <DT><A HREF="https://github.com/a?x=1&amp;y=2">pkg: A</A>
+        </DL><p>
+        <DT><H3>空文件夹</H3>
+    </DL><p>
+    <DT><A HREF="https://root.com">Root</A>
+</DL><p>""", encoding='utf-8')
+
+    def test_event_sequence(self):
+        """测试文件夹嵌套与书签事件顺序"""
+        events = [(event, data and (data.get('name') or data.get('title')))
+                  for event, data in iter_events(self.test_file)]
+        self.assertEqual(events, [
+            (FOLDER_START, '技术'),
+            (BOOKMARK, 'doc: Python & 文档'),
+            (FOLDER_START, '工具'),
+            (BOOKMARK, 'pkg: A'),
+            (FOLDER_END, None),
+            (FOLDER_START, '空文件夹'),
+            (FOLDER_END, None),
+            (FOLDER_END, None),
+            (BOOKMARK, 'Root'),
+        ])
+
+    def test_bookmark_attributes(self):
+        """测试书签属性与实体解码"""
+        bookmarks = list(iter_bookmarks(self.test_file))
+        self.assertEqual(len(bookmarks), 3)
+        self.assertEqual(bookmarks[0]['add_date'], '1600000001')
+        self.assertEqual(bookmarks[0]['last_modified'], '')
+        self.assertEqual(bookmarks[1]['url'], 'https://github.com/a?x=1&y=2')
+
+    def test_chunk_boundaries(self):
+        """测试任意分块边界下结果一致"""
+        expected = list(iter_events(self.test_file))
+        self.assertEqual(list(iter_events(self.test_file, chunk_size=3)), expected)
+
+        parser = NetscapeBookmarkParser()
+        events = []
+        for char in self.test_file.read_text(encoding='utf-8'):
+            parser.feed(char)
+            events.extend(parser.drain())
+        parser.close()
+        events.extend(parser.drain())
+        self.assertEqual(events, expected)
+
+    def tearDown(self):
+        if self.test_file.exists():
+            self.test_file.unlink()
@@ -0,0 +1,72 @@
+import unittest
+from urllib.parse import urlparse
+import re
+from src.data.models import Bookmark
+from src.data.preprocessor import BookmarkDataPreprocessor
+
+def legacy_features(preprocessor: BookmarkDataPreprocessor, title: str, url: str) -> dict:
+    """逐个模式调用 re 的原始实现，作为对照"""
+    prefix = next((category for pattern, category in preprocessor.prefix_patterns.items()
+                   if re.match(pattern, title, re.I)), 'unknown')
+    domain = urlparse(url).netloc
+    domain_type = next((category for pattern, category in preprocessor.domain_patterns.items()
+                        if re.search(pattern, domain, re.I)), 'unknown')
+    clean = title
+    for pattern in preprocessor.prefix_patterns:
+        clean = re.sub(pattern, '', clean, flags=re.I)
+    return {
+        'prefix': prefix,
+        'domain_type': domain_type,
+        'path_segments': [seg for seg in urlparse(url).path.split('/') if seg],
+        'keywords': re.findall(r'\w+', clean.lower())
+    }
+
+class TestPreprocessor(unittest.TestCase):
+    def setUp(self):
+        self.preprocessor = BookmarkDataPreprocessor()
+        self.cases = [
+            ("doc: FastAPI 中文文档", "https://fastapi.tiangolo.com/zh/"),
+            ("PKG:pip", "https://docs.github.com/en/get-started"),
+            ("pkg:doc:嵌套前缀", "https://help.example.org/a/b"),
+            ("site:entry:x", "https://www.docs.python.org/3/library/re.html"),
+            ("doc:pkg:tip:多个前缀", "https://github.com/a"),
+            ("tip:doc:顺序相反", "https://github.com/a"),
+            ("普通标题 without prefix", "https://example.com"),
+            ("docs: 不是前缀", "ftp://HELP.Example.COM:21/x;params?q=1#frag"),
+            ("", ""),
+        ]
+
+    def test_matches_legacy_implementation(self):
+        """测试预编译的匹配结果与逐个模式匹配的原始实现一致"""
+        for title, url in self.cases:
+            self.assertEqual(self.preprocessor.extract_features(title, url),
+                             legacy_features(self.preprocessor, title, url), (title, url))
+
+    def test_pattern_order_takes_priority(self):
+        """测试域名规则按定义顺序优先，而不是按匹配位置"""
+        self.assertEqual(self.preprocessor._extract_domain_type("https://docs.github.com"), '开源项目')
+        self.assertEqual(self.preprocessor._extract_domain_type("https://docs.python.org"), '文档')
+
+    def test_recompile_after_changing_patterns(self):
+        """测试修改规则后重新编译"""
+        self.preprocessor.prefix_patterns = {r'^wiki:': '百科', **self.preprocessor.prefix_patterns}
+        self.preprocessor.compile_patterns()
+        self.assertEqual(self.preprocessor._extract_prefix("Wiki: 条目"), '百科')
+        self.assertEqual(self.preprocessor._extract_keywords("wiki:doc:条目"), ['条目'])
+        
+        # 不以 ^ 开头的规则会移除标题中任意位置的匹配
+        self.preprocessor.prefix_patterns[r'\[\d+\]'] = '编号'
+        self.preprocessor.compile_patterns()
+        for title in ("doc:[1] 标题 [2]", "[3] 编号前缀", "标题 [4]"):
+            self.assertEqual(self.preprocessor.extract_features(title, ''),
+                             legacy_features(self.preprocessor, title, ''), title)
+
+    def test_extract_features_many(self):
+        """测试批量提取与逐个提取一致，支持字典和 Bookmark 记录"""
+        bookmarks = [{"title": title, "url": url} for title, url in self.cases]
+        bookmarks[0] = Bookmark(title=self.cases[0][0], url=self.cases[0][1])
+        self.assertEqual(self.preprocessor.extract_features_many(bookmarks),
+                         [self.preprocessor.extract_features(title, url) for title, url in self.cases])
+
+if __name__ == '__main__':
+    unittest.main()
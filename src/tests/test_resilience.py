@@ -0,0 +1,200 @@
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+import json
+import threading
+import time
+from src.clients.chatgpt_client import ChatGPTClient
+from src.clients.resilience import (
+    CircuitBreaker, CircuitOpenError, RetryPolicy, call_with_retry, classify_error
+)
+from src.tests.helpers import IsolatedTestCase
+
+RESULT = {"技术/测试": [{"title": "test", "url": "http://test.com"}]}
+
+class FaultInjectingHandler(BaseHTTPRequestHandler):
+    """模拟 OpenAI 接口，按预设的故障序列依次响应"""
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            fault = server.faults.pop(0) if server.faults else ('ok',)
+        kind = fault[0]
+        try:
+            if kind == 'slow':
+                time.sleep(fault[1])
+                kind = 'ok'
+            if kind == 'ok':
+                body = {
+                    "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": "fake",
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant",
+                                             "content": json.dumps(RESULT, ensure_ascii=False)}}],
+                    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+                }
+                self._send(200, body)
+            else:
+                headers = {'Retry-After': str(fault[1])} if len(fault) > 1 else {}
+                self._send(int(kind), {"error": {"message": "injected", "type": "test"}}, headers)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _send(self, status: int, body: dict, headers: dict = None):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+class RecordingPolicy(RetryPolicy):
+    """记录每次退避时长的重试策略"""
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.delays: List[float] = []
+
+    def delay_for(self, attempt, retry_after=None):
+        delay = super().delay_for(attempt, retry_after)
+        self.delays.append(delay)
+        return delay
+
+class TestResilienceWithFakeEndpoint(IsolatedTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FaultInjectingHandler)
+        cls.server.lock = threading.Lock()
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}/v1"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        super().setUp()
+        self.server.faults = []
+        self.server.requests = 0
+        self.client = ChatGPTClient(base_url=self.base_url)
+        self.client.client = self.client.client.with_options(timeout=0.5)
+        self.client.retry_policy = RecordingPolicy(max_attempts=4, base_delay=0.01, max_delay=1.0)
+        self.client.breaker = CircuitBreaker(failure_threshold=10)
+        self.bookmarks = [{"title": "test", "url": "http://test.com"}]
+
+    def categorized(self, result) -> bool:
+        return bool(result) and isinstance(result[0], dict) and 'folders' in result[0]
+
+    def test_retry_after_rate_limit_and_server_error(self):
+        """测试 429 和 5xx 后重试成功，并遵守 Retry-After"""
+        self.server.faults = [('429', 0.2), ('503',)]
+        result = self.client.categorize_bookmarks(self.bookmarks)
+
+        self.assertTrue(self.categorized(result))
+        self.assertEqual(self.server.requests, 3)
+        self.assertGreaterEqual(self.client.retry_policy.delays[0], 0.2)
+
+    def test_timeout_is_retried(self):
+        """测试超过单次调用时限的请求被中止并重试"""
+        self.server.faults = [('slow', 1.5)]
+        start = time.time()
+        result = self.client.categorize_bookmarks(self.bookmarks)
+
+        self.assertTrue(self.categorized(result))
+        self.assertEqual(self.server.requests, 2)
+        self.assertLess(time.time() - start, 1.5)
+
+    def test_fatal_error_not_retried(self):
+        """测试不可重试的错误只请求一次"""
+        self.server.faults = [('400',)]
+        result = self.client.categorize_bookmarks(self.bookmarks)
+
+        self.assertEqual(result, self.bookmarks)
+        self.assertEqual(self.server.requests, 1)
+
+    def test_circuit_opens_after_repeated_failures(self):
+        """测试连续失败后熔断，不再向服务发请求"""
+        self.client.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        self.server.faults = [('500',)] * 10
+
+        self.assertEqual(self.client.categorize_bookmarks(self.bookmarks), self.bookmarks)
+        self.assertEqual(self.server.requests, 2)
+        self.assertEqual(self.client.breaker.state, CircuitBreaker.OPEN)
+
+        self.client.categorize_bookmarks(self.bookmarks)
+        self.assertEqual(self.server.requests, 2)
+
+class TestResiliencePrimitives(unittest.TestCase):
+    def test_classify_plain_errors(self):
+        """测试普通异常的分类"""
+        self.assertEqual(classify_error(TimeoutError()), (True, None))
+        self.assertEqual(classify_error(ValueError("bad json")), (False, None))
+
+        class QianfanLikeError(Exception):
+            error_code = 18
+        self.assertTrue(classify_error(QianfanLikeError())[0])
+
+    def test_backoff_is_bounded(self):
+        """测试退避时长不超过上限"""
+        policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+        for attempt in range(1, 10):
+            self.assertLessEqual(policy.delay_for(attempt), 5.0)
+        self.assertEqual(policy.delay_for(1, retry_after=100), 5.0)
+
+    def test_half_open_allows_single_probe(self):
+        """测试熔断器半开状态只放行一个试探请求"""
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+        now[0] = 11
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertTrue(breaker.allow())
+
+    def test_call_with_retry_raises_when_open(self):
+        """测试熔断器打开时直接抛出异常"""
+        breaker = CircuitBreaker(failure_threshold=1)
+        breaker.record_failure()
+        with self.assertRaises(CircuitOpenError):
+            call_with_retry(lambda: 1, RetryPolicy(), breaker)
+
+    def test_fatal_errors_do_not_reset_failures(self):
+        """测试不可重试的错误不会清零熔断器的失败计数"""
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        policy = RetryPolicy(max_attempts=1)
+
+        def fail(error):
+            def func():
+                raise error
+            return func
+
+        for error in (TimeoutError(), ValueError("400"), TimeoutError()):
+            with self.assertRaises(type(error)):
+                call_with_retry(fail(error), policy, breaker)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+    def test_fatal_error_releases_half_open_probe(self):
+        """测试半开试探遇到不可重试的错误时归还名额，但不关闭熔断器"""
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+        breaker.record_failure()
+        now[0] = 11
+
+        def fail():
+            raise ValueError("400")
+        with self.assertRaises(ValueError):
+            call_with_retry(fail, RetryPolicy(max_attempts=1), breaker)
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(breaker.allow())
+
+if __name__ == '__main__':
+    unittest.main()
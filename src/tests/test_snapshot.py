@@ -0,0 +1,63 @@
+import unittest
+from unittest.mock import patch
+from src.data import snapshot
+from src.data.parser import iter_events
+from src.data.snapshot import load_events, snapshot_path, has_valid_snapshot
+from src.tests.helpers import IsolatedTestCase
+from src.tests.test_data_generator import TestDataGenerator
+
+class TestBookmarkSnapshot(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.test_data_dir = self.temp_dir
+        self.test_file = self.test_data_dir / "snapshot_test.html"
+        TestDataGenerator.generate_nested_test_html(self.test_file, count=50, depth=3,
+                                                    bookmarks_per_folder=4)
+        self.cache_file = snapshot_path(self.test_file)
+        if self.cache_file.exists():
+            self.cache_file.unlink()
+    
+    def test_snapshot_reused_when_unchanged(self):
+        """测试文件未变化时从快照读取而不重新解析"""
+        expected = list(iter_events(self.test_file))
+        self.assertEqual(list(load_events(self.test_file)), expected)
+        self.assertTrue(has_valid_snapshot(self.test_file))
+        
+        with patch.object(snapshot, 'iter_events', side_effect=AssertionError("不应重新解析")):
+            self.assertEqual(list(load_events(self.test_file)), expected)
+    
+    def test_snapshot_invalidated_on_change(self):
+        """测试文件内容变化后快照失效"""
+        list(load_events(self.test_file))
+        with open(self.test_file, 'a', encoding='utf-8') as f:
+            f.write('<DT><A HREF="https://new.example.com">新书签</A>\n')
+        
+        self.assertFalse(has_valid_snapshot(self.test_file))
+        events = list(load_events(self.test_file))
+        self.assertEqual(events[-1][1]['url'], 'https://new.example.com')
+        self.assertTrue(has_valid_snapshot(self.test_file))
+    
+    def test_partial_iteration_keeps_no_snapshot(self):
+        """测试未完整遍历时不会留下不完整的快照"""
+        events = load_events(self.test_file)
+        next(events)
+        events.close()
+        self.assertFalse(self.cache_file.exists())
+        self.assertEqual(list(self.test_data_dir.glob("*.tmp")), [])
+    
+    def test_truncated_snapshot_reparsed(self):
+        """测试截断的快照在读取前被识别、删除并重新解析"""
+        expected = list(iter_events(self.test_file))
+        list(load_events(self.test_file))
+        size = self.cache_file.stat().st_size
+        with open(self.cache_file, 'r+b') as f:
+            f.truncate(size - 10)
+        
+        self.assertFalse(has_valid_snapshot(self.test_file))
+        self.assertEqual(list(load_events(self.test_file)), expected)
+        self.assertTrue(has_valid_snapshot(self.test_file))
+    
+    def tearDown(self):
+        for path in (self.test_file, self.cache_file):
+            if path.exists():
+                path.unlink()
@@ -0,0 +1,160 @@
+import unittest
+from unittest.mock import PropertyMock, patch
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List
+import json
+import threading
+import time
+from src.clients.chatgpt_client import ChatGPTClient
+from src.config import Config
+from src.tests.helpers import IsolatedTestCase, ScriptedClient
+
+# 分成多段发送的响应：第一个分类闭合后暂停一段时间再发送其余内容
+CHUNKS = ['{"技术/', '文档": [1, 2]', ', "阅读": [', '3]}']
+
+class StreamingHandler(BaseHTTPRequestHandler):
+    """模拟 OpenAI 的流式接口（server-sent events）"""
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        try:
+            for index, text in enumerate(CHUNKS):
+                if index == 2:
+                    time.sleep(self.server.pause)
+                finish_reason = self.server.finish_reason if index == len(CHUNKS) - 1 else None
+                self.send_chunk([{"index": 0, "delta": {"content": text}, "finish_reason": finish_reason}])
+            # 请求 include_usage 时最后一个片段只有 token 用量
+            if (body.get("stream_options") or {}).get("include_usage"):
+                self.send_chunk([], usage={"prompt_tokens": 50, "completion_tokens": 12, "total_tokens": 62})
+            self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def send_chunk(self, choices: List[Dict], **extra):
+        chunk = {"id": "chatcmpl-test", "object": "chat.completion.chunk", "created": 0, "model": "fake",
+                 "choices": choices, **extra}
+        self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+class RecordingSizer:
+    """记录每次反馈的批次大小控制器"""
+    size = 15
+
+    def __init__(self):
+        self.observed: List[Dict] = []
+
+    def observe(self, batch_size: int, latency: float, completion_tokens=None, max_tokens=None, **kwargs):
+        self.observed.append({'completion_tokens': completion_tokens, **kwargs})
+
+    def save(self):
+        pass
+
+def stream_chunks(number: int, count: int, stall: bool) -> Iterator[str]:
+    """第 number 次调用的流式片段；stall 为真时第一次调用在第一个分类之后卡住"""
+    yield '{"技术/文档": [1]'
+    if number == 1 and stall:
+        time.sleep(2)
+    ids = ', '.join(str(i) for i in range(2, count + 1))
+    yield f', "阅读": [{ids}]}}' if count > 1 else '}'
+
+def streaming_client(stall_on_first: bool) -> ScriptedClient:
+    """按预设片段输出流式响应的测试客户端，可以模拟卡住的流"""
+    client = ScriptedClient(lambda batch: stream_chunks(len(client.calls), len(batch), stall_on_first))
+    client.stream = True
+    client.stall_timeout = 0.2
+    return client
+
+def reading(batch: List[Dict]) -> str:
+    """把所有书签归入 阅读 分类"""
+    return '{"阅读": [%s]}' % ', '.join(str(i + 1) for i in range(len(batch)))
+
+class BlockingClient(ScriptedClient):
+    """不支持流式响应的测试客户端"""
+    supports_stream = False
+
+class TestStreaming(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.bookmarks = [{"title": f"t{i}", "url": f"https://example.com/{i}"} for i in range(3)]
+
+    def start_server(self, pause: float = 0, finish_reason: str = None) -> ThreadingHTTPServer:
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StreamingHandler)
+        server.pause = pause
+        server.finish_reason = finish_reason
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def test_openai_stream_emits_categories_early(self):
+        """测试流式响应中每个分类闭合后立即回调"""
+        server = self.start_server(pause=0.5)
+        client = ChatGPTClient(base_url=f"http://127.0.0.1:{server.server_address[1]}/v1")
+        client.stream = True
+        emitted = []
+        client.on_category = lambda category, items: emitted.append(
+            (category, [b['url'] for b in items], time.time())
+        )
+
+        start = time.time()
+        result = client.categorize_bookmarks(self.bookmarks)
+        finished = time.time()
+
+        self.assertEqual([(c, urls) for c, urls, _ in emitted], [
+            ("技术/文档", [self.bookmarks[0]['url'], self.bookmarks[1]['url']]),
+            ("阅读", [self.bookmarks[2]['url']])
+        ])
+        # 第一个分类在服务端暂停之前就已经交给下游
+        self.assertLess(emitted[0][2] - start, finished - start - 0.3)
+        self.assertEqual(len(result), 1)
+
+    def test_stream_usage_reaches_sizer(self):
+        """测试流式响应最后片段中的 token 用量和截断标记反馈给批次大小控制器"""
+        server = self.start_server(finish_reason="length")
+        client = ChatGPTClient(base_url=f"http://127.0.0.1:{server.server_address[1]}/v1")
+        client.stream = True
+        client.requeue_rounds = 0
+        client.sizer = RecordingSizer()
+        client.categorize_bookmarks(self.bookmarks)
+
+        self.assertEqual(client.sizer.observed, [{'completion_tokens': 12, 'truncated': True, 'missing': 0}])
+
+    def test_stalled_stream_is_cut_and_requeued(self):
+        """测试卡住的流被提前结束，已完成的分类保留，其余书签重新提交"""
+        client = streaming_client(stall_on_first=True)
+        start = time.time()
+        result = client.categorize_bookmarks(self.bookmarks)
+
+        self.assertLess(time.time() - start, 1.5)
+        self.assertEqual([len(batch) for batch in client.calls], [3, 1, 1])
+        self.assertEqual(len(result), 1)
+        folders = {folder.name: folder for folder in result[0]['folders']}
+        self.assertEqual(len(folders["技术"].subfolders[0].bookmarks), 3)
+
+    def test_stream_without_stall(self):
+        """测试正常结束的流与非流式结果一致"""
+        client = streaming_client(stall_on_first=False)
+        result = client.categorize_bookmarks(self.bookmarks)
+
+        self.assertEqual([len(batch) for batch in client.calls], [3])
+        folders = {folder.name: folder for folder in result[0]['folders']}
+        self.assertEqual([b['url'] for b in folders["阅读"].bookmarks],
+                         [b['url'] for b in self.bookmarks[1:]])
+
+    def test_stream_setting_ignored_without_support(self):
+        """测试不支持流式响应的客户端忽略 stream 配置，仍按非流式调用"""
+        settings = {"chatgpt": {"stream": True, "batch_size": 5}}
+        with patch.object(Config, 'api_settings', new_callable=PropertyMock, return_value=settings):
+            client = BlockingClient(reading)
+        self.assertFalse(client.stream)
+        result = client.categorize_bookmarks(self.bookmarks)
+        self.assertEqual(len(result[0]['folders'][0].bookmarks), 3)
+
+if __name__ == '__main__':
+    unittest.main()
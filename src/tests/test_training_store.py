@@ -0,0 +1,158 @@
+import unittest
+from unittest.mock import patch
+import json
+from src.data.collector import BookmarkDataCollector
+from src.data.models import Bookmark, TrainingSample
+from src.data.training_store import TrainingDataStore
+from src.tests.helpers import IsolatedTestCase
+from src.utils.logger import APILogger
+
+def sample(url: str, label: str, title: str = "标题") -> TrainingSample:
+    return TrainingSample(Bookmark(title=title, url=url), {'prefix': 'unknown'}, label)
+
+class TestTrainingDataStore(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.test_dir = self.temp_dir
+        self.logs_dir = self.test_dir / "logs"
+        self.logs_dir.mkdir(parents=True, exist_ok=True)
+        self.store = TrainingDataStore(self.test_dir / "training.db")
+        self.collector = BookmarkDataCollector(verbose=False, store=self.store)
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_dedup_by_normalized_url(self):
+        """测试指向同一页面的不同 URL 写法只保留一条样本"""
+        stats = self.store.add_samples([
+            sample("https://Example.com/a/?utm_source=x", "阅读"),
+            sample("https://example.com/a", "阅读"),
+            sample("https://example.com/b", "阅读"),
+        ], 'log')
+        self.assertEqual(stats, {'added': 2, 'updated': 0, 'unchanged': 1, 'conflicts': 0})
+        self.assertEqual(len(self.store), 2)
+
+    def test_conflict_policies(self):
+        """测试各个标签冲突策略"""
+        expected = {'prefer_html': '技术', 'latest': '阅读', 'keep_first': '技术', 'majority': '技术'}
+        for policy, label in expected.items():
+            store = TrainingDataStore(self.test_dir / f"{policy}.db", conflict_policy=policy)
+            store.add_samples([sample("https://a.com", "技术")], 'html')
+            store.add_samples([sample("https://a.com", "技术"), sample("https://a.com", "阅读")], 'log')
+            self.assertEqual([s['label'] for s in store.iter_samples()], [label], policy)
+            self.assertEqual(store.stats()['conflicted'], 1, policy)
+            store.close()
+
+        # majority：票数超过当前标签后才替换；prefer_html：同为日志来源时以新的为准
+        store = TrainingDataStore(self.test_dir / "majority2.db", conflict_policy='majority')
+        store.add_samples([sample("https://a.com", "技术"), sample("https://a.com", "阅读"),
+                           sample("https://a.com", "阅读")], 'log')
+        self.assertEqual(next(store.iter_samples())['label'], '阅读')
+        store.close()
+        self.store.add_samples([sample("https://a.com", "技术"), sample("https://a.com", "阅读")], 'log')
+        self.assertEqual(next(self.store.iter_samples())['label'], '阅读')
+        with self.assertRaises(ValueError):
+            TrainingDataStore(self.test_dir / "bad.db", conflict_policy='random')
+
+    def log_batch(self, logger: APILogger, title: str, url: str, category: str):
+        logger.log_api_call(request_data={"prompt": "...", "bookmarks": [{"id": 1, "title": title, "url": url}]},
+                            response_data={}, result={category: [1]})
+        logger.flush()
+
+    def test_incremental_log_ingest(self):
+        """测试日志只处理新增的行，切换压缩后的文件不会重复收集"""
+        logger = APILogger("ernie", log_dir=self.logs_dir / "ernie", max_bytes=10 ** 6, compress=True)
+        self.log_batch(logger, "a", "https://a.com", "技术")
+        self.assertEqual(self.collector.ingest_api_logs(self.logs_dir)['added'], 1)
+        self.assertEqual(self.collector.ingest_api_logs(self.logs_dir)['skipped'], 1)
+
+        self.log_batch(logger, "b", "https://b.com", "阅读")
+        logger.max_bytes = 1
+        self.log_batch(logger, "a", "https://a.com/", "工具")
+        logger.close()
+        stats = self.collector.ingest_api_logs(self.logs_dir)
+        self.assertEqual((stats['files'], stats['added'], stats['conflicts']), (2, 1, 1))
+        self.assertEqual({s['input']['url']: s['label'] for s in self.store.iter_samples()},
+                         {"https://a.com/": "工具", "https://b.com": "阅读"})
+        self.assertEqual(self.collector.ingest_api_logs(self.logs_dir)['files'], 0)
+
+    def test_html_snapshot_and_export(self):
+        """测试相同内容的书签文件只收集一次，导出去重后的全部样本"""
+        html = """<DL><p>
+    <DT><H3>技术</H3>
+    <DL><p>
+        <DT><A HREF="https://docs.python.org">doc: Python</A>
+        <DT><A HREF="https://docs.python.org/">doc: Python 文档</A>
+    </DL><p>
+</DL><p>"""
+        first, copy = self.test_dir / "bookmarks.html", self.test_dir / "bookmarks-copy.html"
+        first.write_text(html, encoding='utf-8')
+        copy.write_text(html, encoding='utf-8')
+        self.assertEqual(self.collector.ingest_html(first)['added'], 1)
+        self.assertEqual(self.collector.ingest_html(copy)['skipped'], 1)
+        self.assertEqual(self.store.stats()['inputs'], {'html': 1})
+
+        output = self.test_dir / "training.json"
+        self.assertEqual(self.collector.save_training_data(output), 1)
+        exported = json.loads(output.read_text(encoding='utf-8'))
+        self.assertEqual(exported[0]['label'], '技术')
+        self.assertEqual(exported[0]['input']['features']['prefix'], '文档')
+
+    def test_failed_html_ingest_not_recorded(self):
+        """测试书签文件解析出错时不记录快照，下次重新收集"""
+        html_file = self.test_dir / "bookmarks.html"
+        html_file.write_text('<DL><p><DT><H3>阅读</H3><DL><p><DT><A HREF="https://a.com">A</A></DL><p></DL><p>',
+                             encoding='utf-8')
+        with patch('src.data.collector.load_events', side_effect=OSError("读取失败")):
+            stats = self.collector.ingest_html(html_file)
+        self.assertEqual((stats['errors'], stats['added']), (1, 0))
+        self.assertEqual(self.store.stats()['inputs'], {})
+
+        self.assertEqual(self.collector.ingest_html(html_file)['added'], 1)
+        self.assertEqual(len(self.store), 1)
+
+    def test_rewritten_log_not_double_counted(self):
+        """测试被改写的日志重新读取时先撤销上次的票数，majority 不会因重复计数而改变"""
+        store = TrainingDataStore(self.test_dir / "majority.db", conflict_policy='majority')
+        collector = BookmarkDataCollector(verbose=False, store=store)
+        self.addCleanup(store.close)
+
+        def entry(url: str, category: str) -> dict:
+            return {"request": {"bookmarks": [{"id": 1, "title": "标题", "url": url}]}, "result": {category: [1]}}
+
+        legacy = self.logs_dir / "ernie" / "api_call_0.json"
+        legacy.parent.mkdir()
+        legacy.write_text(json.dumps([entry("https://a.com", "技术")] * 2), encoding='utf-8')
+        (self.logs_dir / "ernie" / "api_call_1.jsonl").write_text(
+            ''.join(json.dumps(entry("https://a.com", "阅读")) + '\n' for _ in range(3)), encoding='utf-8')
+        collector.ingest_api_logs(self.logs_dir)
+        votes = lambda: dict(store.conn.execute("SELECT label, votes FROM label_votes").fetchall())
+        self.assertEqual(votes(), {"技术": 2, "阅读": 3})
+
+        # 旧版日志追加一条后整体重新读取
+        legacy.write_text(json.dumps([entry("https://a.com", "技术")] * 2 + [entry("https://b.com", "工具")]),
+                          encoding='utf-8')
+        self.assertEqual(collector.ingest_api_logs(self.logs_dir)['files'], 1)
+        self.assertEqual(votes(), {"技术": 2, "阅读": 3, "工具": 1})
+        self.assertEqual({s['input']['url']: s['label'] for s in store.iter_samples()},
+                         {"https://a.com": "阅读", "https://b.com": "工具"})
+
+        # 改写后不再包含的书签被移除
+        legacy.write_text(json.dumps([entry("https://a.com", "技术")]), encoding='utf-8')
+        collector.ingest_api_logs(self.logs_dir)
+        self.assertEqual(votes(), {"技术": 1, "阅读": 3})
+        self.assertEqual([s['input']['url'] for s in store.iter_samples()], ["https://a.com"])
+
+    def test_save_without_store(self):
+        """测试没有 store 时保存本次收集到的样本"""
+        html_file = self.test_dir / "bookmarks.html"
+        html_file.write_text('<DL><p><DT><H3>阅读</H3><DL><p><DT><A HREF="https://a.com">A</A></DL><p></DL><p>',
+                             encoding='utf-8')
+        collector = BookmarkDataCollector(verbose=False)
+        collector.collect_from_html(html_file)
+        output = self.test_dir / "training.json"
+        self.assertEqual(collector.save_training_data(output), 1)
+        self.assertEqual(json.loads(output.read_text(encoding='utf-8'))[0]['input']['url'], "https://a.com")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+import gzip
+import json
+from src.data.processor import BookmarkDataProcessor
+from src.data.training_writer import TrainingDataWriter, format_sample, is_validation
+from src.tests.helpers import IsolatedTestCase
+
+class TestTrainingDataWriter(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.test_data_dir = self.temp_dir
+        self.samples = [
+            ({'text': f"标题 {i}\ndomain=example.com", 'label': '__label__技术', 'features': {'i': i}},
+             f"https://example.com/page/{i}")
+            for i in range(200)
+        ]
+
+    def test_format_sample(self):
+        """测试 JSON Lines 与 fastText 两种格式"""
+        sample, _ = self.samples[0]
+        self.assertEqual(json.loads(format_sample(sample))['features'], {'i': 0})
+        self.assertEqual(format_sample(sample, 'fasttext'), "__label__技术 标题 0 domain=example.com")
+
+    def test_validation_split_is_deterministic(self):
+        """测试验证集划分只取决于规范化后的 URL"""
+        urls = [url for _, url in self.samples]
+        chosen = [is_validation(url, 0.2) for url in urls]
+        self.assertEqual(chosen, [is_validation(url, 0.2) for url in urls])
+        self.assertTrue(10 < sum(chosen) < 70)
+        self.assertEqual(is_validation("https://EXAMPLE.com/page/1/?utm_source=x", 0.2), chosen[1])
+        self.assertFalse(any(is_validation(url, 0) for url in urls))
+
+    def test_sharding_and_compression(self):
+        """测试按大小切换分片、gzip 压缩，读回的样本数与划分一致"""
+        with TrainingDataWriter(self.test_data_dir, format='fasttext', shard_bytes=1000,
+                                compress=True, validation_ratio=0.2) as writer:
+            for sample, url in self.samples:
+                writer.write(sample, url)
+        counts = writer.close()
+
+        train = sorted(self.test_data_dir.glob("training_data.train-*.txt.gz"))
+        valid = sorted(self.test_data_dir.glob("training_data.valid-*.txt.gz"))
+        self.assertGreater(len(train), 1)
+        self.assertEqual(sorted(train + valid), sorted(writer.files))
+        self.assertFalse(list(self.test_data_dir.glob("*.tmp")))
+
+        def read(paths):
+            lines = []
+            for path in paths:
+                with gzip.open(path, 'rt', encoding='utf-8') as f:
+                    lines.extend(f.read().splitlines())
+            return lines
+
+        self.assertEqual(len(read(train)), counts['train'])
+        self.assertEqual(len(read(valid)), counts['valid'])
+        self.assertEqual(counts['train'] + counts['valid'], 200)
+        self.assertTrue(all(line.startswith("__label__技术 标题 ") for line in read(train)))
+
+    def test_rewrite_removes_stale_shards(self):
+        """测试重新写出时删除上次多出来的分片，出错时不留下临时文件"""
+        with TrainingDataWriter(self.test_data_dir, shard_bytes=500) as writer:
+            for sample, url in self.samples:
+                writer.write(sample, url)
+        self.assertGreater(len(writer.files), 2)
+
+        with TrainingDataWriter(self.test_data_dir, shard_bytes=500) as writer:
+            writer.write(*self.samples[0])
+        self.assertEqual([path.name for path in self.test_data_dir.iterdir()], ["training_data.train-00000.jsonl"])
+
+        with self.assertRaises(RuntimeError):
+            with TrainingDataWriter(self.test_data_dir, name="failed") as writer:
+                writer.write(*self.samples[0])
+                raise RuntimeError("中断")
+        self.assertEqual(len(list(self.test_data_dir.iterdir())), 1)
+
+    def test_processor_streaming(self):
+        """测试书签处理结果逐条写出后与一次性处理的结果一致"""
+        bookmarks_file = self.test_data_dir / "bookmarks.html"
+        bookmarks_file.write_text("""<DL><p>
+            <DT><H3>技术文档</H3>
+            <DL><p>
+                <DT><A HREF="https://docs.python.org">doc: Python 文档</A>
+                <DT><A HREF="https://github.com/python/cpython">pkg: CPython</A>
+            </DL><p>
+        </DL><p>""", encoding='utf-8')
+        processor = BookmarkDataProcessor()
+        output_dir = self.test_data_dir / "out"
+        with TrainingDataWriter(output_dir) as writer:
+            for url, item in processor.iter_training_data(bookmarks_file):
+                writer.write(item, url)
+
+        lines = (output_dir / "training_data.train-00000.jsonl").read_text(encoding='utf-8').splitlines()
+        expected = processor.process_bookmarks_file(bookmarks_file)
+        self.assertEqual([json.loads(line) for line in lines], [
+            {**item, 'features': item['features'].to_dict()} for item in expected
+        ])
+
+if __name__ == '__main__':
+    unittest.main()
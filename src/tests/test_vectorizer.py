@@ -0,0 +1,58 @@
+import unittest
+from src.data.vectorizer import CSRMatrix, HashingVectorizer, np
+
+@unittest.skipIf(np is None, "需要 numpy")
+class TestHashingVectorizer(unittest.TestCase):
+    def setUp(self):
+        self.vectorizer = HashingVectorizer(n_features=1 << 18)
+        self.bookmarks = [
+            {"title": "doc: Python 中文文档", "url": "https://docs.python.org/3/library/"},
+            {"title": "pkg: requests", "url": "https://github.com/psf/requests"},
+            {"title": "", "url": ""},
+            {"title": "中文文档 Python", "url": "https://www.python.org/doc/"},
+        ]
+
+    def test_tokens(self):
+        """测试前缀、域名、路径段、关键词和中文字符 n-gram 都会生成特征"""
+        features = self.vectorizer.pipeline.extract("doc: Python 中文", "https://docs.python.org/3/library/")
+        tokens = {token for token, _ in self.vectorizer.tokens(features)}
+        self.assertEqual(tokens, {'p=文档', 'd=docs.python.org', 'd=python.org', 's=3', 's=library',
+                                  'k=python', 'k=中文', 'c=中', 'c=文', 'c=中文'})
+
+    def test_transform_csr(self):
+        """测试批量模式输出合法的 CSR 数组，每行归一化，空书签为空行"""
+        matrix = self.vectorizer.transform_bookmarks(self.bookmarks)
+        self.assertEqual(matrix.shape, (4, 1 << 18))
+        self.assertEqual(matrix.indptr.dtype, np.int64)
+        self.assertEqual(matrix.indices.dtype, np.int32)
+        self.assertEqual(matrix.indptr[2], matrix.indptr[3])
+        for index in (0, 1, 3):
+            columns, values = matrix.row(index)
+            self.assertTrue(np.all(np.diff(columns) > 0))
+            self.assertAlmostEqual(float(np.sum(values ** 2)), 1.0, places=5)
+
+        # 共享域名和中文词的书签更相似
+        dense = matrix.to_dense()
+        scores = matrix.dot(dense[0])
+        self.assertAlmostEqual(scores[0], 1.0, places=5)
+        self.assertEqual(scores[2], 0)
+        self.assertGreater(scores[3], scores[1])
+
+    def test_stable_across_instances(self):
+        """测试哈希结果与实例和进程无关"""
+        first = self.vectorizer.transform_bookmarks(self.bookmarks)
+        second = HashingVectorizer(n_features=1 << 18).transform_bookmarks(self.bookmarks)
+        self.assertTrue(np.array_equal(first.indices, second.indices))
+        self.assertTrue(np.array_equal(first.data, second.data))
+
+    def test_streaming_matches_batch(self):
+        """测试流式模式的分块拼接后与批量模式结果一致"""
+        chunks = list(self.vectorizer.iter_transform(iter(self.bookmarks), batch_size=3))
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 1])
+        merged = CSRMatrix.concatenate(chunks)
+        batch = self.vectorizer.transform_bookmarks(self.bookmarks)
+        for name in ('indptr', 'indices', 'data'):
+            self.assertTrue(np.array_equal(getattr(merged, name), getattr(batch, name)), name)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+from unittest.mock import patch
+from src.data.models import Bookmark, Folder
+from src.data.parser import iter_bookmarks_with_path
+from src.data.writer import NetscapeBookmarkWriter, write_bookmarks_file
+from src.tests.helpers import IsolatedTestCase
+
+class TestBookmarkWriter(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.test_data_dir = self.temp_dir
+        self.output_file = self.test_data_dir / "writer_output.html"
+        self.tree = [{
+            'folders': [Folder(
+                name='技术 & <工具>',
+                add_date='1600000000',
+                bookmarks=[Bookmark(title='a < b & "c"', url='https://x.com/?a=1&b="2"',
+                                    add_date='1600000001')],
+                subfolders=[Folder(name='子文件夹', bookmarks=[
+                    {'title': 'Dict 书签', 'url': 'https://dict.example.com'}
+                ])]
+            )]
+        }, Bookmark(title='Root', url='https://root.com')]
+    
+    def test_escaping_roundtrip(self):
+        """测试转义后的输出可以被解析回原始内容"""
+        write_bookmarks_file(self.output_file, self.tree)
+        content = self.output_file.read_text(encoding='utf-8')
+        self.assertIn('a &lt; b &amp; "c"', content)
+        self.assertIn('HREF="https://x.com/?a=1&amp;b=&quot;2&quot;"', content)
+        
+        parsed = [(path, b.title, b.url, b.add_date)
+                  for path, b in iter_bookmarks_with_path(self.output_file)]
+        self.assertEqual(parsed, [
+            (('技术 & <工具>',), 'a < b & "c"', 'https://x.com/?a=1&b="2"', '1600000001'),
+            (('技术 & <工具>', '子文件夹'), 'Dict 书签', 'https://dict.example.com', ''),
+            ((), 'Root', 'https://root.com', ''),
+        ])
+    
+    def test_deep_tree_without_recursion(self):
+        """测试超过递归限制的深层文件夹"""
+        root = current = Folder(name='0')
+        for level in range(1, 3000):
+            child = Folder(name=str(level))
+            current.subfolders.append(child)
+            current = child
+        current.bookmarks.append(Bookmark(title='deep', url='https://deep.com'))
+        
+        write_bookmarks_file(self.output_file, [root])
+        paths = [path for path, _ in iter_bookmarks_with_path(self.output_file)]
+        self.assertEqual(len(paths[0]), 3000)
+    
+    def test_atomic_write_keeps_old_file_on_error(self):
+        """测试写出失败时保留原文件且不留临时文件"""
+        self.output_file.write_text("old", encoding='utf-8')
+        with patch.object(NetscapeBookmarkWriter, 'write_items', side_effect=RuntimeError("boom")):
+            with self.assertRaises(RuntimeError):
+                write_bookmarks_file(self.output_file, self.tree)
+        self.assertEqual(self.output_file.read_text(encoding='utf-8'), "old")
+        self.assertEqual(list(self.test_data_dir.glob(".writer_output.html.*")), [])
+    
+    def tearDown(self):
+        if self.output_file.exists():
+            self.output_file.unlink()
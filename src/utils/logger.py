@@ -1,22 +1,79 @@
-import logging
+import atexit
+import gzip
 import json
+import queue
+import shutil
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Union
 from src.config import LOGS_DIR
 
+# 单个日志文件的默认大小上限（字节）和最长使用时间（秒），超过后切换到新文件
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_MAX_AGE = 24 * 3600
+# 后台线程把缓冲的日志写入磁盘的最长间隔（秒）
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+# 写入线程的结束标记
+_STOP = object()
+
+# 写入线程正在运行的日志记录器。写入线程本身就引用着记录器，弱引用并不能让它提前被回收，
+# 因此直接用集合保存，关闭时移除，关闭后的记录器可以被回收
+_live_loggers: 'Set[APILogger]' = set()
+_live_loggers_lock = threading.Lock()
+
+
+@atexit.register
+def _close_live_loggers():
+    """进程退出前写完所有记录器缓冲中的日志"""
+    with _live_loggers_lock:
+        loggers = list(_live_loggers)
+    for logger in loggers:
+        logger.close()
+
+
 class APILogger:
-    def __init__(self, name: str):
-        self.log_dir = LOGS_DIR / name
-        self.log_dir.mkdir(exist_ok=True)
-        
-        # 创建日志文件名（使用时间戳）
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        self.log_file = self.log_dir / f"api_call_{timestamp}.json"
-        
-        # 创建空的日志文件
-        with open(self.log_file, 'w', encoding='utf-8') as f:
-            json.dump([], f)
-    
+    """API 调用日志（JSON Lines，只追加）
+
+    调用方线程负责把条目序列化成一行 JSON，然后放入队列立即返回；
+    后台线程批量写入当前日志文件。文件超过 max_bytes 或使用超过 max_age 秒后切换到新文件，
+    compress 为真时旧文件压缩为 .jsonl.gz。日志文件在第一次写入时才创建。
+    """
+
+    def __init__(self, name: str, max_bytes: int = DEFAULT_MAX_BYTES, max_age: float = DEFAULT_MAX_AGE,
+                 compress: bool = False, flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 log_dir: Optional[Path] = None):
+        self.log_dir = Path(log_dir) if log_dir else LOGS_DIR / name
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compress = compress
+        self.flush_interval = flush_interval
+
+        # 当前日志文件，第一次写入时创建
+        self.log_file: Optional[Path] = None
+        self._file = None
+        self._opened_at = 0.0
+
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    @classmethod
+    def from_settings(cls, name: str, settings: Optional[Dict]) -> 'APILogger':
+        """按 config.yaml 的 api_logging 配置创建"""
+        settings = settings or {}
+        return cls(
+            name,
+            max_bytes=int(settings.get('max_bytes', DEFAULT_MAX_BYTES)),
+            max_age=float(settings.get('max_age_hours', DEFAULT_MAX_AGE / 3600)) * 3600,
+            compress=bool(settings.get('compress', False)),
+            flush_interval=float(settings.get('flush_interval', DEFAULT_FLUSH_INTERVAL))
+        )
+
     def _serialize_response(self, obj):
         """序列化响应对象"""
         if hasattr(obj, 'body'):
@@ -27,39 +84,169 @@ class APILogger:
                 "id": obj.body.get("id"),
                 "usage": obj.body.get("usage", {})
             }
+        elif isinstance(obj, dict):
+            return obj
         elif hasattr(obj, '__dict__'):
             return obj.__dict__
         return str(obj)
-    
-    def log_api_call(self, request_data: dict, response_data: dict, error: str = None):
-        """记录API调用的请求和响应"""
+
+    def log_api_call(self, request_data: dict, response_data: dict, error: str = None,
+                     result: dict = None, latency: float = None):
+        """记录API调用的请求和响应，result 为解析后的分类结果（分类 -> 书签编号），latency 为调用用时（秒）"""
+        log_entry = {
+            "timestamp": datetime.now().isoformat(),
+            "request": request_data,
+            "response": self._serialize_response(response_data),
+            "error": error
+        }
+        if result is not None:
+            log_entry["result"] = result
+        if latency is not None:
+            log_entry["latency"] = round(latency, 3)
+
+        # 在调用方线程序列化：记录的是调用时的内容，序列化失败也只影响这一条
         try:
-            # 读取现有日志
-            with open(self.log_file, 'r', encoding='utf-8') as f:
-                logs = json.load(f)
-            
-            # 创建新的日志条目
-            log_entry = {
-                "timestamp": datetime.now().isoformat(),
-                "request": request_data,
-                "response": self._serialize_response(response_data),
-                "error": error
-            }
-            
-            # 添加新的日志条目
-            logs.append(log_entry)
-            
-            # 写回文件
-            with open(self.log_file, 'w', encoding='utf-8') as f:
-                json.dump(logs, f, ensure_ascii=False, indent=2, default=self._serialize_response)
-        
+            line = json.dumps(log_entry, ensure_ascii=False, default=self._serialize_response)
         except Exception as e:
             print(f"记录日志时出错：{str(e)}")
-            # 如果出错，尝试直接写入单个日志条目
-            with open(self.log_file, 'w', encoding='utf-8') as f:
-                json.dump([{
-                    "timestamp": datetime.now().isoformat(),
-                    "error": f"日志记录错误：{str(e)}",
-                    "request": str(request_data),
-                    "response": str(response_data)
-                }], f, ensure_ascii=False, indent=2)
\ No newline at end of file
+            line = json.dumps({
+                "timestamp": log_entry["timestamp"],
+                "error": f"日志记录错误：{str(e)}",
+                "request": str(request_data),
+                "response": str(response_data)
+            }, ensure_ascii=False)
+
+        self._ensure_writer()
+        self._queue.put(line)
+
+    def _ensure_writer(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._closed = False
+                self._thread = threading.Thread(target=self._run, name=f"api-logger-{self.log_dir.name}",
+                                                daemon=True)
+                self._thread.start()
+                with _live_loggers_lock:
+                    _live_loggers.add(self)
+
+    def _run(self):
+        """后台写入线程：取出队列中已有的全部行一次写入，空闲超过 flush_interval 时刷新到磁盘"""
+        stop = False
+        while not stop:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            lines = []
+            while True:
+                if item is _STOP:
+                    stop = True
+                else:
+                    lines.append(item)
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            try:
+                if lines:
+                    self._write(lines)
+            except Exception as e:
+                print(f"写入日志文件时出错：{str(e)}")
+            finally:
+                for _ in range(len(lines) + (1 if stop else 0)):
+                    self._queue.task_done()
+        self._close_file()
+
+    def _write(self, lines: List[str]):
+        if self._file is not None and (self._file.tell() >= self.max_bytes
+                                       or time.time() - self._opened_at >= self.max_age):
+            self._rotate()
+        if self._file is None:
+            self._open_segment()
+        self._file.write('\n'.join(lines) + '\n')
+        self._file.flush()
+
+    def _open_segment(self):
+        """创建新的日志文件，同一秒内创建多个文件时加序号区分"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = self.log_dir / f"api_call_{timestamp}.jsonl"
+        sequence = 1
+        while path.exists() or path.with_suffix('.jsonl.gz').exists():
+            path = self.log_dir / f"api_call_{timestamp}_{sequence}.jsonl"
+            sequence += 1
+        self.log_file = path
+        self._file = open(path, 'a', encoding='utf-8')
+        self._opened_at = time.time()
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _rotate(self):
+        """关闭当前文件（按需压缩），下一次写入时创建新文件"""
+        self._close_file()
+        if self.compress and self.log_file is not None:
+            compressed = self.log_file.with_suffix('.jsonl.gz')
+            with open(self.log_file, 'rb') as source, gzip.open(compressed, 'wb') as target:
+                shutil.copyfileobj(source, target)
+            self.log_file.unlink()
+
+    def flush(self):
+        """等待已记录的条目全部写入磁盘"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def close(self):
+        """写完剩余条目后结束后台线程"""
+        with self._lock:
+            thread = self._thread
+            if thread is None or self._closed:
+                return
+            self._closed = True
+        self._queue.put(_STOP)
+        thread.join()
+        with _live_loggers_lock:
+            _live_loggers.discard(self)
+
+
+def iter_log_files(path: Union[str, Path]) -> List[Path]:
+    """列出目录下（含子目录）的全部 API 日志文件：.jsonl、.jsonl.gz 以及旧版的 .json"""
+    path = Path(path)
+    if path.is_file():
+        return [path]
+    files = [file for pattern in ("**/*.jsonl", "**/*.jsonl.gz", "**/*.json") for file in path.glob(pattern)]
+    return sorted(files)
+
+
+def iter_log_entries(path: Union[str, Path]) -> Iterator[Dict]:
+    """逐条读取 API 日志，path 可以是单个日志文件或日志目录
+
+    JSON Lines 文件逐行读取，不会一次载入整个文件；
+    进程中断时最后一行可能不完整，无法解析的行会被跳过。
+    """
+    for log_file in iter_log_files(path):
+        if log_file.suffix == '.json':
+            # 旧版日志：整个文件是一个 JSON 数组
+            try:
+                with open(log_file, 'r', encoding='utf-8') as f:
+                    entries = json.load(f)
+            except ValueError:
+                print(f"跳过无法解析的日志文件 {log_file}")
+                continue
+            if not isinstance(entries, list):
+                continue
+            yield from (entry for entry in entries if isinstance(entry, dict))
+            continue
+        opener = gzip.open if log_file.suffix == '.gz' else open
+        with opener(log_file, 'rt', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    print(f"跳过无法解析的日志行 {log_file}:{line_number}")
+                    continue
+                if isinstance(entry, dict):
+                    yield entry
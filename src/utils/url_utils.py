@@ -0,0 +1,41 @@
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# 不影响页面内容的跟踪参数
+TRACKING_PARAMS = {'fbclid', 'gclid', 'msclkid', 'spm', 'ref_src'}
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url: str) -> str:
+    """规范化 URL，使指向同一页面的不同写法得到相同结果
+
+    - 协议和主机名转为小写，去掉默认端口和页内锚点（保留 #/ 和 #! 形式的前端路由）；
+    - 去掉 utm_* 等跟踪参数，其余查询参数按名称排序；
+    - 去掉路径末尾多余的 "/"。
+    无法解析的 URL 原样返回（去掉首尾空白）。
+    """
+    url = (url or '').strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    if not parts.scheme or not parts.netloc:
+        return url
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if ':' in host:
+        host = f"[{host}]"
+    if port and port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+    if parts.username:
+        credentials = parts.username + (f":{parts.password}" if parts.password else '')
+        host = f"{credentials}@{host}"
+
+    path = parts.path.rstrip('/') or '/'
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS
+    ))
+    fragment = parts.fragment if parts.fragment[:1] in ('/', '!') else ''
+    return urlunsplit((scheme, host, path, query, fragment))